@@ -1,4 +1,5 @@
 import gettext
 import __builtin__
 
-__builtin__._ = gettext.gettext
+if not callable(getattr(__builtin__, '_', None)):
+    __builtin__._ = gettext.gettext
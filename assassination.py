@@ -68,33 +68,35 @@ test_level = 85
 # Build a DPS object.
 calculator = AldrianasRogueDamageCalculator(test_stats, test_talents, test_glyphs, test_buffs, test_race, test_settings, test_level)
 
-# Compute EP values.
-ep_values = calculator.get_ep()
-
-# Compute talents ranking
-main_tree_talents_ranking, off_tree_talents_ranking = calculator.get_talents_ranking()
-
-# Compute glyphs ranking
-glyps_ranking = calculator.get_glyphs_ranking(['vendetta', 'backstab'])
-
-# Compute EP values for procs and gear buffs
-tier_ep_values = calculator.get_other_ep(['rogue_t11_4pc', 'rogue_t11_2pc'])
-metagem_ep_value = calculator.get_other_ep(['chaotic_metagem'])
+# Compute DPS, its breakdown, EP values, weapon and other EP values and the
+# talents and glyphs rankings in one go.
+tier_list = ['rogue_t11_4pc', 'rogue_t11_2pc']
+metagem_list = ['chaotic_metagem']
 trinkets_list = [
     'heroic_key_to_the_endless_chamber',
     'fluid_death',
     'heroic_prestors_talisman_of_machination',
     'heroic_left_eye_of_rajh'
 ]
-trinkets_ep_value = calculator.get_other_ep(trinkets_list)
+report = calculator.get_report(calculator.REPORT_SECTIONS, weapon_speeds=[1.4, 1.8],
+    other_ep_list=tier_list + metagem_list + trinkets_list, glyphs_list=['vendetta', 'backstab'])
+
+ep_values = report['ep']
+main_tree_talents_ranking = report['talents_ranking']['main_tree']
+off_tree_talents_ranking = report['talents_ranking']['off_trees']
+glyps_ranking = report['glyphs_ranking']
+
+# EP values for procs and gear buffs
+tier_ep_values = dict((name, report['other_ep'][name]) for name in tier_list)
+metagem_ep_value = dict((name, report['other_ep'][name]) for name in metagem_list)
+trinkets_ep_value = dict((name, report['other_ep'][name]) for name in trinkets_list)
 
-# Compute weapon ep
-mh_enchants_and_dps_ep_values, oh_enchants_and_dps_ep_values = calculator.get_weapon_ep(dps=True, enchants=True)
-mh_speed_ep_values, oh_speed_ep_values = calculator.get_weapon_ep([1.4, 1.8])
+# Weapon dps, enchant and speed ep
+mh_weapon_ep_values = report['weapon_ep']['mh']
+oh_weapon_ep_values = report['weapon_ep']['oh']
 
-# Compute DPS Breakdown.
-dps_breakdown = calculator.get_dps_breakdown()
-total_dps = sum(entry[1] for entry in dps_breakdown.items())
+dps_breakdown = report['breakdown']
+total_dps = report['dps']
 
 def max_length(dict_list):
     max_len = 0
@@ -121,10 +123,8 @@ pretty_print([trinkets_ep_value])
 dicts_for_pretty_print = [
     glyps_ranking,
     off_tree_talents_ranking,
-    mh_enchants_and_dps_ep_values,
-    oh_enchants_and_dps_ep_values,
-    mh_speed_ep_values,
-    oh_speed_ep_values,
+    mh_weapon_ep_values,
+    oh_weapon_ep_values,
     tier_ep_values,
     metagem_ep_value,
     ep_values,
@@ -1,12 +1,56 @@
+import copy
+import functools
 import gettext
+import json
 import __builtin__
 
-__builtin__._ = gettext.gettext
+if not callable(getattr(__builtin__, '_', None)):
+    __builtin__._ = gettext.gettext
 
 from core import exceptions
+from core import worker_pool
 from calcs import armor_mitigation
+from calcs import arrays
+from calcs import dual_number
+from calcs import instrumentation
+from calcs import solvers
+from objects import frozen
+from objects import revisions
 from objects.procs import InvalidProcException
 
+def thaws_inputs(method):
+    # For the what-if methods, which change the inputs in place and change
+    # them back: while one runs, frozen inputs (see objects.frozen) are
+    # swapped for thawed copies it can change.
+    @functools.wraps(method)
+    def thawed_method(self, *args, **kwargs):
+        frozen_inputs = self.thaw_inputs()
+        if not frozen_inputs:
+            return method(self, *args, **kwargs)
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            for name, value in frozen_inputs.iteritems():
+                setattr(self, name, value)
+    return thawed_method
+
+
+class ModifierTable(object):
+    # The damage modifiers a calculator has worked out for its level and the
+    # revisions of its talents, glyphs, buffs, gear buffs and weapons (see
+    # DamageCalculator.get_input_revisions), so ability formulas can look
+    # them up instead of walking the input objects again.  Each dict maps
+    # the arguments of the modifier function of the same name to its
+    # result, or to whatever the calculator needs to finish it off cheaply.
+    __slots__ = ('inputs', 'talents_modifiers', 'raid_settings_modifiers', 'crit_damage_modifiers')
+
+    def __init__(self, inputs):
+        self.inputs = inputs
+        self.talents_modifiers = {}
+        self.raid_settings_modifiers = {}
+        self.crit_damage_modifiers = {}
+
+
 class DamageCalculator(object):
     # This method holds the general interface for a damage calculator - the
     # sorts of parameters and calculated values that will be need by many (or
@@ -28,7 +72,27 @@ class DamageCalculator(object):
     GLANCE_RATE = .24
     GLANCE_MULTIPLIER = .75
 
-    def __init__(self, stats, talents, glyphs, buffs, race, settings=None, level=85):
+    # Stats get_ep values.  The pseudo-stats are priced by taking a point of
+    # hit or expertise away from the tables they name; see ep_helper.
+    EP_STATS = ('str', 'agi', 'haste', 'crit', 'mastery')
+    EP_PSEUDO_STATS = ('white_hit', 'spell_hit', 'yellow_hit', 'dodge_exp', 'parry_exp')
+
+    # Stats get_dps_batch can vary from row to row.
+    BATCH_STATS = ('str', 'agi', 'ap', 'crit', 'hit', 'exp', 'haste', 'mastery')
+
+    # Sections get_report can compute.
+    REPORT_SECTIONS = ('dps', 'breakdown', 'ep', 'weapon_ep', 'other_ep', 'talents_ranking', 'glyphs_ranking')
+
+    # What instrument() wraps: methods timed, as {method: phase}; ability
+    # damage functions whose calls are counted; modifier tables, as {lookup
+    # method: method that compiles an entry on a miss}; and the names of
+    # class-level LRU caches to report hits on.  Subclasses fill these in.
+    INSTRUMENTED_PHASES = {}
+    INSTRUMENTED_ABILITIES = ()
+    INSTRUMENTED_TABLES = {'raid_settings_modifiers': 'compile_raid_settings_modifiers'}
+    INSTRUMENTED_CACHES = ()
+
+    def __init__(self, stats, talents, glyphs, buffs, race, settings=None, level=85, solver=None):
         self.stats = stats
         self.talents = talents
         self.glyphs = glyphs
@@ -36,10 +100,13 @@ class DamageCalculator(object):
         self.race = race
         self.settings = settings
         self.level = level
-        if self.stats.gear_buffs.mixology and self.buffs.agi_flask:
-            self.stats.agi += 80
-        if self.stats.gear_buffs.master_of_anatomy:
-            self.stats.crit += 80
+        # Calculators that iterate to a fixed point do so with this (see
+        # calcs.solvers), and leave a ConvergenceReport per solve in
+        # convergence_reports.
+        if solver is None:
+            solver = solvers.SuccessiveSubstitutionSolver()
+        self.solver = solver
+        self.convergence_reports = {}
 
     def __setattr__(self, name, value):
         object.__setattr__(self, name, value)
@@ -48,17 +115,163 @@ class DamageCalculator(object):
 
     def __getattr__(self, name):
         # Any status we haven't assigned a value to, we don't have.
-        if name == 'calculating_ep':
+        if name in ('calculating_ep', 'chaining_converged_states'):
             return False
+        elif name in ('converged_states', 'ep_tangents', 'modifier_table', 'instrumentation', 'warm_start_cache', 'warm_start_inputs'):
+            return None
         object.__getattribute__(self, name)
 
+    def __getstate__(self):
+        # Copies get inputs with revisions of their own (see
+        # objects.revisions), and compile their own modifier table.  Copies
+        # aren't instrumented either, and don't share the warm start cache,
+        # which can't be pickled.
+        state = self.__dict__.copy()
+        state.pop('modifier_table', None)
+        state.pop('warm_start_cache', None)
+        state.pop('warm_start_inputs', None)
+        if self.instrumentation is not None:
+            for name in self.instrumentation.wrapped:
+                state.pop(name, None)
+            state.pop('instrumentation')
+        return state
+
+    def instrument(self):
+        # Starts recording what this calculator spends its time on (see
+        # calcs.instrumentation) and returns the Instrumentation, which is
+        # also left in self.instrumentation to read after a call.  Starts
+        # afresh if it was already instrumented.
+        if self.instrumentation is not None:
+            self.uninstrument()
+        caches = dict((name, getattr(self, name)) for name in self.INSTRUMENTED_CACHES)
+        if self.warm_start_cache is not None:
+            caches['warm_start_cache'] = self.warm_start_cache
+        recorder = instrumentation.Instrumentation(caches)
+        wrappers = {}
+        for name in self.INSTRUMENTED_ABILITIES:
+            wrappers[name] = recorder.counted('ability_calls', name, getattr(self, name))
+        for name, compile_name in self.INSTRUMENTED_TABLES.iteritems():
+            wrappers[name] = recorder.counted('table_lookups', name, getattr(self, name))
+            wrappers[compile_name] = recorder.counted('table_misses', name, getattr(self, compile_name))
+        for name, phase in self.INSTRUMENTED_PHASES.iteritems():
+            method = wrappers.get(name, getattr(self, name))
+            if name == 'compute_damage':
+                method = recorder.solving(self, method)
+            wrappers[name] = recorder.timed(phase, method)
+        for name, wrapper in wrappers.iteritems():
+            object.__setattr__(self, name, wrapper)
+        recorder.wrapped = wrappers.keys()
+        self.instrumentation = recorder
+        return recorder
+
+    def uninstrument(self):
+        # Back to the plain methods.
+        if self.instrumentation is None:
+            return
+        for name in self.instrumentation.wrapped:
+            del self.__dict__[name]
+        del self.__dict__['instrumentation']
+
+    def for_request(self):
+        # The reentrant way to evaluate from many threads at once.  A
+        # calculator keeps the state of whatever it is working out on itself,
+        # so one must never run two evaluations at the same time; instead,
+        # each request calls this on a shared calculator and evaluates on
+        # what it gets back: a calculator of the same class, on frozen copies
+        # of these inputs (see objects.frozen), with state of its own.
+        # Inputs that are already frozen are shared rather than copied, so
+        # freezing them once up front makes this cheap.  A warm start cache
+        # is shared too.
+        calculator = self.__class__(frozen.freeze(self.stats), frozen.freeze(self.talents), frozen.freeze(self.glyphs),
+            frozen.freeze(self.buffs), frozen.freeze(self.race), frozen.freeze(self.settings), self.level, self.solver)
+        if self.warm_start_cache is not None:
+            calculator.warm_start_cache = self.warm_start_cache
+        return calculator
+
+    def get_warm_start(self, name):
+        # For a calculator given a warm_start_cache (see calcs.warm_start),
+        # a (key, vector, state) for the solve called name: where to file
+        # its converged state, and the nearest state filed there already, or
+        # None.  None if the solve can't use the cache: EP's pseudo-stats,
+        # dual numbers and batches change things the key doesn't cover.
+        cache = self.warm_start_cache
+        if cache is None or self.calculating_ep or self.ep_tangents is not None:
+            return None
+        vector = tuple([getattr(self.stats, stat) for stat in self.BATCH_STATS])
+        for value in vector:
+            if isinstance(value, dual_number.DualNumber) or arrays.is_array(value):
+                return None
+        key = (name,) + self.get_warm_start_inputs()
+        return key, vector, cache.get_nearest(key, vector)
+
+    def get_warm_start_inputs(self):
+        # Everything that goes into a solve but the rating stats.  The part
+        # get_input_revisions covers is only worked out again when one of
+        # those changes; race, procs and settings are read every time.
+        revisions_now = self.get_input_revisions()
+        inputs = self.warm_start_inputs
+        if inputs is None or inputs[0] != revisions_now:
+            stats = self.stats
+            canonical_form = [self.__class__.__name__, self.level]
+            for value in (self.talents, self.glyphs, self.buffs, stats.gear_buffs, stats.mh, stats.oh, stats.ranged):
+                canonical_form.append(frozen.get_canonical_form(value))
+            inputs = (revisions_now, json.dumps(canonical_form))
+            self.warm_start_inputs = inputs
+        procs = self.stats.procs
+        procs_list = tuple([name for name in sorted(procs.allowed_procs) if getattr(procs, name)])
+        settings = json.dumps(frozen.get_canonical_form(getattr(self, 'settings', None)))
+        return inputs[1], self.race.race_name, procs_list, settings
+
+    def get_input_revisions(self):
+        # The level and the revisions (see objects.revisions) of every input
+        # object the modifier tables depend on; equal results mean nothing
+        # those were compiled from has changed.  The level counts on its own
+        # since armor mitigation depends on it, and setting it changes no
+        # input when they are all at that level already.
+        # This is read on every modifier lookup, so the revisions are read
+        # straight off the inputs unless one hasn't been handed out yet.
+        stats = self.stats
+        try:
+            inputs = (self.level, self.talents.revision, self.glyphs.revision, self.buffs.revision,
+                stats.gear_buffs.revision, stats.mh.revision, stats.oh.revision, stats.ranged.revision)
+            if None not in inputs:
+                return inputs
+        except AttributeError:
+            pass
+        input_objects = (self.talents, self.glyphs, self.buffs, stats.gear_buffs, stats.mh, stats.oh, stats.ranged)
+        return (self.level,) + tuple([revisions.get(input_object) for input_object in input_objects])
+
+    def get_modifier_table(self):
+        # The compiled modifiers for the current inputs; a change to any of
+        # them since the table was built gets a fresh, empty one.
+        inputs = self.get_input_revisions()
+        table = self.modifier_table
+        if table is None or table.inputs != inputs:
+            table = ModifierTable(inputs)
+            self.modifier_table = table
+        return table
+
     def _set_constants_for_level(self):
-        self.buffs.level = self.level
-        self.stats.level = self.level
-        self.race.level = self.level
+        # Inputs already at the right level are left alone; they may be
+        # frozen (see objects.frozen).
+        for input_object in (self.buffs, self.stats, self.race):
+            if input_object.level != self.level:
+                input_object.level = self.level
         # calculate and cache the level-dependent armor mitigation parameter
         self.armor_mitigation_parameter = armor_mitigation.parameter(self.level)
 
+    def thaw_inputs(self):
+        # Swaps any frozen stats, talents, glyphs or buffs for thawed copies
+        # and returns the frozen ones, so they can be put back.
+        frozen_inputs = {}
+        for name in ('stats', 'talents', 'glyphs', 'buffs'):
+            value = getattr(self, name)
+            if frozen.is_frozen(value):
+                frozen_inputs[name] = value
+                setattr(self, name, frozen.thaw(value))
+        return frozen_inputs
+
+    @thaws_inputs
     def ep_helper(self,stat):
         if stat not in ('dodge_exp', 'white_hit', 'spell_hit', 'yellow_hit', 'parry_exp'):
             setattr(self.stats, stat, getattr(self.stats, stat) + 1.)
@@ -72,24 +285,323 @@ class DamageCalculator(object):
 
         return dps
 
-    def get_ep(self):
+    @thaws_inputs
+    def get_ep(self, analytic=False, baseline_dps=None, ap_dps=None):
+        # With analytic=True the weights are the derivatives of dps from a
+        # single differentiated solve (see get_ep_breakdown) rather than
+        # differences between a baseline and one perturbed solve per stat.
+        # baseline_dps and ap_dps, the dps of this character and with a
+        # point more ap, are worked out unless given, as get_report does.
+        # With NumPy, EP comes from one batch (see get_ep_batch) whose own
+        # rows stand in for both, and they are ignored.
+        if analytic:
+            ep_values = {}
+            for stat, breakdown in self.get_ep_breakdown().iteritems():
+                ep_values[stat] = sum(breakdown.values())
+            return ep_values
+
+        if arrays.numpy is not None:
+            return self.get_ep_batch()
+
         ep_values = {'white_hit':0, 'spell_hit':0, 'yellow_hit':0,
                      'str':0, 'agi':0, 'haste':0, 'crit':0,
                      'mastery':0, 'dodge_exp':0, 'parry_exp':0}
-        baseline_dps = self.get_dps()
-        ap_dps = self.ep_helper('ap')
-        ap_dps_difference = ap_dps - baseline_dps
-        for stat in ep_values.keys():
-            dps = self.ep_helper(stat)
-            ep_values[stat] = abs(dps - baseline_dps) / ap_dps_difference
+        # Every perturbed character differs from the baseline by a single
+        # point of one stat, so calculators that iterate towards a converged
+        # state can seed each perturbed solve with the baseline's.  The
+        # baseline solve fills converged_states; the rest only read it.  A
+        # caller that already keeps them (get_report) keeps them.
+        owns_converged_states = self.converged_states is None
+        if owns_converged_states:
+            self.converged_states = {}
+        try:
+            if baseline_dps is None:
+                baseline_dps = self.get_dps()
+            if ap_dps is None:
+                ap_dps = self.ep_helper('ap')
+            ap_dps_difference = ap_dps - baseline_dps
+            for stat in ep_values.keys():
+                dps = self.ep_helper(stat)
+                ep_values[stat] = abs(dps - baseline_dps) / ap_dps_difference
+        finally:
+            if owns_converged_states:
+                self.converged_states = None
 
         return ep_values
 
-    def get_weapon_ep(self, speed_list=None, dps=False, enchants=False):
+    def get_ep_batch(self):
+        # get_ep's differences in one batch (see calcs.arrays): a row for the
+        # baseline, one with a point more ap, and one per stat, each a point
+        # up in that stat or, for the pseudo-stats, with a point taken off
+        # the tables they name by the ep_tangents hooks.  Every row comes out
+        # of the same solve, so baseline_dps and ap_dps aren't needed.
+        stats = ('ap',) + self.EP_STATS + self.EP_PSEUDO_STATS
+        rows = len(stats) + 1
+        old_values = {}
+        for stat in ('ap',) + self.EP_STATS:
+            old_values[stat] = getattr(self.stats, stat)
+            column = [old_values[stat]] * rows
+            column[stats.index(stat) + 1] += 1.
+            setattr(self.stats, stat, arrays.get_column(column))
+        self.ep_tangents = {}
+        for stat in self.EP_PSEUDO_STATS:
+            column = [0.] * rows
+            column[stats.index(stat) + 1] = 1.
+            self.ep_tangents[stat] = arrays.get_column(column)
+        try:
+            dps = self.get_dps()
+        finally:
+            for stat, value in old_values.iteritems():
+                setattr(self.stats, stat, value)
+            self.ep_tangents = None
+
+        ap_dps_difference = dps[1] - dps[0]
+        ep_values = {}
+        for row, stat in enumerate(stats[1:]):
+            ep_values[stat] = float(abs(dps[row + 2] - dps[0]) / ap_dps_difference)
+        return ep_values
+
+    def get_ep_breakdown(self):
+        # Returns {stat: {source: ep}}: how much of each stat's EP comes from
+        # each damage source, in the same units (and with the same sign
+        # convention) as get_ep, so every stat's sources sum to its EP.
+        # Stats are seeded as dual numbers and the hit and expertise pseudo-
+        # stats as tangents on the hit tables, so one pass through
+        # get_dps_breakdown differentiates every source by every stat.
+        gradient = self.get_dps_breakdown_gradient()
+        ap_derivative = sum([dual_number.partial_of(dps, 'ap') for dps in gradient.values()])
+
+        ep_breakdown = {}
+        for stat in self.EP_STATS + self.EP_PSEUDO_STATS:
+            derivatives = dict((source, dual_number.partial_of(dps, stat)) for source, dps in gradient.iteritems())
+            # Hit and expertise are valued by taking a point away, so their
+            # derivatives come out negative; get_ep reports magnitudes.
+            if sum(derivatives.values()) < 0:
+                sign = -1
+            else:
+                sign = 1
+            ep_breakdown[stat] = dict((source, sign * derivative / ap_derivative) for source, derivative in derivatives.iteritems())
+
+        return ep_breakdown
+
+    @thaws_inputs
+    def get_dps_breakdown_gradient(self):
+        # get_dps_breakdown with every source's dps a DualNumber carrying its
+        # partials with respect to EP_STATS and EP_PSEUDO_STATS.
+        old_values = {}
+        for stat in self.EP_STATS + ('ap',):
+            old_values[stat] = getattr(self.stats, stat)
+            setattr(self.stats, stat, dual_number.DualNumber(old_values[stat], {stat: 1.}))
+        self.ep_tangents = dict((stat, dual_number.DualNumber(0., {stat: 1.})) for stat in self.EP_PSEUDO_STATS)
+        try:
+            return self.get_dps_breakdown()
+        finally:
+            for stat in old_values:
+                setattr(self.stats, stat, old_values[stat])
+            self.ep_tangents = None
+
+    @thaws_inputs
+    def get_dps_batch(self, **stat_columns):
+        # Scores many variations of this character in one call: each keyword
+        # is a stat name and a list of values for it, all lists the same
+        # length, and the result is the list of dps for each row.  Stats not
+        # given keep this character's values.  Only the rating stats are
+        # swapped per row, so talents, glyphs, buffs, gear buffs and procs
+        # are set up once, and every row's solve starts from the state the
+        # first row converged to (see get_ep).  With NumPy installed, the
+        # rows are instead worked out together in a single pass with each
+        # stat an array (see calcs.arrays).
+        for stat in stat_columns:
+            if stat not in self.BATCH_STATS:
+                raise exceptions.InvalidInputException(_('Batches cannot vary {stat}').format(stat=stat))
+        lengths = set([len(column) for column in stat_columns.values()])
+        if len(lengths) > 1:
+            raise exceptions.InvalidInputException(_('All stat columns in a batch must be the same length'))
+        if not lengths:
+            return []
+
+        old_values = dict((stat, getattr(self.stats, stat)) for stat in stat_columns)
+        if arrays.numpy is not None:
+            try:
+                for stat, column in stat_columns.iteritems():
+                    setattr(self.stats, stat, arrays.get_column(column))
+                dps = self.get_dps()
+            finally:
+                for stat, value in old_values.iteritems():
+                    setattr(self.stats, stat, value)
+            return [float(row_dps) for row_dps in dps]
+
+        self.converged_states = {}
+        try:
+            dps_list = []
+            for row in xrange(lengths.pop()):
+                for stat, column in stat_columns.iteritems():
+                    setattr(self.stats, stat, column[row])
+                dps_list.append(self.get_dps())
+        finally:
+            for stat, value in old_values.iteritems():
+                setattr(self.stats, stat, value)
+            self.converged_states = None
+
+        return dps_list
+
+    @thaws_inputs
+    def get_stat_curve(self, stat, values, breakdown=False, breakpoints=False):
+        # dps as a function of one of BATCH_STATS, at each rating in values
+        # (a list, or anything else that iterates over numbers).  Returns
+        # {'values': [...], 'dps': [...]}, and with breakdown=True also
+        # 'breakdown': {source: [...]}, the dps of every damage source at
+        # each value.  With breakpoints=True, the stat's breakpoints (see
+        # get_stat_breakpoints) that fall within the values are added to
+        # them, so the curve turns exactly where the model does rather than
+        # somewhere between two samples, and are listed as (rating, name)
+        # in 'breakpoints'.
+        values = sorted(values)
+        curve = {}
+        if breakpoints:
+            curve['breakpoints'] = [(rating, name) for rating, name in self.get_stat_breakpoints(stat) if values and values[0] <= rating <= values[-1]]
+            values = sorted(set(values) | set([rating for rating, name in curve['breakpoints']]))
+        results = self.get_sweep_results([{stat: value} for value in values], breakdown)
+        curve['values'] = values
+        curve['dps'] = [dps for dps, dps_breakdown in results]
+        if breakdown:
+            curve['breakdown'] = self.get_breakdown_columns([dps_breakdown for dps, dps_breakdown in results])
+        return curve
+
+    @thaws_inputs
+    def get_stat_grid(self, x_stat, x_values, y_stat, y_values, breakdown=False):
+        # get_stat_curve for two stats at once, at every pair of an x value
+        # and a y value: haste against mastery, say.  Returns {'x_values':
+        # [...], 'y_values': [...], 'dps': [[...], ...]} with dps[i][j] the
+        # dps at x_values[i] and y_values[j], and with breakdown=True
+        # 'breakdown': {source: [[...], ...]} laid out the same way.  The
+        # grid is walked up one row and down the next, so that every point
+        # is solved from a neighbour.
+        if x_stat == y_stat:
+            raise exceptions.InvalidInputException(_('A grid needs two different stats'))
+        x_values = list(x_values)
+        y_values = list(y_values)
+        indices = []
+        for i in xrange(len(x_values)):
+            row_indices = range(len(y_values))
+            if i % 2:
+                row_indices.reverse()
+            indices.extend([(i, j) for j in row_indices])
+        results = self.get_sweep_results([{x_stat: x_values[i], y_stat: y_values[j]} for i, j in indices], breakdown)
+
+        dps = [[None] * len(y_values) for x_value in x_values]
+        for (i, j), (point_dps, point_breakdown) in zip(indices, results):
+            dps[i][j] = point_dps
+        grid = {'x_values': x_values, 'y_values': y_values, 'dps': dps}
+        if breakdown:
+            grid['breakdown'] = {}
+            columns = self.get_breakdown_columns([point_breakdown for point_dps, point_breakdown in results])
+            for source, column in columns.iteritems():
+                rows = [[None] * len(y_values) for x_value in x_values]
+                for (i, j), source_dps in zip(indices, column):
+                    rows[i][j] = source_dps
+                grid['breakdown'][source] = rows
+        return grid
+
+    def get_sweep_results(self, rows, breakdown=False):
+        # Solves a list of {stat: rating} rows in order, each starting from
+        # the state the one before converged to, and returns a (dps,
+        # breakdown) pair per row; breakdown is None unless asked for.
+        # Only the rating stats change between rows, as in get_dps_batch,
+        # and with NumPy installed they are all solved at once as there.
+        for row in rows:
+            for stat in row:
+                if stat not in self.BATCH_STATS:
+                    raise exceptions.InvalidInputException(_('Batches cannot vary {stat}').format(stat=stat))
+
+        old_values = {}
+        for row in rows:
+            for stat in row:
+                old_values.setdefault(stat, getattr(self.stats, stat))
+        if arrays.numpy is not None:
+            if not rows:
+                return []
+            try:
+                for stat, value in old_values.iteritems():
+                    setattr(self.stats, stat, arrays.get_column([row.get(stat, value) for row in rows]))
+                if breakdown:
+                    dps_breakdown = self.get_dps_breakdown()
+                    dps = sum(dps_breakdown.values())
+                else:
+                    dps = self.get_dps()
+            finally:
+                for stat, value in old_values.iteritems():
+                    setattr(self.stats, stat, value)
+            results = []
+            for index in xrange(len(rows)):
+                if breakdown:
+                    row_breakdown = dict((source, arrays.get_row(source_dps, index)) for source, source_dps in dps_breakdown.iteritems())
+                else:
+                    row_breakdown = None
+                results.append((arrays.get_row(dps, index), row_breakdown))
+            return results
+
+        self.converged_states = {}
+        self.chaining_converged_states = True
+        try:
+            results = []
+            for row in rows:
+                for stat, value in row.iteritems():
+                    setattr(self.stats, stat, value)
+                if breakdown:
+                    dps_breakdown = self.get_dps_breakdown()
+                    results.append((sum(dps_breakdown.values()), dps_breakdown))
+                else:
+                    results.append((self.get_dps(), None))
+        finally:
+            for stat, value in old_values.iteritems():
+                setattr(self.stats, stat, value)
+            self.converged_states = None
+            self.chaining_converged_states = False
+
+        return results
+
+    def get_breakdown_columns(self, breakdowns):
+        # A list of {source: dps} as {source: [dps, ...]}, with 0 wherever a
+        # source doesn't appear.
+        sources = set()
+        for dps_breakdown in breakdowns:
+            sources.update(dps_breakdown.keys())
+        return dict((source, [dps_breakdown.get(source, 0) for dps_breakdown in breakdowns]) for source in sources)
+
+    def get_stat_breakpoints(self, stat):
+        # [(rating, name)], in order, of the ratings at which more of a stat
+        # stops doing something, worked out from the hit tables rather than
+        # by looking for corners in dps: for hit, where yellow attacks
+        # ('yellow_hit'), spells ('spell_hit') and white attacks
+        # ('white_hit') stop missing, and for expertise, where each hand
+        # stops being dodged ('mh_dodge_exp', 'oh_dodge_exp').  Parry only
+        # matters from the front, so its caps are left out.  No other stat
+        # has any.
+        breakpoints = []
+        if stat == 'hit':
+            melee_hit = self.race.get_racial_hit() + self.get_melee_hit_from_talents()
+            spell_hit = self.race.get_racial_hit() + self.get_spell_hit_from_talents()
+            breakpoints = [
+                ((self.BASE_ONE_HAND_MISS_RATE - melee_hit) * 100 * self.stats.melee_hit_rating_conversion, 'yellow_hit'),
+                ((self.BASE_SPELL_MISS_RATE - spell_hit) * 100 * self.stats.spell_hit_rating_conversion, 'spell_hit'),
+                ((self.BASE_DW_MISS_RATE - melee_hit) * 100 * self.stats.melee_hit_rating_conversion, 'white_hit')
+            ]
+        elif stat == 'exp':
+            for hand in ('mh', 'oh'):
+                expertise = self.race.get_racial_expertise(getattr(self.stats, hand).type)
+                breakpoints.append(((self.BASE_DODGE_CHANCE - expertise) * 100 * self.stats.expertise_rating_conversion, hand + '_dodge_exp'))
+        return sorted([(max(rating, 0), name) for rating, name in breakpoints])
+
+    @thaws_inputs
+    def get_weapon_ep(self, speed_list=None, dps=False, enchants=False, baseline_dps=None, ap_dps=None):
+        # baseline_dps and ap_dps as for get_ep.
         weapons = ('mh', 'oh')
         if speed_list != None or dps == True:
-            baseline_dps = self.get_dps()
-            ap_dps = self.ep_helper('ap')
+            if baseline_dps is None:
+                baseline_dps = self.get_dps()
+            if ap_dps is None:
+                ap_dps = self.ep_helper('ap')
 
         for hand in weapons:
             ep_values = {}
@@ -136,13 +648,17 @@ class DamageCalculator(object):
 
         return mh_ep_values, oh_ep_values
 
-    def get_other_ep(self, list):
+    @thaws_inputs
+    def get_other_ep(self, list, baseline_dps=None, ap_dps=None):
         # This method computes ep for every other buff/proc not covered by
         # get_ep or get_weapon_ep. Weapon enchants, being tied to the
         # weapons they are on, are computed by get_weapon_ep.
+        # baseline_dps and ap_dps as for get_ep.
         ep_values = {}
-        baseline_dps = self.get_dps()
-        ap_dps = self.ep_helper('ap')
+        if baseline_dps is None:
+            baseline_dps = self.get_dps()
+        if ap_dps is None:
+            ap_dps = self.ep_helper('ap')
 
         procs_list = []
         gear_buffs_list = []
@@ -181,16 +697,25 @@ class DamageCalculator(object):
 
         return ep_values
 
-    def get_glyphs_ranking(self, list=None):
+    @thaws_inputs
+    def get_glyphs_ranking(self, list=None, processes=None, baseline_dps=None):
         glyphs = []
         glyphs_ranking = {}
-        baseline_dps = self.get_dps()
+        if baseline_dps is None:
+            baseline_dps = self.get_dps()
 
         if list == None:
             glyphs = self.glyphs.allowed_glyphs
         else:
             glyphs = list
 
+        if processes is not None:
+            variants = [('glyph', i, not getattr(self.glyphs, i)) for i in glyphs]
+            for i, (new_dps, failed) in zip(glyphs, self.get_variants_dps(variants, processes)):
+                if new_dps != baseline_dps:
+                    glyphs_ranking[i] = abs(new_dps - baseline_dps)
+            return glyphs_ranking
+
         for i in glyphs:
             setattr(self.glyphs, i, not getattr(self.glyphs, i))
             new_dps = self.get_dps()
@@ -200,9 +725,11 @@ class DamageCalculator(object):
 
         return glyphs_ranking
 
-    def get_talents_ranking(self, list=None):
+    @thaws_inputs
+    def get_talents_ranking(self, list=None, processes=None, baseline_dps=None):
         talents_ranking = {}
-        baseline_dps = self.get_dps()
+        if baseline_dps is None:
+            baseline_dps = self.get_dps()
         talent_list = []
 
         if list == None:
@@ -215,12 +742,18 @@ class DamageCalculator(object):
         else:
             talent_list = list
 
+        if processes is not None:
+            variants = [('talent', talent, self.get_talent_variant_value(talent)) for talent in talent_list]
+            for talent, (new_dps, failed) in zip(talent_list, self.get_variants_dps(variants, processes, catch_errors=True)):
+                if failed:
+                    talents_ranking[talent] = _('not implemented')
+                elif new_dps != baseline_dps:
+                    talents_ranking[talent] = abs(new_dps - baseline_dps)
+            talent_list = []
+
         for talent in talent_list:
             old_talent_value = getattr(self.talents, talent)
-            if old_talent_value == 0:
-                new_talent_value = 1
-            else:
-                new_talent_value = old_talent_value - 1
+            new_talent_value = self.get_talent_variant_value(talent)
 
             self.talents.treeForTalent[talent].set_talent(talent, new_talent_value)
             try:
@@ -242,11 +775,112 @@ class DamageCalculator(object):
 
         return main_tree_talents_ranking, off_trees_talents_ranking
 
+    @thaws_inputs
+    def get_report(self, sections=None, weapon_speeds=None, other_ep_list=(), glyphs_list=None, talents_list=None, processes=None):
+        # Several of the results above in one call, as a dict with an entry
+        # for each name in sections (see REPORT_SECTIONS; by default dps,
+        # breakdown and ep):
+        #     'dps': get_dps()
+        #     'breakdown': get_dps_breakdown()
+        #     'ep': get_ep()
+        #     'weapon_ep': {'mh': ..., 'oh': ...}, get_weapon_ep with weapon
+        #         dps, enchants and weapon_speeds
+        #     'other_ep': get_other_ep(other_ep_list)
+        #     'talents_ranking': {'main_tree': ..., 'off_trees': ...},
+        #         get_talents_ranking(talents_list, processes)
+        #     'glyphs_ranking': get_glyphs_ranking(glyphs_list, processes)
+        # The baseline dps, and the dps with a point more ap, are solved
+        # once and shared by every section, and the breakdown and ep solves
+        # start from the state the baseline converged to, as get_ep's do;
+        # results agree with the separate calls to within the solver's
+        # precision.
+        if sections is None:
+            sections = ('dps', 'breakdown', 'ep')
+        for section in sections:
+            if section not in self.REPORT_SECTIONS:
+                raise exceptions.InvalidInputException(_('Unknown report section {section}').format(section=section))
+
+        report = {}
+        ap_dps = None
+        self.converged_states = {}
+        try:
+            baseline_dps = self.get_dps()
+            if 'dps' in sections:
+                report['dps'] = baseline_dps
+            if 'breakdown' in sections:
+                report['breakdown'] = self.get_dps_breakdown()
+            # A batched get_ep works out its own; see get_ep.
+            if 'weapon_ep' in sections or 'other_ep' in sections or ('ep' in sections and arrays.numpy is None):
+                ap_dps = self.ep_helper('ap')
+            if 'ep' in sections:
+                report['ep'] = self.get_ep(baseline_dps=baseline_dps, ap_dps=ap_dps)
+        finally:
+            self.converged_states = None
+
+        # What's left changes more than a point of one stat, and compares
+        # against the baseline exactly, so it solves from scratch.
+        if 'weapon_ep' in sections:
+            mh_ep, oh_ep = self.get_weapon_ep(weapon_speeds, dps=True, enchants=True, baseline_dps=baseline_dps, ap_dps=ap_dps)
+            report['weapon_ep'] = {'mh': mh_ep, 'oh': oh_ep}
+        if 'other_ep' in sections:
+            report['other_ep'] = self.get_other_ep(other_ep_list, baseline_dps=baseline_dps, ap_dps=ap_dps)
+        if 'talents_ranking' in sections:
+            main_tree, off_trees = self.get_talents_ranking(talents_list, processes, baseline_dps=baseline_dps)
+            report['talents_ranking'] = {'main_tree': main_tree, 'off_trees': off_trees}
+        if 'glyphs_ranking' in sections:
+            report['glyphs_ranking'] = self.get_glyphs_ranking(glyphs_list, processes, baseline_dps=baseline_dps)
+
+        return report
+
+    def get_talent_variant_value(self, talent):
+        # The value get_talents_ranking compares a talent against: one point
+        # less, or one point for a talent with none.
+        old_talent_value = getattr(self.talents, talent)
+        if old_talent_value == 0:
+            return 1
+        return old_talent_value - 1
+
+    def get_variants_dps(self, variants, processes, catch_errors=False):
+        # Solves dps for a list of ('talent' or 'glyph', name, value)
+        # variants of this character across a pool of processes, returning a
+        # (dps, failed) pair per variant.  Each worker gets its own copy of
+        # this calculator and applies every variant to a fresh copy of that,
+        # so nothing shared is ever modified and the results are the ones
+        # the in-place serial rankings produce.  With catch_errors, a variant
+        # that raises comes back failed instead of aborting the whole run.
+        pool = worker_pool.start(processes, self)
+        try:
+            results = worker_pool.map_method(pool, 'get_variant_dps', [(variant, catch_errors) for variant in variants])
+        finally:
+            pool.terminate()
+            pool.join()
+        return results
+
+    def get_variant_dps(self, variant, catch_errors=False):
+        # get_variants_dps for one variant, on a copy of this calculator.
+        kind, name, value = variant
+        calculator = copy.deepcopy(self)
+        if kind == 'talent':
+            calculator.talents.treeForTalent[name].set_talent(name, value)
+        else:
+            setattr(calculator.glyphs, name, value)
+        try:
+            return calculator.get_dps(), False
+        except:
+            if not catch_errors:
+                raise
+            return None, True
+
     def get_dps(self):
         # Overwrite this function with your calculations/simulations/whatever;
         # this is what callers will (initially) be looking at.
         pass
 
+    def get_dps_breakdown(self):
+        # Overwrite this function to split get_dps up by damage source, as a
+        # dict of source name to dps; get_ep_breakdown needs it.
+        pass
+
     def get_spell_hit_from_talents(self):
         # Override this in your subclass to implement talents that modify spell hit chance
         return 0.
@@ -255,6 +889,17 @@ class DamageCalculator(object):
         # Override this in your subclass to implement talents that modify melee hit chance
         return 0.
 
+    def get_profession_stat_bonus(self, stat):
+        # Extra rating from profession perks, on top of the gear stats:
+        # mixology adds 80 agility to an agility flask and master of anatomy
+        # 80 crit rating.  Added when the stats are read rather than to
+        # self.stats, which may be shared by other calculators.
+        if stat == 'agi' and self.stats.gear_buffs.mixology and self.buffs.agi_flask:
+            return 80
+        if stat == 'crit' and self.stats.gear_buffs.master_of_anatomy:
+            return 80
+        return 0
+
     def get_all_activated_stat_boosts(self):
         racial_boosts = self.race.get_racial_stat_boosts()
         gear_boosts = self.stats.gear_buffs.get_all_activated_boosts()
@@ -270,22 +915,26 @@ class DamageCalculator(object):
 
     def melee_hit_chance(self, base_miss_chance, dodgeable, parryable, weapon_type):
         hit_chance = self.stats.get_melee_hit_from_rating() + self.race.get_racial_hit() + self.get_melee_hit_from_talents()
-        miss_chance = max(base_miss_chance - hit_chance,0)
+        miss_chance = arrays.maximum(base_miss_chance - hit_chance,0)
 
         #Expertise represented as the reduced chance to be dodged or parried, not true "Expertise"
         expertise = self.stats.get_expertise_from_rating() + self.race.get_racial_expertise(weapon_type)
 
         if dodgeable:
-            dodge_chance = max(self.BASE_DODGE_CHANCE - expertise, 0)
+            dodge_chance = arrays.maximum(self.BASE_DODGE_CHANCE - expertise, 0)
             if self.calculating_ep == 'dodge_exp':
                 dodge_chance += self.stats.get_expertise_from_rating(1)
+            elif self.ep_tangents is not None:
+                dodge_chance += self.stats.get_expertise_from_rating(self.ep_tangents['dodge_exp'])
         else:
             dodge_chance = 0
 
         if parryable:
-            parry_chance = max(self.BASE_PARRY_CHANCE - expertise, 0)
+            parry_chance = arrays.maximum(self.BASE_PARRY_CHANCE - expertise, 0)
             if self.calculating_ep in ('parry_exp', 'dodge_exp'):
                 parry_chance += self.stats.get_expertise_from_rating(1)
+            elif self.ep_tangents is not None:
+                parry_chance += self.stats.get_expertise_from_rating(self.ep_tangents['parry_exp'] + self.ep_tangents['dodge_exp'])
         else:
             parry_chance = 0
 
@@ -300,6 +949,8 @@ class DamageCalculator(object):
         hit_chance = self.melee_hit_chance(self.BASE_ONE_HAND_MISS_RATE, dodgeable, parryable, weapon.type)
         if self.calculating_ep == 'yellow_hit':
             hit_chance -= self.stats.get_melee_hit_from_rating(1)
+        elif self.ep_tangents is not None:
+            hit_chance -= self.stats.get_melee_hit_from_rating(self.ep_tangents['yellow_hit'])
         return hit_chance
 
     def off_hand_melee_hit_chance(self, dodgeable=True, parryable=False, weapon=None):
@@ -311,6 +962,8 @@ class DamageCalculator(object):
         hit_chance = self.melee_hit_chance(self.BASE_ONE_HAND_MISS_RATE, dodgeable, parryable, weapon.type)
         if self.calculating_ep == 'yellow_hit':
             hit_chance -= self.stats.get_melee_hit_from_rating(1)
+        elif self.ep_tangents is not None:
+            hit_chance -= self.stats.get_melee_hit_from_rating(self.ep_tangents['yellow_hit'])
         return hit_chance
 
     def dual_wield_mh_hit_chance(self, dodgeable=True, parryable=False):
@@ -329,12 +982,16 @@ class DamageCalculator(object):
         hit_chance = self.melee_hit_chance(self.BASE_DW_MISS_RATE, dodgeable, parryable, weapon_type)
         if self.calculating_ep in ('yellow_hit','spell_hit','white_hit'):
             hit_chance -= self.stats.get_melee_hit_from_rating(1)
+        elif self.ep_tangents is not None:
+            hit_chance -= self.stats.get_melee_hit_from_rating(self.ep_tangents['yellow_hit'] + self.ep_tangents['spell_hit'] + self.ep_tangents['white_hit'])
         return hit_chance
 
     def spell_hit_chance(self):
-        hit_chance = 1 - max(self.BASE_SPELL_MISS_RATE - self.stats.get_spell_hit_from_rating() - self.get_spell_hit_from_talents() - self.race.get_racial_hit(), 0)
+        hit_chance = 1 - arrays.maximum(self.BASE_SPELL_MISS_RATE - self.stats.get_spell_hit_from_rating() - self.get_spell_hit_from_talents() - self.race.get_racial_hit(), 0)
         if self.calculating_ep in ('yellow_hit', 'spell_hit'):
             hit_chance -= self.stats.get_spell_hit_from_rating(1)
+        elif self.ep_tangents is not None:
+            hit_chance -= self.stats.get_spell_hit_from_rating(self.ep_tangents['yellow_hit'] + self.ep_tangents['spell_hit'])
         return hit_chance
 
     def buff_melee_crit(self):
@@ -353,6 +1010,13 @@ class DamageCalculator(object):
         # This function wraps spell, bleed and physical debuffs from raid
         # along with all-damage buff and armor reduction. It should be called
         # from every damage dealing formula. Armor can be overridden if needed.
+        table = self.get_modifier_table().raid_settings_modifiers
+        key = (is_spell, is_physical, is_bleed, armor)
+        if key not in table:
+            table[key] = self.compile_raid_settings_modifiers(is_spell, is_physical, is_bleed, armor)
+        return table[key]
+
+    def compile_raid_settings_modifiers(self, is_spell, is_physical, is_bleed, armor):
         if is_spell + is_bleed + is_physical != 1:
             raise exceptions.InvalidInputException(_('Attacks cannot benefit from more than one type of raid damage multiplier'))
         armor_override = self.target_armor(armor)
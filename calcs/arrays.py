@@ -0,0 +1,84 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# With NumPy installed, a batch of characters that differ only in their
+# rating stats (see DamageCalculator.get_dps_batch) is worked out in one pass
+# through the model, with each of those stats an array holding one entry per
+# character.  The formulas are plain arithmetic, which arrays handle as they
+# are; these stand in for the few places the model branches on a value that
+# depends on the stats, and pick element by element for arrays.  Anything
+# else - floats, dual numbers - gets exactly what the builtins give.
+
+def is_array(value):
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
+
+def minimum(a, b):
+    if is_array(a) or is_array(b):
+        return numpy.minimum(a, b)
+    return min(a, b)
+
+
+def maximum(a, b):
+    if is_array(a) or is_array(b):
+        return numpy.maximum(a, b)
+    return max(a, b)
+
+
+def where(condition, if_true, if_false):
+    # if_true where condition holds, and if_false where it doesn't.
+    if is_array(condition):
+        return numpy.where(condition, if_true, if_false)
+    if condition:
+        return if_true
+    return if_false
+
+
+def is_nonzero(value):
+    # Whether value isn't 0 for some character; abilities and procs a cycle
+    # uses at all are worked out for every one of them.
+    if is_array(value):
+        return bool(value.any())
+    return value != 0
+
+
+def get_max(value):
+    # The largest entry of an array, or value itself.
+    if is_array(value):
+        return value.max()
+    return value
+
+
+def get_size(values):
+    # How many characters the batch any of values belongs to holds, or None
+    # if none of them is an array.
+    for value in values:
+        if is_array(value):
+            return len(value)
+    return None
+
+
+def get_key(value):
+    # value in a form that can go in a cache key; arrays aren't hashable.
+    if is_array(value):
+        return tuple(value.tolist())
+    return value
+
+
+def get_column(values):
+    # values as an array of floats for a batch.  It's read-only: the model
+    # puts the same stat value in several places, so an array changed in
+    # place would change all of them.
+    column = numpy.array(values, dtype=float)
+    column.flags.writeable = False
+    return column
+
+
+def get_row(value, row):
+    # One character's value out of a batch's result; values that came out
+    # the same for all of them aren't arrays.
+    if is_array(value):
+        return float(value[row])
+    return value
@@ -0,0 +1,144 @@
+import math
+
+class DualNumber(object):
+    # A value carried together with its partial derivatives with respect to
+    # any number of named inputs.  Feeding these through the damage model in
+    # place of plain numbers differentiates it in forward mode: every
+    # arithmetic operation applies the chain rule to the partials as it goes,
+    # so one evaluation yields the result and all of its derivatives.
+    #
+    # Comparisons (and therefore min, max and the various caps in the model)
+    # only look at the value; the derivative of whichever branch is taken is
+    # the one that survives, which is the one-sided derivative at a cap.
+    #
+    # Partials dicts are never modified once a DualNumber is built, so they
+    # can be shared between results.
+
+    __slots__ = ('value', 'partials')
+
+    def __init__(self, value, partials=None):
+        self.value = value
+        if partials is None:
+            partials = {}
+        self.partials = partials
+
+    def partial(self, name):
+        return self.partials.get(name, 0.)
+
+    def __repr__(self):
+        return 'DualNumber(%r, %r)' % (self.value, self.partials)
+
+    def _scaled_partials(self, factor):
+        return dict((name, factor * value) for name, value in self.partials.iteritems())
+
+    def _combined_partials(self, self_factor, other, other_factor):
+        # self_factor * self.partials + other_factor * other.partials
+        partials = self._scaled_partials(self_factor)
+        for name, value in other.partials.iteritems():
+            partials[name] = partials.get(name, 0.) + other_factor * value
+        return partials
+
+    def __add__(self, other):
+        if isinstance(other, DualNumber):
+            return DualNumber(self.value + other.value, self._combined_partials(1, other, 1))
+        return DualNumber(self.value + other, self.partials)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, DualNumber):
+            return DualNumber(self.value - other.value, self._combined_partials(1, other, -1))
+        return DualNumber(self.value - other, self.partials)
+
+    def __rsub__(self, other):
+        return DualNumber(other - self.value, self._scaled_partials(-1))
+
+    def __mul__(self, other):
+        if isinstance(other, DualNumber):
+            return DualNumber(self.value * other.value, self._combined_partials(other.value, other, self.value))
+        return DualNumber(self.value * other, self._scaled_partials(other))
+
+    __rmul__ = __mul__
+
+    def __div__(self, other):
+        if isinstance(other, DualNumber):
+            quotient = self.value / other.value
+            return DualNumber(quotient, self._combined_partials(1. / other.value, other, -quotient / other.value))
+        return DualNumber(self.value / other, self._scaled_partials(1. / other))
+
+    __truediv__ = __div__
+
+    def __rdiv__(self, other):
+        quotient = other / self.value
+        return DualNumber(quotient, self._scaled_partials(-quotient / self.value))
+
+    __rtruediv__ = __rdiv__
+
+    def __pow__(self, other):
+        if isinstance(other, DualNumber):
+            # d(a ** b) = a ** b * (b' * ln(a) + b * a' / a)
+            power = self.value ** other.value
+            return DualNumber(power, self._combined_partials(power * other.value / self.value, other, power * math.log(self.value)))
+        if other == 0:
+            return DualNumber(1., {})
+        return DualNumber(self.value ** other, self._scaled_partials(other * self.value ** (other - 1)))
+
+    def __rpow__(self, other):
+        power = other ** self.value
+        return DualNumber(power, self._scaled_partials(power * math.log(other)))
+
+    def __neg__(self):
+        return DualNumber(-self.value, self._scaled_partials(-1))
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        if self.value < 0:
+            return -self
+        return self
+
+    def __nonzero__(self):
+        return bool(self.value)
+
+    def _other_value(self, other):
+        if isinstance(other, DualNumber):
+            return other.value
+        return other
+
+    def __eq__(self, other):
+        if not isinstance(other, (DualNumber, int, long, float)):
+            return NotImplemented
+        return self.value == self._other_value(other)
+
+    def __ne__(self, other):
+        if not isinstance(other, (DualNumber, int, long, float)):
+            return NotImplemented
+        return self.value != self._other_value(other)
+
+    def __lt__(self, other):
+        return self.value < self._other_value(other)
+
+    def __le__(self, other):
+        return self.value <= self._other_value(other)
+
+    def __gt__(self, other):
+        return self.value > self._other_value(other)
+
+    def __ge__(self, other):
+        return self.value >= self._other_value(other)
+
+    __hash__ = None
+
+
+def value_of(number):
+    # Plain numbers pass through unchanged.
+    if isinstance(number, DualNumber):
+        return number.value
+    return number
+
+def partial_of(number, name):
+    # A plain number does not depend on anything.
+    if isinstance(number, DualNumber):
+        return number.partial(name)
+    return 0.
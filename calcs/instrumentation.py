@@ -0,0 +1,157 @@
+import functools
+import json
+import timeit
+
+from calcs import dual_number
+
+# What a calculator spent its time on: wall time and calls per phase of the
+# model, calls to each ability damage function, every fixed point solve and
+# hits on the caches along the way.  Calculators only carry one of these
+# while instrumented (see DamageCalculator.instrument), and instrumenting
+# works by putting timing and counting wrappers on the calculator in front
+# of its own methods, so the model's code is the same either way and an
+# uninstrumented calculator pays nothing for it.
+#
+# Phase times include the time spent in any phases they call: proc uptime
+# updates happen inside compute_damage, for instance, and are counted in
+# both.
+
+
+class Instrumentation(object):
+    def __init__(self, caches=None):
+        # caches maps a name to a core.lru_cache.LRUCache to report the hits
+        # on.  These are generally shared by every calculator in the
+        # process, so hits include those of any other calculator working at
+        # the same time.
+        if caches is None:
+            caches = {}
+        self.caches = caches
+        # Names of the methods wrapped on the calculator.
+        self.wrapped = []
+        self.reset()
+
+    def reset(self):
+        # Starts counting from nothing again.
+        self.phases = {}
+        self.ability_calls = {}
+        self.solves = []
+        self.table_lookups = {}
+        self.table_misses = {}
+        self.cache_baselines = dict((name, (cache.hits, cache.misses)) for name, cache in self.caches.iteritems())
+
+    def timed(self, phase, method):
+        # method, adding its wall time and calls to phase.
+        @functools.wraps(method)
+        def timed_method(*args, **kwargs):
+            start = timeit.default_timer()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                totals = self.phases.setdefault(phase, [0, 0.])
+                totals[0] += 1
+                totals[1] += timeit.default_timer() - start
+        return timed_method
+
+    def counted(self, counts_name, name, method):
+        # method, counting its calls under name in the dict called
+        # counts_name.
+        @functools.wraps(method)
+        def counted_method(*args, **kwargs):
+            counts = getattr(self, counts_name)
+            counts[name] = counts.get(name, 0) + 1
+            return method(*args, **kwargs)
+        return counted_method
+
+    def solving(self, calculator, method):
+        # compute_damage, recording the ConvergenceReport of every solve.
+        @functools.wraps(method)
+        def solving_method(attack_counts_function, *args):
+            name = attack_counts_function.__name__
+            old_report = calculator.convergence_reports.get(name)
+            try:
+                return method(attack_counts_function, *args)
+            finally:
+                report = calculator.convergence_reports.get(name)
+                if report is not None and report is not old_report:
+                    self.solves.append((name, report))
+        return solving_method
+
+    def get_iterations(self):
+        return sum([report.iterations for name, report in self.solves])
+
+    def get_cache_stats(self):
+        # {cache: {'hits': ..., 'misses': ...}} since the last reset, for the
+        # shared caches and the calculator's modifier tables alike.
+        stats = {}
+        for name, cache in self.caches.iteritems():
+            hits, misses = self.cache_baselines[name]
+            stats[name] = {'hits': cache.hits - hits, 'misses': cache.misses - misses}
+        for name, lookups in self.table_lookups.iteritems():
+            misses = self.table_misses.get(name, 0)
+            stats[name] = {'hits': lookups - misses, 'misses': misses}
+        return stats
+
+    def as_dict(self):
+        phases = {}
+        for phase, (calls, seconds) in self.phases.iteritems():
+            phases[phase] = {'calls': calls, 'seconds': seconds}
+        solves = []
+        for name, report in self.solves:
+            solves.append({
+                'function': name,
+                'solver': report.solver,
+                'iterations': report.iterations,
+                'converged': report.converged,
+                'residual': dual_number.value_of(report.residual)
+            })
+        return {
+            'phases': phases,
+            'ability_calls': dict(self.ability_calls),
+            'solves': solves,
+            'iterations': self.get_iterations(),
+            'caches': self.get_cache_stats()
+        }
+
+    def to_json(self):
+        return json.dumps(self.as_dict(), sort_keys=True)
+
+    def to_prometheus(self, prefix='shadowcraft'):
+        # The Prometheus text exposition format.
+        data = self.as_dict()
+        solve_totals = {}
+        for solve in data['solves']:
+            totals = solve_totals.setdefault(solve['function'], {'solves': 0, 'iterations': 0, 'unconverged': 0})
+            totals['solves'] += 1
+            totals['iterations'] += solve['iterations']
+            totals['unconverged'] += not solve['converged']
+            totals['residual'] = solve['residual']
+
+        metrics = [
+            ('phase_seconds_total', 'counter', 'Wall time spent in each phase of the model.',
+                'phase', dict((phase, values['seconds']) for phase, values in data['phases'].iteritems())),
+            ('phase_calls_total', 'counter', 'Calls to each phase of the model.',
+                'phase', dict((phase, values['calls']) for phase, values in data['phases'].iteritems())),
+            ('ability_damage_calls_total', 'counter', 'Calls to each ability damage function.',
+                'ability', data['ability_calls']),
+            ('solves_total', 'counter', 'Fixed point solves for each attack counts function.',
+                'function', dict((name, totals['solves']) for name, totals in solve_totals.iteritems())),
+            ('solver_iterations_total', 'counter', 'Fixed point iterations for each attack counts function.',
+                'function', dict((name, totals['iterations']) for name, totals in solve_totals.iteritems())),
+            ('solver_unconverged_total', 'counter', 'Solves that ran out of iterations.',
+                'function', dict((name, totals['unconverged']) for name, totals in solve_totals.iteritems())),
+            ('solver_residual', 'gauge', 'Residual of the latest solve for each attack counts function.',
+                'function', dict((name, totals['residual']) for name, totals in solve_totals.iteritems())),
+            ('cache_hits_total', 'counter', 'Cache lookups that found an entry.',
+                'cache', dict((name, values['hits']) for name, values in data['caches'].iteritems())),
+            ('cache_misses_total', 'counter', 'Cache lookups that did not.',
+                'cache', dict((name, values['misses']) for name, values in data['caches'].iteritems()))
+        ]
+
+        lines = []
+        for name, metric_type, help_text, label, values in metrics:
+            name = prefix + '_' + name
+            lines.append('# HELP %s %s' % (name, help_text))
+            lines.append('# TYPE %s %s' % (name, metric_type))
+            for key in sorted(values):
+                lines.append('%s{%s="%s"} %r' % (name, label, key, values[key]))
+        return '\n'.join(lines) + '\n'
@@ -1,10 +1,15 @@
 import gettext
 import __builtin__
 
-__builtin__._ = gettext.gettext
+if not callable(getattr(__builtin__, '_', None)):
+    __builtin__._ = gettext.gettext
 
+from calcs import arrays
+from calcs import solvers
 from calcs.rogue import RogueDamageCalculator
+from calcs.rogue.Aldriana import ledger
 from core import exceptions
+from core import lru_cache
 
 
 class InputNotModeledException(exceptions.InvalidInputException):
@@ -46,18 +51,39 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
 
     PRECISION_REQUIRED = 10 ** -7
 
-    def are_close_enough(self, old_dist, new_dist):
-        for item in new_dist.keys():
-            if item not in old_dist:
-                return False
-            elif not hasattr(new_dist[item], '__iter__'):
-                if abs(new_dist[item] - old_dist[item]) > self.PRECISION_REQUIRED:
-                    return False
-            else:
-                for index in range(len(new_dist[item])):
-                    if abs(new_dist[item][index] - old_dist[item][index]) > self.PRECISION_REQUIRED:
-                        return False
-        return True
+    # See DamageCalculator.instrument.
+    INSTRUMENTED_PHASES = {
+        'set_constants': 'set_constants',
+        'compute_damage': 'compute_damage',
+        'assassination_attack_counts_mutilate': 'attack_counts',
+        'assassination_attack_counts_backstab': 'attack_counts',
+        'combat_attack_counts': 'attack_counts',
+        'subtlety_attack_counts_backstab': 'attack_counts',
+        'get_uptime': 'proc_uptime',
+        'update_with_damaging_proc': 'proc_uptime',
+        'update_crit_rates_for_4pc_t11': 'proc_uptime',
+        'get_cp_distribution_for_cycle': 'cp_distribution',
+        # Turning converged counts into damage, as a breakdown or a total.
+        'get_damage_breakdown': 'get_damage_breakdown',
+        'get_damage_total': 'get_damage_breakdown'
+    }
+    INSTRUMENTED_CACHES = ('cp_distribution_tables', 'cp_distributions')
+
+    def get_max_difference(self, old_counts, new_counts):
+        # The largest change in any frequency between two ledgers (see
+        # calcs.rogue.Aldriana.ledger), as are_close_enough measures it.
+        return new_counts.get_max_difference(old_counts)
+
+    def are_close_enough(self, old_counts, new_counts):
+        return new_counts.is_close_to(old_counts, self.PRECISION_REQUIRED)
+
+    def apply_multipliers(self, damage_breakdown, multipliers):
+        # Multiplies each source in damage_breakdown by the multipliers, as
+        # the get_*_multipliers functions give them.
+        multipliers, default_multiplier = multipliers
+        for key in damage_breakdown:
+            damage_breakdown[key] *= multipliers.get(key, default_multiplier)
+        return damage_breakdown
 
     def get_dps_contribution(self, damage_tuple, crit_rate, frequency):
         (base_damage, crit_damage) = damage_tuple
@@ -85,33 +111,105 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
         # Just average-casing for now.  Should fix that at some point.
         return 1 + .3 * self.heroism_uptime_per_fight()
 
+    # Tables for get_cp_distribution_for_cycle, and the distributions they
+    # have been evaluated to, shared by every calculator in the process; see
+    # get_cp_distribution_table.
+    cp_distribution_tables = lru_cache.LRUCache(64)
+    cp_distributions = lru_cache.LRUCache(1024)
+
     def get_cp_distribution_for_cycle(self, cp_distribution_per_move, target_cp_quantity):
-        cur_min_cp = 0
+        # Returns {(cps, moves): probability} for building up to at least
+        # target_cp_quantity combo points with moves that each give the combo
+        # points in cp_distribution_per_move with the probabilities there.
         ruthlessness_chance = self.talents.ruthlessness * .2
-        cur_dist = {(0, 0): (1-ruthlessness_chance), (1, 0): ruthlessness_chance}
+        move_cps = tuple(sorted(cp_distribution_per_move.keys()))
+        key = (move_cps, target_cp_quantity, ruthlessness_chance)
+
+        # Probabilities that don't depend on crit (combat's) come round with
+        # every iteration and every solve, so remember the distributions too.
+        # Batches (see calcs.arrays) are keyed on their entries; dual numbers
+        # (see get_ep_breakdown) aren't hashable and skip this.
+        distribution_key = (key, tuple([arrays.get_key(cp_distribution_per_move[move_cp]) for move_cp in move_cps]))
+        try:
+            cur_dist = self.cp_distributions.get(distribution_key)
+        except TypeError:
+            distribution_key = None
+            cur_dist = None
+        if cur_dist is not None:
+            return cur_dist.copy()
+
+        table = self.cp_distribution_tables.get(key)
+        if table is None:
+            table = self.get_cp_distribution_table(move_cps, target_cp_quantity, ruthlessness_chance)
+            self.cp_distribution_tables[key] = table
+
+        max_exponent, entries = table
+        powers = []
+        for move_cp in move_cps:
+            move_prob = cp_distribution_per_move[move_cp]
+            move_powers = [1, move_prob]
+            for exponent in xrange(2, max_exponent + 1):
+                move_powers.append(move_powers[-1] * move_prob)
+            powers.append(move_powers)
+
+        cur_dist = {}
+        for entry, terms in entries:
+            prob = 0
+            for coefficient, exponents in terms:
+                for index, exponent in exponents:
+                    coefficient = coefficient * powers[index][exponent]
+                prob += coefficient
+            cur_dist[entry] = prob
+
+        if distribution_key is not None:
+            self.cp_distributions[distribution_key] = cur_dist.copy()
+        return cur_dist
+
+    def get_cp_distribution_table(self, move_cps, target_cp_quantity, ruthlessness_chance):
+        # The probability of finishing at each (cps, moves) is a polynomial in
+        # the per-move probabilities, and which polynomial depends only on the
+        # combo points a move can give, the target and ruthlessness - not on
+        # the probabilities themselves, which move with crit rate (seal fate)
+        # on every iteration of compute_damage.  So we expand the build-up
+        # once, with each probability kept as a product of powers of the
+        # per-move probabilities, and get_cp_distribution_for_cycle only has
+        # to evaluate the result.
+        #
+        # Returns the highest power needed and a list of ((cps, moves), terms)
+        # entries, terms being (coefficient, ((move index, power), ...)) pairs.
+        no_moves = (0,) * len(move_cps)
+        cur_min_cp = 0
+        cur_dist = {(0, 0): {no_moves: 1 - ruthlessness_chance}, (1, 0): {no_moves: ruthlessness_chance}}
         while cur_min_cp < target_cp_quantity:
             cur_min_cp += 1
 
             new_dist = {}
-            for (cps, moves), prob in cur_dist.items():
+            for (cps, moves), terms in cur_dist.items():
                 if cps >= cur_min_cp:
-                    if (cps, moves) in new_dist:
-                        new_dist[(cps, moves)] += prob
-                    else:
-                        new_dist[(cps, moves)] = prob
+                    new_terms = new_dist.setdefault((cps, moves), {})
+                    for exponents, coefficient in terms.items():
+                        new_terms[exponents] = new_terms.get(exponents, 0) + coefficient
                 else:
-                    for (move_cp, move_prob) in cp_distribution_per_move.items():
+                    for index, move_cp in enumerate(move_cps):
                         total_cps = cps + move_cp
                         if total_cps > 5:
                             total_cps = 5
-                        dist_entry = (total_cps, moves + 1)
-                        if dist_entry in new_dist:
-                            new_dist[dist_entry] += move_prob * prob
-                        else:
-                            new_dist[dist_entry] = move_prob * prob
+                        new_terms = new_dist.setdefault((total_cps, moves + 1), {})
+                        for exponents, coefficient in terms.items():
+                            exponents = exponents[:index] + (exponents[index] + 1,) + exponents[index + 1:]
+                            new_terms[exponents] = new_terms.get(exponents, 0) + coefficient
             cur_dist = new_dist
 
-        return cur_dist
+        max_exponent = 0
+        entries = []
+        for entry, terms in cur_dist.items():
+            table_terms = []
+            for exponents, coefficient in terms.items():
+                table_terms.append((coefficient, tuple([(index, exponent) for index, exponent in enumerate(exponents) if exponent])))
+                max_exponent = max([max_exponent] + list(exponents))
+            entries.append((entry, table_terms))
+
+        return max_exponent, entries
 
     def get_snd_length(self, size):
         duration = 6 + 3 * size
@@ -128,23 +226,23 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
             self.bonus_energy_regen += 15. / (120 + self.settings.response_time)
 
         self.base_stats = {
-            'agi': self.stats.agi + self.buffs.buff_agi() + self.race.racial_agi,
+            'agi': self.stats.agi + self.get_profession_stat_bonus('agi') + self.buffs.buff_agi() + self.race.racial_agi,
             'ap': self.stats.ap + 140,
-            'crit': self.stats.crit,
+            'crit': self.stats.crit + self.get_profession_stat_bonus('crit'),
             'haste': self.stats.haste,
             'mastery': self.stats.mastery
         }
 
         for boost in self.race.get_racial_stat_boosts():
             if boost['stat'] in self.base_stats:
-                self.base_stats[boost['stat']] += boost['value'] * boost['duration'] * 1.0 / (boost['cooldown'] + self.settings.response_time)
+                self.base_stats[boost['stat']] = self.base_stats[boost['stat']] + boost['value'] * boost['duration'] * 1.0 / (boost['cooldown'] + self.settings.response_time)
 
         for stat in self.base_stats:
             for boost in self.stats.gear_buffs.get_all_activated_boosts_for_stat(stat):
                 if boost['cooldown'] is not None:
-                    self.base_stats[stat] += (boost['value'] * boost['duration']) * 1.0 / (boost['cooldown'] + self.settings.response_time)
+                    self.base_stats[stat] = self.base_stats[stat] + (boost['value'] * boost['duration']) * 1.0 / (boost['cooldown'] + self.settings.response_time)
                 else:
-                    self.base_stats[stat] += (boost['value'] * boost['duration']) * 1.0 / self.settings.duration
+                    self.base_stats[stat] = self.base_stats[stat] + (boost['value'] * boost['duration']) * 1.0 / self.settings.duration
 
         self.agi_multiplier = self.buffs.stat_multiplier() * self.stats.gear_buffs.leather_specialization_multiplier()
 
@@ -160,6 +258,12 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
             self.base_speed_multiplier *= 1.01
 
         self.strike_hit_chance = self.one_hand_melee_hit_chance()
+        # The other hit chances the cycles use; like strike_hit_chance, they
+        # depend on nothing the fixed point loop changes.
+        self.mh_autoattack_hit_chance = self.dual_wield_mh_hit_chance()
+        self.oh_autoattack_hit_chance = self.dual_wield_oh_hit_chance()
+        self.oh_strike_hit_chance = self.off_hand_melee_hit_chance()
+        self.poison_hit_chance = self.spell_hit_chance()
         self.base_rupture_energy_cost = 20 + 5 / self.strike_hit_chance
         self.base_eviscerate_energy_cost = 28 + 7 / self.strike_hit_chance
 
@@ -186,7 +290,20 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
 
         return base_damage * (1 + crit_rate * (crit_multiplier - 1)) / (120 + self.settings.response_time)
 
-    def get_damage_breakdown(self, current_stats, attacks_per_second, crit_rates, damage_procs):
+    def get_damage_breakdown(self, current_stats, counts, damage_procs):
+        return dict(self.get_damage_sources(current_stats, counts, damage_procs))
+
+    def get_damage_total(self, current_stats, counts, damage_procs, multipliers, default_multiplier):
+        # The sum of get_damage_breakdown, with each source multiplied by
+        # its entry in multipliers or by default_multiplier, without building
+        # the breakdown.
+        total = 0
+        for source, dps in self.get_damage_sources(current_stats, counts, damage_procs):
+            total += dps * multipliers.get(source, default_multiplier)
+        return total
+
+    def get_damage_sources(self, current_stats, counts, damage_procs):
+        # Yields (source, dps) for every source of damage, once each.
         # Vendetta may want to be handled elsewhere.
         average_ap = current_stats['ap'] + 2 * current_stats['agi'] + self.base_strength
         average_ap *= self.buffs.attack_power_multiplier()
@@ -194,152 +311,189 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
             average_ap *= 1.2
         average_ap *= (1 + .01 * self.talents.savage_combat)
 
-        damage_breakdown = {}
-
+        rates = counts.rates
+        crit_rates = counts.crit_rates
         (mh_base_damage, mh_crit_damage) = self.mh_damage(average_ap)
-        mh_hit_rate = self.dual_wield_mh_hit_chance() - self.GLANCE_RATE - crit_rates['mh_autoattacks']
-        average_mh_hit = self.GLANCE_RATE * self.GLANCE_MULTIPLIER * mh_base_damage + mh_hit_rate * mh_base_damage + crit_rates['mh_autoattacks'] * mh_crit_damage
-        mh_dps = average_mh_hit * attacks_per_second['mh_autoattacks']
+        mh_hit_rate = self.mh_autoattack_hit_chance - self.GLANCE_RATE - crit_rates[ledger.MH_AUTOATTACKS]
+        average_mh_hit = self.GLANCE_RATE * self.GLANCE_MULTIPLIER * mh_base_damage + mh_hit_rate * mh_base_damage + crit_rates[ledger.MH_AUTOATTACKS] * mh_crit_damage
+        mh_dps = average_mh_hit * rates[ledger.MH_AUTOATTACKS]
 
         (oh_base_damage, oh_crit_damage) = self.oh_damage(average_ap)
-        oh_hit_rate = self.dual_wield_oh_hit_chance() - self.GLANCE_RATE - crit_rates['oh_autoattacks']
-        average_oh_hit = self.GLANCE_RATE * self.GLANCE_MULTIPLIER * oh_base_damage + oh_hit_rate * oh_base_damage + crit_rates['oh_autoattacks'] * oh_crit_damage
-        oh_dps = average_oh_hit * attacks_per_second['oh_autoattacks']
+        oh_hit_rate = self.oh_autoattack_hit_chance - self.GLANCE_RATE - crit_rates[ledger.OH_AUTOATTACKS]
+        average_oh_hit = self.GLANCE_RATE * self.GLANCE_MULTIPLIER * oh_base_damage + oh_hit_rate * oh_base_damage + crit_rates[ledger.OH_AUTOATTACKS] * oh_crit_damage
+        oh_dps = average_oh_hit * rates[ledger.OH_AUTOATTACKS]
 
-        damage_breakdown['autoattack'] = mh_dps + oh_dps
+        yield 'autoattack', mh_dps + oh_dps
 
-        for key in attacks_per_second.keys():
-            if not attacks_per_second[key]:
-                del attacks_per_second[key]
+        # Abilities that don't happen are left out, as are finishers at
+        # combo point counts the cycle never uses.
+        if arrays.is_nonzero(rates[ledger.MUTILATE]):
+            mh_mutilate_dps = self.get_dps_contribution(self.mh_mutilate_damage(average_ap), crit_rates[ledger.MUTILATE], rates[ledger.MUTILATE])
+            oh_mutilate_dps = self.get_dps_contribution(self.oh_mutilate_damage(average_ap), crit_rates[ledger.MUTILATE], rates[ledger.MUTILATE])
+            yield 'mutilate', mh_mutilate_dps + oh_mutilate_dps
 
-        if 'mutilate' in attacks_per_second:
-            mh_mutilate_dps = self.get_dps_contribution(self.mh_mutilate_damage(average_ap), crit_rates['mutilate'], attacks_per_second['mutilate'])
-            oh_mutilate_dps = self.get_dps_contribution(self.oh_mutilate_damage(average_ap), crit_rates['mutilate'], attacks_per_second['mutilate'])
-            damage_breakdown['mutilate'] = mh_mutilate_dps + oh_mutilate_dps
+        if arrays.is_nonzero(rates[ledger.HEMORRHAGE]):
+            yield 'hemorrhage', self.get_dps_contribution(self.hemorrhage_damage(average_ap), crit_rates[ledger.HEMORRHAGE], rates[ledger.HEMORRHAGE])
 
-        if 'hemorrhage' in attacks_per_second:
-            damage_breakdown['hemorrhage'] = self.get_dps_contribution(self.hemorrhage_damage(average_ap), crit_rates['hemorrhage'], attacks_per_second['hemorrhage'])
+        if arrays.is_nonzero(rates[ledger.BACKSTAB]):
+            yield 'backstab', self.get_dps_contribution(self.backstab_damage(average_ap), crit_rates[ledger.BACKSTAB], rates[ledger.BACKSTAB])
 
-        if 'backstab' in attacks_per_second:
-            damage_breakdown['backstab'] = self.get_dps_contribution(self.backstab_damage(average_ap), crit_rates['backstab'], attacks_per_second['backstab'])
+        if arrays.is_nonzero(rates[ledger.SINISTER_STRIKE]):
+            yield 'sinister_strike', self.get_dps_contribution(self.sinister_strike_damage(average_ap), crit_rates[ledger.SINISTER_STRIKE], rates[ledger.SINISTER_STRIKE])
 
-        if 'sinister_strike' in attacks_per_second:
-            damage_breakdown['sinister_strike'] = self.get_dps_contribution(self.sinister_strike_damage(average_ap), crit_rates['sinister_strike'], attacks_per_second['sinister_strike'])
+        if arrays.is_nonzero(rates[ledger.REVEALING_STRIKE]):
+            yield 'revealing_strike', self.get_dps_contribution(self.revealing_strike_damage(average_ap), crit_rates[ledger.REVEALING_STRIKE], rates[ledger.REVEALING_STRIKE])
 
-        if 'revealing_strike' in attacks_per_second:
-            damage_breakdown['revealing_strike'] = self.get_dps_contribution(self.revealing_strike_damage(average_ap), crit_rates['revealing_strike'], attacks_per_second['revealing_strike'])
+        if arrays.is_nonzero(rates[ledger.MAIN_GAUCHE]):
+            yield 'main_gauche', self.get_dps_contribution(self.main_gauche_damage(average_ap), crit_rates[ledger.MAIN_GAUCHE], rates[ledger.MAIN_GAUCHE])
 
-        if 'main_gauche' in attacks_per_second:
-            damage_breakdown['main_gauche'] = self.get_dps_contribution(self.main_gauche_damage(average_ap), crit_rates['main_gauche'], attacks_per_second['main_gauche'])
+        if arrays.is_nonzero(rates[ledger.AMBUSH]):
+            yield 'ambush', self.get_dps_contribution(self.ambush_damage(average_ap), crit_rates[ledger.AMBUSH], rates[ledger.AMBUSH])
 
-        if 'ambush' in attacks_per_second:
-            damage_breakdown['ambush'] = self.get_dps_contribution(self.ambush_damage(average_ap), crit_rates['ambush'], attacks_per_second['ambush'])
+        if arrays.is_nonzero(rates[ledger.MH_KILLING_SPREE]):
+            yield 'killing_spree', (self.get_dps_contribution(self.mh_killing_spree_damage(average_ap), crit_rates[ledger.MH_KILLING_SPREE], rates[ledger.MH_KILLING_SPREE]) +
+                                    self.get_dps_contribution(self.oh_killing_spree_damage(average_ap), crit_rates[ledger.OH_KILLING_SPREE], rates[ledger.OH_KILLING_SPREE]))
 
-        if 'mh_killing_spree' in attacks_per_second:
-            damage_breakdown['killing_spree'] = (self.get_dps_contribution(self.mh_killing_spree_damage(average_ap), crit_rates['mh_killing_spree'], attacks_per_second['mh_killing_spree']) +
-                                                 self.get_dps_contribution(self.oh_killing_spree_damage(average_ap), crit_rates['oh_killing_spree'], attacks_per_second['oh_killing_spree']))
-
-        if 'rupture_ticks' in attacks_per_second:
-            damage_breakdown['rupture'] = 0
+        if counts.has_finisher(ledger.RUPTURE_TICKS):
+            rupture_ticks = counts.get_finisher_rates(ledger.RUPTURE_TICKS)
+            rupture_dps = 0
             for i in xrange(1, 6):
-                damage_breakdown['rupture'] += self.get_dps_contribution(self.rupture_tick_damage(average_ap, i), crit_rates['rupture_ticks'], attacks_per_second['rupture_ticks'][i])
+                if arrays.is_nonzero(rupture_ticks[i]):
+                    rupture_dps += self.get_dps_contribution(self.rupture_tick_damage(average_ap, i), crit_rates[ledger.RUPTURE_TICKS], rupture_ticks[i])
+            yield 'rupture', rupture_dps
 
-        if 'envenom' in attacks_per_second:
-            damage_breakdown['envenom'] = 0
+        if counts.has_finisher(ledger.ENVENOM):
+            envenoms = counts.get_finisher_rates(ledger.ENVENOM)
+            envenom_dps = 0
             for i in xrange(1, 6):
-                damage_breakdown['envenom'] += self.get_dps_contribution(self.envenom_damage(average_ap, i, current_stats['mastery']), crit_rates['envenom'], attacks_per_second['envenom'][i])
+                if arrays.is_nonzero(envenoms[i]):
+                    envenom_dps += self.get_dps_contribution(self.envenom_damage(average_ap, i, current_stats['mastery']), crit_rates[ledger.ENVENOM], envenoms[i])
+            yield 'envenom', envenom_dps
 
-        if 'eviscerate' in attacks_per_second:
-            damage_breakdown['eviscerate'] = 0
+        if counts.has_finisher(ledger.EVISCERATE):
+            eviscerates = counts.get_finisher_rates(ledger.EVISCERATE)
+            eviscerate_dps = 0
             for i in xrange(1, 6):
-                damage_breakdown['eviscerate'] += self.get_dps_contribution(self.eviscerate_damage(average_ap, i), crit_rates['eviscerate'], attacks_per_second['eviscerate'][i])
+                if arrays.is_nonzero(eviscerates[i]):
+                    eviscerate_dps += self.get_dps_contribution(self.eviscerate_damage(average_ap, i), crit_rates[ledger.EVISCERATE], eviscerates[i])
+            yield 'eviscerate', eviscerate_dps
 
-        if 'venomous_wounds' in attacks_per_second:
-            damage_breakdown['venomous_wounds'] = self.get_dps_contribution(self.venomous_wounds_damage(average_ap, mastery=current_stats['mastery']), crit_rates['venomous_wounds'], attacks_per_second['venomous_wounds'])
+        if arrays.is_nonzero(rates[ledger.VENOMOUS_WOUNDS]):
+            yield 'venomous_wounds', self.get_dps_contribution(self.venomous_wounds_damage(average_ap, mastery=current_stats['mastery']), crit_rates[ledger.VENOMOUS_WOUNDS], rates[ledger.VENOMOUS_WOUNDS])
 
-        if 'instant_poison' in attacks_per_second:
-            damage_breakdown['instant_poison'] = self.get_dps_contribution(self.instant_poison_damage(average_ap, mastery=current_stats['mastery']), crit_rates['instant_poison'], attacks_per_second['instant_poison'])
+        if arrays.is_nonzero(rates[ledger.INSTANT_POISON]):
+            yield 'instant_poison', self.get_dps_contribution(self.instant_poison_damage(average_ap, mastery=current_stats['mastery']), crit_rates[ledger.INSTANT_POISON], rates[ledger.INSTANT_POISON])
 
-        if 'deadly_poison' in attacks_per_second:
-            damage_breakdown['deadly_poison'] = self.get_dps_contribution(self.deadly_poison_tick_damage(average_ap, mastery=current_stats['mastery']), crit_rates['deadly_poison'], attacks_per_second['deadly_poison'])
+        if arrays.is_nonzero(rates[ledger.DEADLY_POISON]):
+            yield 'deadly_poison', self.get_dps_contribution(self.deadly_poison_tick_damage(average_ap, mastery=current_stats['mastery']), crit_rates[ledger.DEADLY_POISON], rates[ledger.DEADLY_POISON])
 
-        if 'wound_poison' in attacks_per_second:
-            damage_breakdown['wound_poison'] = self.get_dps_contribution(self.wound_poison_damage(average_ap, mastery=current_stats['mastery']), crit_rates['wound_poison'], attacks_per_second['wound_poison'])
+        if arrays.is_nonzero(rates[ledger.WOUND_POISON]):
+            yield 'wound_poison', self.get_dps_contribution(self.wound_poison_damage(average_ap, mastery=current_stats['mastery']), crit_rates[ledger.WOUND_POISON], rates[ledger.WOUND_POISON])
 
         for proc in damage_procs:
-            damage_breakdown[proc.proc_name] = self.get_proc_damage_contribution(proc, attacks_per_second[proc.proc_name], current_stats)
+            yield proc.proc_name, self.get_proc_damage_contribution(proc, counts.proc_rates[proc.proc_name], current_stats)
 
         if self.race.rocket_barrage:
-            damage_breakdown['rocket_barrage'] = self.get_rocket_barrage_damage(average_ap, current_stats)
+            yield 'rocket_barrage', self.get_rocket_barrage_damage(average_ap, current_stats)
+
+    # What procs off what, as ledger slots.
+    MH_STRIKES = (ledger.MUTILATE, ledger.BACKSTAB, ledger.REVEALING_STRIKE, ledger.SINISTER_STRIKE, ledger.AMBUSH, ledger.HEMORRHAGE, ledger.MH_KILLING_SPREE)
+    OH_STRIKES = (ledger.MUTILATE, ledger.MAIN_GAUCHE, ledger.OH_KILLING_SPREE)
+    DIRECT_DAMAGE_FINISHERS = (ledger.ENVENOM, ledger.EVISCERATE)
+    HARMFUL_SPELLS = (ledger.INSTANT_POISON, ledger.WOUND_POISON, ledger.VENOMOUS_WOUNDS)
+
+    def index_trigger_rates(self, counts):
+        # {(source, trigger, crit only): triggers per second} for every kind
+        # of thing procs go off, so each proc's rate is a few lookups rather
+        # than a walk over the abilities.  Sources are 'mh', 'oh' and
+        # 'other'; triggers are the procs_off_* methods of objects.procs.Proc
+        # they go with.
+        rates = counts.rates
+        crit_rates = counts.crit_rates
+        mh_strikes = 0
+        mh_strike_crits = 0
+        # A finisher's slot in rates holds its total over combo points.  Most
+        # of these abilities aren't in any one cycle, and are skipped; that
+        # matters for batches (see calcs.arrays).
+        for ability in self.MH_STRIKES + self.DIRECT_DAMAGE_FINISHERS:
+            if arrays.is_nonzero(rates[ability]):
+                mh_strikes += rates[ability]
+                mh_strike_crits += rates[ability] * crit_rates[ability]
+        oh_strikes = 0
+        oh_strike_crits = 0
+        for ability in self.OH_STRIKES:
+            if arrays.is_nonzero(rates[ability]):
+                oh_strikes += rates[ability]
+                oh_strike_crits += rates[ability] * crit_rates[ability]
+        harmful_spells = 0
+        harmful_spell_crits = 0
+        for ability in self.HARMFUL_SPELLS:
+            if arrays.is_nonzero(rates[ability]):
+                harmful_spells += rates[ability]
+                harmful_spell_crits += rates[ability] * crit_rates[ability]
+
+        return {
+            ('mh', 'auto_attacks', False): rates[ledger.MH_AUTOATTACK_HITS],
+            ('mh', 'auto_attacks', True): rates[ledger.MH_AUTOATTACK_HITS] * crit_rates[ledger.MH_AUTOATTACKS],
+            ('mh', 'strikes', False): mh_strikes,
+            ('mh', 'strikes', True): mh_strike_crits,
+            # Applying a debuff never crits.
+            ('mh', 'apply_debuff', False): rates[ledger.RUPTURE],
+            ('mh', 'apply_debuff', True): 0,
+            ('oh', 'auto_attacks', False): rates[ledger.OH_AUTOATTACK_HITS],
+            ('oh', 'auto_attacks', True): rates[ledger.OH_AUTOATTACK_HITS] * crit_rates[ledger.OH_AUTOATTACKS],
+            ('oh', 'strikes', False): oh_strikes,
+            ('oh', 'strikes', True): oh_strike_crits,
+            ('other', 'harmful_spells', False): harmful_spells,
+            ('other', 'harmful_spells', True): harmful_spell_crits,
+            ('other', 'periodic_spell_damage', False): rates[ledger.DEADLY_POISON],
+            ('other', 'periodic_spell_damage', True): rates[ledger.DEADLY_POISON] * crit_rates[ledger.DEADLY_POISON],
+            ('other', 'bleeds', False): rates[ledger.RUPTURE_TICKS],
+            ('other', 'bleeds', True): rates[ledger.RUPTURE_TICKS] * crit_rates[ledger.RUPTURE_TICKS]
+        }
 
-        return damage_breakdown
+    def get_trigger_rates(self, counts):
+        # The index_trigger_rates of counts, worked out once per fill of the
+        # ledger and shared by every proc.
+        if counts.trigger_rates is None:
+            counts.trigger_rates = self.index_trigger_rates(counts)
+        return counts.trigger_rates
 
-    def get_mh_procs_per_second(self, proc, attacks_per_second, crit_rates):
+    def get_mh_procs_per_second(self, proc, counts):
+        trigger_rates = self.get_trigger_rates(counts)
+        crit_only = proc.procs_off_crit_only()
         triggers_per_second = 0
         if proc.procs_off_auto_attacks():
-            if proc.procs_off_crit_only():
-                triggers_per_second += attacks_per_second['mh_autoattack_hits'] * crit_rates['mh_autoattacks']
-            else:
-                triggers_per_second += attacks_per_second['mh_autoattack_hits']
+            triggers_per_second += trigger_rates['mh', 'auto_attacks', crit_only]
         if proc.procs_off_strikes():
-            for ability in ('mutilate', 'backstab', 'revealing_strike', 'sinister_strike', 'ambush', 'hemorrhage', 'mh_killing_spree'):
-                if ability in attacks_per_second:
-                    if proc.procs_off_crit_only():
-                        triggers_per_second += attacks_per_second[ability] * crit_rates[ability]
-                    else:
-                        triggers_per_second += attacks_per_second[ability]
-            for ability in ('envenom', 'eviscerate'):
-                if ability in attacks_per_second:
-                    if proc.procs_off_crit_only():
-                        triggers_per_second += sum(attacks_per_second[ability]) * crit_rates[ability]
-                    else:
-                        triggers_per_second += sum(attacks_per_second[ability])
+            triggers_per_second += trigger_rates['mh', 'strikes', crit_only]
         if proc.procs_off_apply_debuff():
-            if 'rupture' in attacks_per_second:
-                if not proc.procs_off_crit_only():
-                    triggers_per_second += attacks_per_second['rupture']
+            triggers_per_second += trigger_rates['mh', 'apply_debuff', crit_only]
 
         return triggers_per_second * proc.proc_rate(self.stats.mh.speed)
 
-    def get_oh_procs_per_second(self, proc, attacks_per_second, crit_rates):
+    def get_oh_procs_per_second(self, proc, counts):
+        trigger_rates = self.get_trigger_rates(counts)
+        crit_only = proc.procs_off_crit_only()
         triggers_per_second = 0
         if proc.procs_off_auto_attacks():
-            if proc.procs_off_crit_only():
-                triggers_per_second += attacks_per_second['oh_autoattack_hits'] * crit_rates['oh_autoattacks']
-            else:
-                triggers_per_second += attacks_per_second['oh_autoattack_hits']
+            triggers_per_second += trigger_rates['oh', 'auto_attacks', crit_only]
         if proc.procs_off_strikes():
-            for ability in ('mutilate', 'main_gauche', 'oh_killing_spree'):
-                if ability in attacks_per_second:
-                    if proc.procs_off_crit_only():
-                        triggers_per_second += attacks_per_second[ability] * crit_rates[ability]
-                    else:
-                        triggers_per_second += attacks_per_second[ability]
+            triggers_per_second += trigger_rates['oh', 'strikes', crit_only]
 
         return triggers_per_second * proc.proc_rate(self.stats.oh.speed)
 
-    def get_other_procs_per_second(self, proc, attacks_per_second, crit_rates):
+    def get_other_procs_per_second(self, proc, counts):
+        trigger_rates = self.get_trigger_rates(counts)
+        crit_only = proc.procs_off_crit_only()
         triggers_per_second = 0
 
         if proc.procs_off_harmful_spells():
-            for ability in ('instant_poison', 'wound_poison', 'venomous_wounds'):
-                if ability in attacks_per_second:
-                    if proc.procs_off_crit_only():
-                        triggers_per_second += attacks_per_second[ability] * crit_rates[ability]
-                    else:
-                        triggers_per_second += attacks_per_second[ability]
+            triggers_per_second += trigger_rates['other', 'harmful_spells', crit_only]
         if proc.procs_off_periodic_spell_damage():
-            if 'deadly_poison' in attacks_per_second:
-                if proc.procs_off_crit_only():
-                    triggers_per_second += attacks_per_second['deadly_poison'] * crit_rates['deadly_poison']
-                else:
-                    triggers_per_second += attacks_per_second['deadly_poison']
+            triggers_per_second += trigger_rates['other', 'periodic_spell_damage', crit_only]
         if proc.procs_off_bleeds():
-            if 'rupture_ticks' in attacks_per_second:
-                if proc.procs_off_crit_only():
-                    triggers_per_second += sum(attacks_per_second['rupture_ticks']) * crit_rates['rupture']
-                else:
-                    triggers_per_second += sum(attacks_per_second['rupture_ticks'])
+            triggers_per_second += trigger_rates['other', 'bleeds', crit_only]
 
         if proc.is_ppm():
             if triggers_per_second == 0:
@@ -349,66 +503,115 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
         else:
             return triggers_per_second * proc.proc_rate()
 
-    def get_procs_per_second(self, proc, attacks_per_second, crit_rates):
+    def get_procs_per_second(self, proc, counts, hand=None):
         # TODO: Include damaging proc hits in figuring out how often everything else procs.
-        if getattr(proc, 'mh_only', False):
-            procs_per_second = self.get_mh_procs_per_second(proc, attacks_per_second, crit_rates)
-        elif getattr(proc, 'oh_only', False):
-            procs_per_second = self.get_oh_procs_per_second(proc, attacks_per_second, crit_rates)
+        # hand is 'mh' or 'oh' for a weapon enchant, which only procs off
+        # the weapon it's on.
+        if hand == 'mh':
+            procs_per_second = self.get_mh_procs_per_second(proc, counts)
+        elif hand == 'oh':
+            procs_per_second = self.get_oh_procs_per_second(proc, counts)
         else:
-            procs_per_second = self.get_mh_procs_per_second(proc, attacks_per_second, crit_rates) + self.get_oh_procs_per_second(proc, attacks_per_second, crit_rates) + self.get_other_procs_per_second(proc, attacks_per_second, crit_rates)
+            procs_per_second = self.get_mh_procs_per_second(proc, counts) + self.get_oh_procs_per_second(proc, counts) + self.get_other_procs_per_second(proc, counts)
 
         return procs_per_second
 
-    def set_uptime(self, proc, attacks_per_second, crit_rates):
-        procs_per_second = self.get_procs_per_second(proc, attacks_per_second, crit_rates)
+    def get_uptime(self, proc, counts, hand=None):
+        # The average number of stacks of proc that are up.  This used to be
+        # stored on the proc itself; procs belong to the inputs, which may
+        # be shared between calculators, so it's returned instead.
+        procs_per_second = self.get_procs_per_second(proc, counts, hand)
 
         if proc.icd:
-            proc.uptime = proc.duration / (proc.icd + 1. / procs_per_second)
+            return proc.duration / (proc.icd + 1. / procs_per_second)
         else:
             # See http://elitistjerks.com/f31/t20747-advanced_rogue_mechanics_discussion/#post621369
             # for the derivation of this formula.
-            if procs_per_second >= 1 and proc.duration >= 1:
-                proc.uptime = proc.max_stacks
-            else:
-                q = 1 - procs_per_second
-                Q = q ** proc.duration
-                P = 1 - Q
-                proc.uptime = P * (1 - P ** proc.max_stacks) / Q
-
-    def update_with_damaging_proc(self, proc, attacks_per_second, crit_rates):
+            full_stacks = False
+            if arrays.is_array(procs_per_second):
+                # The formula is only worked out for characters short of
+                # full stacks (see calcs.arrays).
+                if proc.duration >= 1:
+                    full_stacks = procs_per_second >= 1
+                    procs_per_second = arrays.where(full_stacks, 0., procs_per_second)
+            elif procs_per_second >= 1 and proc.duration >= 1:
+                return proc.max_stacks
+            q = 1 - procs_per_second
+            Q = q ** proc.duration
+            P = 1 - Q
+            return arrays.where(full_stacks, proc.max_stacks, P * (1 - P ** proc.max_stacks) / Q)
+
+    def update_with_damaging_proc(self, proc, counts):
         if proc.stat == 'spell_damage':
-            attacks_per_second[proc.proc_name] = self.get_procs_per_second(proc, attacks_per_second, crit_rates) * self.spell_hit_chance()
+            counts.proc_rates[proc.proc_name] = self.get_procs_per_second(proc, counts) * self.poison_hit_chance
         elif proc.stat == 'physical_damage':
-            attacks_per_second[proc.proc_name] = self.get_procs_per_second(proc, attacks_per_second, crit_rates) * self.strike_hit_chance
+            counts.proc_rates[proc.proc_name] = self.get_procs_per_second(proc, counts) * self.strike_hit_chance
 
-    def unheeded_warning_multiplier(self, attacks_per_second, crit_rates):
+    def unheeded_warning_multiplier(self, counts):
         proc = self.stats.procs.unheeded_warning
         if not proc:
             return 1
 
-        self.set_uptime(proc, attacks_per_second, crit_rates)
-        return 1 + proc.value * proc.uptime
+        return 1 + proc.value * self.get_uptime(proc, counts)
 
-    def update_crit_rates_for_4pc_t11(self, attacks_per_second, crit_rates):
+    def update_crit_rates_for_4pc_t11(self, counts):
         t11_4pc_bonus = self.stats.procs.rogue_t11_4pc
         if t11_4pc_bonus:
-            direct_damage_finisher = ''
-            for key in ('envenom', 'eviscerate'):
-                if key in attacks_per_second and sum(attacks_per_second[key]) != 0:
-                    if direct_damage_finisher:
+            direct_damage_finisher = None
+            for finisher in self.DIRECT_DAMAGE_FINISHERS:
+                if arrays.is_nonzero(counts.rates[finisher]):
+                    if direct_damage_finisher is not None:
                         raise InputNotModeledException(_('Unable to model the 4pc T11 set bonus in a cycle that uses both eviscerate and envenom'))
-                    direct_damage_finisher = key
+                    direct_damage_finisher = finisher
 
-            if direct_damage_finisher:
-                procs_per_second = self.get_procs_per_second(t11_4pc_bonus, attacks_per_second, crit_rates)
-                finisher_spacing = min(1 / sum(attacks_per_second[direct_damage_finisher]), t11_4pc_bonus.duration)
+            if direct_damage_finisher is not None:
+                procs_per_second = self.get_procs_per_second(t11_4pc_bonus, counts)
+                finisher_spacing = arrays.minimum(1 / counts.rates[direct_damage_finisher], t11_4pc_bonus.duration)
                 p = 1 - (1-procs_per_second) ** finisher_spacing
-                crit_rates[direct_damage_finisher] = p + (1 - p) * crit_rates[direct_damage_finisher]
+                crit_rate = counts.crit_rates[direct_damage_finisher]
+                counts.crit_rates[direct_damage_finisher] = p + (1 - p) * crit_rate
+                # Of the trigger rates get_procs_per_second just indexed, only
+                # the strikes that crit change.
+                trigger_rates = counts.trigger_rates
+                trigger_rates['mh', 'strikes', True] = trigger_rates['mh', 'strikes', True] + counts.rates[direct_damage_finisher] * (counts.crit_rates[direct_damage_finisher] - crit_rate)
+
+    def get_proc_stats(self, counts, active_procs, damage_procs):
+        # The stats once non-ICD procs are applied at the rates in counts
+        # (see compute_damage); counts' crit and damaging proc rates are
+        # brought up to date on the way.
+        current_stats = {
+            'agi': self.base_stats['agi'],
+            'ap': self.base_stats['ap'],
+            'crit': self.base_stats['crit'],
+            'haste': self.base_stats['haste'],
+            'mastery': self.base_stats['mastery']
+        }
+
+        self.update_crit_rates_for_4pc_t11(counts)
+
+        for proc in damage_procs:
+            if not proc.icd:
+                self.update_with_damaging_proc(proc, counts)
+
+        for proc, hand in active_procs:
+            if not proc.icd:
+                current_stats[proc.stat] = current_stats[proc.stat] + self.get_uptime(proc, counts, hand) * proc.value
 
-    def get_poison_counts(self, total_mh_hits, total_oh_hits, attacks_per_second):
+        current_stats['agi'] = current_stats['agi'] * self.agi_multiplier
+        return current_stats
+
+    def are_close_stats(self, old_stats, new_stats):
+        # Whether the attack counts functions, which don't look at ap, give
+        # the same rates for both.
+        for stat in ('agi', 'crit', 'haste', 'mastery'):
+            if arrays.get_max(abs(new_stats[stat] - old_stats[stat])) > self.PRECISION_REQUIRED:
+                return False
+        return True
+
+    def get_poison_counts(self, total_mh_hits, total_oh_hits, counts):
+        rates = counts.rates
         if self.settings.mh_poison == 'dp' or self.settings.oh_poison == 'dp':
-            attacks_per_second['deadly_poison'] = 1./3
+            rates[ledger.DEADLY_POISON] = 1./3
 
         if self.settings.mh_poison == 'ip':
             mh_proc_rate = self.stats.mh.speed / 7.
@@ -424,22 +627,28 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
         else: # Deadly Poison
             oh_proc_rate = .3
 
-        mh_poison_procs = total_mh_hits * mh_proc_rate * self.spell_hit_chance()
-        oh_poison_procs = total_oh_hits * oh_proc_rate * self.spell_hit_chance()
+        mh_poison_procs = total_mh_hits * mh_proc_rate * self.poison_hit_chance
+        oh_poison_procs = total_oh_hits * oh_proc_rate * self.poison_hit_chance
 
         poison_setup = self.settings.mh_poison + self.settings.oh_poison
         if poison_setup in ['ipip', 'ipdp', 'dpip']:
-            attacks_per_second['instant_poison'] = mh_poison_procs + oh_poison_procs
+            rates[ledger.INSTANT_POISON] = mh_poison_procs + oh_poison_procs
         elif poison_setup in ['wpwp', 'wpdp', 'dpwp']:
-            attacks_per_second['wound_poison'] = mh_poison_procs + oh_poison_procs
+            rates[ledger.WOUND_POISON] = mh_poison_procs + oh_poison_procs
         elif poison_setup == 'ipwp':
-            attacks_per_second['instant_poison'] = mh_poison_procs
-            attacks_per_second['wound_poison'] = oh_poison_procs
+            rates[ledger.INSTANT_POISON] = mh_poison_procs
+            rates[ledger.WOUND_POISON] = oh_poison_procs
         elif poison_setup == 'wpip':
-            attacks_per_second['wound_poison'] = mh_poison_procs
-            attacks_per_second['instant_poison'] = oh_poison_procs
-
-    def compute_damage(self, attack_counts_function):
+            rates[ledger.WOUND_POISON] = mh_poison_procs
+            rates[ledger.INSTANT_POISON] = oh_poison_procs
+
+    def compute_damage(self, attack_counts_function, get_multipliers=None):
+        # Returns the damage breakdown for the cycle attack_counts_function
+        # works out.  If get_multipliers is given, it's called once the
+        # counts have converged, and returns ({source: multiplier},
+        # multiplier for every other source); the total dps with those
+        # applied is returned instead, without building the breakdown.
+        #
         # TODO: Crit cap
         #
         # TODO: Hit/Exp procs
@@ -455,79 +664,118 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
         active_procs = []
         damage_procs = []
 
+        # (proc, hand) pairs; see get_procs_per_second.
         for proc_info in self.stats.procs.get_all_procs_for_stat():
             if proc_info.stat in current_stats and not proc_info.is_ppm():
-                active_procs.append(proc_info)
+                active_procs.append((proc_info, None))
             if proc_info.stat in ('spell_damage', 'physical_damage'):
                 damage_procs.append(proc_info)
 
-        mh_landslide = self.stats.mh.landslide
-        if mh_landslide:
-            mh_landslide.mh_only = True
-            active_procs.append(mh_landslide)
-
-        mh_hurricane = self.stats.mh.hurricane
-        if mh_hurricane:
-            mh_hurricane.mh_only = True
-            active_procs.append(mh_hurricane)
-
-        oh_landslide = self.stats.oh.landslide
-        if oh_landslide:
-            oh_landslide.oh_only = True
-            active_procs.append(oh_landslide)
-
-        oh_hurricane = self.stats.oh.hurricane
-        if oh_hurricane:
-            oh_hurricane.oh_only = True
-            active_procs.append(oh_hurricane)
-
-        attacks_per_second, crit_rates = attack_counts_function(current_stats)
-
+        for hand in ('mh', 'oh'):
+            weapon = getattr(self.stats, hand)
+            for enchant in ('landslide', 'hurricane'):
+                if getattr(weapon, enchant):
+                    active_procs.append((getattr(weapon, enchant), hand))
+
+        # When a caller has asked us to keep converged states around (see
+        # DamageCalculator.get_ep), a solve for a slightly perturbed character
+        # starts from the state the unperturbed one converged to instead of
+        # from the unprocced stats; that saves most of the iterations.
+        # Failing that, a calculator with a warm start cache starts from the
+        # state the nearest character solved before converged to.
+        name = attack_counts_function.__name__
+        warm_start = None
+        seeded = True
+        if self.converged_states is not None and name in self.converged_states:
+            counts = self.converged_states[name].copy()
+            guess = None
+        else:
+            warm_start = self.get_warm_start(name)
+            if warm_start is not None and warm_start[2] is not None:
+                counts = warm_start[2].copy()
+                guess = None
+            else:
+                counts = attack_counts_function(current_stats)
+                guess = current_stats
+                seeded = False
+
+        # Find the stats that, once non-ICD procs are applied at the attack
+        # rates they give, produce themselves; self.solver picks each guess.
+        # guess is the one counts were worked out from, or None for a seed,
+        # which another solve worked out.  The solve has converged once the
+        # stats counts give are the ones they were worked out from, which is
+        # checked before working out counts again, or once an iteration
+        # doesn't move the counts.  Each iteration refills the ledger the one
+        # before last used; a cold start's first fill counts as one.
+        old_counts = ledger.AbilityLedger()
+        history = []
+        if seeded:
+            iterations = 0
+        else:
+            iterations = 1
         while True:
-            current_stats = {
-                'agi': self.base_stats['agi'],
-                'ap': self.base_stats['ap'],
-                'crit': self.base_stats['crit'],
-                'haste': self.base_stats['haste'],
-                'mastery': self.base_stats['mastery']
-            }
+            crit_rates = list(counts.crit_rates)
+            current_stats = self.get_proc_stats(counts, active_procs, damage_procs)
+            if guess is not None and self.are_close_stats(guess, current_stats):
+                # ICD procs go off the crit rates as the attack counts
+                # function left them, before the 4pc bonus.
+                counts.crit_rates[:] = crit_rates
+                counts.trigger_rates = None
+                residual = 0
+                break
+
+            if iterations == self.solver.max_iterations:
+                self.convergence_reports[name] = solvers.ConvergenceReport(self.solver.name, iterations, False, self.get_max_difference(old_counts, counts))
+                raise solvers.ConvergenceException(_('Proc uptimes did not converge in {iterations} iterations').format(iterations=iterations))
+            iterations += 1
 
-            self.update_crit_rates_for_4pc_t11(attacks_per_second, crit_rates)
+            if guess is not None:
+                history.append((guess, current_stats))
+                current_stats = self.solver.next_guess(history)
+            guess = current_stats
 
-            for proc in damage_procs:
-                if not proc.icd:
-                    self.update_with_damaging_proc(proc, attacks_per_second, crit_rates)
+            old_counts, counts = counts, old_counts
+            attack_counts_function(current_stats, counts)
 
-            for proc in active_procs:
-                if not proc.icd:
-                    self.set_uptime(proc, attacks_per_second, crit_rates)
-                    current_stats[proc.stat] += proc.uptime * proc.value
+            if self.are_close_enough(old_counts, counts):
+                residual = self.get_max_difference(old_counts, counts)
+                break
 
-            current_stats['agi'] *= self.agi_multiplier
+        self.convergence_reports[name] = solvers.ConvergenceReport(self.solver.name, iterations, True, residual)
 
-            old_attacks_per_second = attacks_per_second
-            attacks_per_second, crit_rates = attack_counts_function(current_stats)
+        if warm_start is not None:
+            key, vector, state = warm_start
+            self.warm_start_cache.record_solve(name, state is not None, iterations)
+            self.warm_start_cache.store(key, vector, counts.copy())
 
-            if self.are_close_enough(old_attacks_per_second, attacks_per_second):
-                break
+        # Sweeps (see DamageCalculator.get_stat_curve) start every solve from
+        # the one before it rather than from the first.
+        if self.converged_states is not None and (self.chaining_converged_states or name not in self.converged_states):
+            self.converged_states[name] = counts.copy()
 
-        for proc in active_procs:
+        for proc, hand in active_procs:
             if proc.icd:
-                self.set_uptime(proc, attacks_per_second, crit_rates)
+                uptime = self.get_uptime(proc, counts, hand)
                 if proc.stat == 'agi':
-                    current_stats[proc.stat] += proc.uptime * proc.value * self.agi_multiplier
+                    current_stats[proc.stat] = current_stats[proc.stat] + uptime * proc.value * self.agi_multiplier
                 else:
-                    current_stats[proc.stat] += proc.uptime * proc.value
+                    current_stats[proc.stat] = current_stats[proc.stat] + uptime * proc.value
 
-        attacks_per_second, crit_rates = attack_counts_function(current_stats)
+        attack_counts_function(current_stats, counts)
 
-        self.update_crit_rates_for_4pc_t11(attacks_per_second, crit_rates)
+        self.update_crit_rates_for_4pc_t11(counts)
 
         for proc in damage_procs:
-            self.update_with_damaging_proc(proc, attacks_per_second, crit_rates)
+            self.update_with_damaging_proc(proc, counts)
 
-        damage_breakdown = self.get_damage_breakdown(current_stats, attacks_per_second, crit_rates ,damage_procs)
-        damage_breakdown['autoattack'] *= self.unheeded_warning_multiplier(attacks_per_second, crit_rates)
+        if get_multipliers is not None:
+            multipliers, default_multiplier = get_multipliers()
+            multipliers = dict(multipliers)
+            multipliers['autoattack'] = self.unheeded_warning_multiplier(counts) * multipliers.get('autoattack', default_multiplier)
+            return self.get_damage_total(current_stats, counts, damage_procs, multipliers, default_multiplier)
+
+        damage_breakdown = self.get_damage_breakdown(current_stats, counts, damage_procs)
+        damage_breakdown['autoattack'] *= self.unheeded_warning_multiplier(counts)
         return damage_breakdown
 
     ###########################################################################
@@ -582,10 +830,16 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
         return backstab_dps + mutilate_dps
 
     def assassination_dps_estimate_backstab(self):
-        return sum(self.assassination_dps_breakdown_backstab().values())
+        return self.compute_damage(self.assassination_attack_counts_backstab, self.get_assassination_multipliers)
 
     def assassination_dps_estimate_mutilate(self):
-        return sum(self.assassination_dps_breakdown_mutilate().values())
+        self.set_mutilate_energy_cost()
+        return self.compute_damage(self.assassination_attack_counts_mutilate, self.get_assassination_multipliers)
+
+    def get_assassination_multipliers(self):
+        # What each source of damage is multiplied by once the counts are
+        # in, as compute_damage takes them.
+        return {}, self.vendetta_mult
 
     def assassination_dps_breakdown(self):
         mutilate_dps_breakdown = self.assassination_dps_breakdown_mutilate()
@@ -606,27 +860,30 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
 
         return dps_breakdown
 
-    def assassination_dps_breakdown_mutilate(self):
+    def set_mutilate_energy_cost(self):
         self.mutilate_energy_cost = 48 + 12 / self.strike_hit_chance
         if self.glyphs.mutilate:
             self.mutilate_energy_cost -= 5
 
+    def assassination_dps_breakdown_mutilate(self):
+        self.set_mutilate_energy_cost()
         damage_breakdown = self.compute_damage(self.assassination_attack_counts_mutilate)
-
-        for key in damage_breakdown:
-            damage_breakdown[key] *= self.vendetta_mult
-
-        return damage_breakdown
+        return self.apply_multipliers(damage_breakdown, self.get_assassination_multipliers())
 
     def assassination_dps_breakdown_backstab(self):
         damage_breakdown = self.compute_damage(self.assassination_attack_counts_backstab)
+        return self.apply_multipliers(damage_breakdown, self.get_assassination_multipliers())
 
-        for key in damage_breakdown:
-            damage_breakdown[key] *= self.vendetta_mult
-
-        return damage_breakdown
+    def assassination_attack_counts_mutilate(self, current_stats, counts=None):
+        # Fills counts, an AbilityLedger (see calcs.rogue.Aldriana.ledger),
+        # or a new one, and returns it.
+        if counts is None:
+            counts = ledger.AbilityLedger()
+        else:
+            counts.reset()
+        rates = counts.rates
+        crit_rates = counts.crit_rates
 
-    def assassination_attack_counts_mutilate(self, current_stats):
         base_melee_crit_rate = self.melee_crit_rate(agi=current_stats['agi'], crit=current_stats['crit'])
         base_spell_crit_rate = self.spell_crit_rate(crit=current_stats['crit'])
 
@@ -639,19 +896,16 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
         attack_speed_multiplier = self.base_speed_multiplier * haste_multiplier
 
         mutilate_crit_rate = base_melee_crit_rate + self.stats.gear_buffs.rogue_t11_2pc_crit_bonus() + .05 * self.talents.puncturing_wounds
-        if mutilate_crit_rate > 1:
-            mutilate_crit_rate = 1.
-
-        crit_rates = {
-            'mh_autoattacks': min(base_melee_crit_rate, self.dual_wield_mh_hit_chance() - self.GLANCE_RATE),
-            'oh_autoattacks': min(base_melee_crit_rate, self.dual_wield_oh_hit_chance() - self.GLANCE_RATE),
-            'mutilate': mutilate_crit_rate,
-            'envenom': base_melee_crit_rate,
-            'rupture_ticks': base_melee_crit_rate,
-            'venomous_wounds': base_spell_crit_rate,
-            'instant_poison': base_spell_crit_rate,
-            'deadly_poison': base_spell_crit_rate
-        }
+        mutilate_crit_rate = arrays.minimum(mutilate_crit_rate, 1.)
+
+        crit_rates[ledger.MH_AUTOATTACKS] = arrays.minimum(base_melee_crit_rate, self.mh_autoattack_hit_chance - self.GLANCE_RATE)
+        crit_rates[ledger.OH_AUTOATTACKS] = arrays.minimum(base_melee_crit_rate, self.oh_autoattack_hit_chance - self.GLANCE_RATE)
+        crit_rates[ledger.MUTILATE] = mutilate_crit_rate
+        crit_rates[ledger.ENVENOM] = base_melee_crit_rate
+        crit_rates[ledger.RUPTURE_TICKS] = base_melee_crit_rate
+        crit_rates[ledger.VENOMOUS_WOUNDS] = base_spell_crit_rate
+        crit_rates[ledger.INSTANT_POISON] = base_spell_crit_rate
+        crit_rates[ledger.DEADLY_POISON] = base_spell_crit_rate
 
         seal_fate_proc_rate = 1 - (1 - mutilate_crit_rate * .5 * self.talents.seal_fate) ** 2
         cp_per_mut = {2: 1 - seal_fate_proc_rate, 3: seal_fate_proc_rate}
@@ -678,34 +932,34 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
         envenom_energy_cost = muts_per_finisher * self.mutilate_energy_cost + self.envenom_energy_cost - cp_per_finisher * self.relentless_strikes_energy_return_per_cp
         envenoms_per_cycle = energy_for_envenoms / envenom_energy_cost
 
-        attacks_per_second = {}
-
         envenoms_per_second = envenoms_per_cycle / average_cycle_length
-        attacks_per_second['rupture'] = 1 / average_cycle_length
-        attacks_per_second['mutilate'] = (envenoms_per_second + attacks_per_second['rupture']) * muts_per_finisher
+        rates[ledger.RUPTURE] = 1 / average_cycle_length
+        rates[ledger.MUTILATE] = (envenoms_per_second + rates[ledger.RUPTURE]) * muts_per_finisher
 
         if self.talents.cold_blood:
             envenoms_per_cold_blood = 120 * envenoms_per_second
-            crit_rates['envenom'] = ((envenoms_per_cold_blood - 1) * crit_rates['envenom'] + 1) / envenoms_per_cold_blood
+            crit_rates[ledger.ENVENOM] = ((envenoms_per_cold_blood - 1) * crit_rates[ledger.ENVENOM] + 1) / envenoms_per_cold_blood
 
-        attacks_per_second['envenom'] = [finisher_chance * envenoms_per_second for finisher_chance in finisher_size_breakdown]
+        envenoms = [finisher_chance * envenoms_per_second for finisher_chance in finisher_size_breakdown]
+        counts.set_finisher_rates(ledger.ENVENOM, envenoms)
 
-        attacks_per_second['rupture_ticks'] = [0, 0, 0, 0, 0, 0]
+        rupture_ticks = [0, 0, 0, 0, 0, 0]
         for i in xrange(1, 6):
             ticks_per_rupture = 3 + i + 2 * self.glyphs.rupture
-            attacks_per_second['rupture_ticks'][i] = ticks_per_rupture * attacks_per_second['rupture'] * finisher_size_breakdown[i]
+            rupture_ticks[i] = ticks_per_rupture * rates[ledger.RUPTURE] * finisher_size_breakdown[i]
+        counts.set_finisher_rates(ledger.RUPTURE_TICKS, rupture_ticks)
 
-        total_rupture_ticks = sum(attacks_per_second['rupture_ticks'])
-        attacks_per_second['venomous_wounds'] = total_rupture_ticks * .3 * self.talents.venomous_wounds * self.spell_hit_chance()
+        total_rupture_ticks = rates[ledger.RUPTURE_TICKS]
+        rates[ledger.VENOMOUS_WOUNDS] = total_rupture_ticks * .3 * self.talents.venomous_wounds * self.poison_hit_chance
 
-        attacks_per_second['mh_autoattacks'] = attack_speed_multiplier / self.stats.mh.speed
-        attacks_per_second['oh_autoattacks'] = attack_speed_multiplier / self.stats.oh.speed
+        rates[ledger.MH_AUTOATTACKS] = attack_speed_multiplier / self.stats.mh.speed
+        rates[ledger.OH_AUTOATTACKS] = attack_speed_multiplier / self.stats.oh.speed
 
-        attacks_per_second['mh_autoattack_hits'] = attacks_per_second['mh_autoattacks'] * self.dual_wield_mh_hit_chance()
-        attacks_per_second['oh_autoattack_hits'] = attacks_per_second['oh_autoattacks'] * self.dual_wield_oh_hit_chance()
+        rates[ledger.MH_AUTOATTACK_HITS] = rates[ledger.MH_AUTOATTACKS] * self.mh_autoattack_hit_chance
+        rates[ledger.OH_AUTOATTACK_HITS] = rates[ledger.OH_AUTOATTACKS] * self.oh_autoattack_hit_chance
 
-        total_mh_hits_per_second = attacks_per_second['mh_autoattack_hits'] + attacks_per_second['mutilate'] + envenoms_per_second + attacks_per_second['rupture']
-        total_oh_hits_per_second = attacks_per_second['oh_autoattack_hits'] + attacks_per_second['mutilate']
+        total_mh_hits_per_second = rates[ledger.MH_AUTOATTACK_HITS] + rates[ledger.MUTILATE] + envenoms_per_second + rates[ledger.RUPTURE]
+        total_oh_hits_per_second = rates[ledger.OH_AUTOATTACK_HITS] + rates[ledger.MUTILATE]
 
         if self.settings.mh_poison == 'ip':
             ip_base_proc_rate = .3 * self.stats.mh.speed / 1.4
@@ -717,7 +971,7 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
         dp_base_proc_rate = .5
         dp_envenom_proc_rate = dp_base_proc_rate + .15
 
-        envenom_uptime = min(sum([(1 / self.strike_hit_chance + cps) * attacks_per_second['envenom'][cps] for cps in xrange(1,6)]), 1)
+        envenom_uptime = arrays.minimum(sum([(1 / self.strike_hit_chance + cps) * envenoms[cps] for cps in xrange(1,6)]), 1)
         avg_ip_proc_rate = ip_base_proc_rate * (1 - envenom_uptime) + ip_envenom_proc_rate * envenom_uptime
         avg_dp_proc_rate = dp_base_proc_rate * (1 - envenom_uptime) + dp_envenom_proc_rate * envenom_uptime
 
@@ -728,12 +982,21 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
             mh_poison_procs = avg_dp_proc_rate * total_mh_hits_per_second
             oh_poison_procs = avg_ip_proc_rate * total_oh_hits_per_second
 
-        attacks_per_second['instant_poison'] = (mh_poison_procs + oh_poison_procs) * self.spell_hit_chance()
-        attacks_per_second['deadly_poison'] = 1. / 3
+        rates[ledger.INSTANT_POISON] = (mh_poison_procs + oh_poison_procs) * self.poison_hit_chance
+        rates[ledger.DEADLY_POISON] = 1. / 3
+
+        return counts
 
-        return attacks_per_second, crit_rates
+    def assassination_attack_counts_backstab(self, current_stats, counts=None):
+        # Fills counts, an AbilityLedger (see calcs.rogue.Aldriana.ledger),
+        # or a new one, and returns it.
+        if counts is None:
+            counts = ledger.AbilityLedger()
+        else:
+            counts.reset()
+        rates = counts.rates
+        crit_rates = counts.crit_rates
 
-    def assassination_attack_counts_backstab(self, current_stats):
         base_melee_crit_rate = self.melee_crit_rate(agi=current_stats['agi'], crit=current_stats['crit'])
         base_spell_crit_rate = self.spell_crit_rate(crit=current_stats['crit'])
 
@@ -746,19 +1009,16 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
         attack_speed_multiplier = self.base_speed_multiplier * haste_multiplier
 
         backstab_crit_rate = base_melee_crit_rate + self.stats.gear_buffs.rogue_t11_2pc_crit_bonus() + .1 * self.talents.puncturing_wounds
-        if backstab_crit_rate > 1:
-            backstab_crit_rate = 1.
-
-        crit_rates = {
-            'mh_autoattacks': min(base_melee_crit_rate, self.dual_wield_mh_hit_chance() - self.GLANCE_RATE),
-            'oh_autoattacks': min(base_melee_crit_rate, self.dual_wield_oh_hit_chance() - self.GLANCE_RATE),
-            'backstab': backstab_crit_rate,
-            'envenom': base_melee_crit_rate,
-            'rupture_ticks': base_melee_crit_rate,
-            'venomous_wounds': base_spell_crit_rate,
-            'instant_poison': base_spell_crit_rate,
-            'deadly_poison': base_spell_crit_rate
-        }
+        backstab_crit_rate = arrays.minimum(backstab_crit_rate, 1.)
+
+        crit_rates[ledger.MH_AUTOATTACKS] = arrays.minimum(base_melee_crit_rate, self.mh_autoattack_hit_chance - self.GLANCE_RATE)
+        crit_rates[ledger.OH_AUTOATTACKS] = arrays.minimum(base_melee_crit_rate, self.oh_autoattack_hit_chance - self.GLANCE_RATE)
+        crit_rates[ledger.BACKSTAB] = backstab_crit_rate
+        crit_rates[ledger.ENVENOM] = base_melee_crit_rate
+        crit_rates[ledger.RUPTURE_TICKS] = base_melee_crit_rate
+        crit_rates[ledger.VENOMOUS_WOUNDS] = base_spell_crit_rate
+        crit_rates[ledger.INSTANT_POISON] = base_spell_crit_rate
+        crit_rates[ledger.DEADLY_POISON] = base_spell_crit_rate
 
         backstab_energy_cost = 48 + 12 / self.strike_hit_chance
         backstab_energy_cost -= 15 * self.talents.murderous_intent
@@ -790,34 +1050,34 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
         envenom_energy_cost = bs_per_finisher * backstab_energy_cost + self.envenom_energy_cost - cp_per_finisher * self.relentless_strikes_energy_return_per_cp
         envenoms_per_cycle = energy_for_envenoms / envenom_energy_cost
 
-        attacks_per_second = {}
-
         envenoms_per_second = envenoms_per_cycle / average_cycle_length
-        attacks_per_second['rupture'] = 1 / average_cycle_length
-        attacks_per_second['backstab'] = (envenoms_per_second + attacks_per_second['rupture']) * bs_per_finisher
+        rates[ledger.RUPTURE] = 1 / average_cycle_length
+        rates[ledger.BACKSTAB] = (envenoms_per_second + rates[ledger.RUPTURE]) * bs_per_finisher
 
         if self.talents.cold_blood:
             envenoms_per_cold_blood = 120 * envenoms_per_second
-            crit_rates['envenom'] = ((envenoms_per_cold_blood - 1) * crit_rates['envenom'] + 1) / envenoms_per_cold_blood
+            crit_rates[ledger.ENVENOM] = ((envenoms_per_cold_blood - 1) * crit_rates[ledger.ENVENOM] + 1) / envenoms_per_cold_blood
 
-        attacks_per_second['envenom'] = [finisher_chance * envenoms_per_second for finisher_chance in finisher_size_breakdown]
+        envenoms = [finisher_chance * envenoms_per_second for finisher_chance in finisher_size_breakdown]
+        counts.set_finisher_rates(ledger.ENVENOM, envenoms)
 
-        attacks_per_second['rupture_ticks'] = [0, 0, 0, 0, 0, 0]
+        rupture_ticks = [0, 0, 0, 0, 0, 0]
         for i in xrange(1, 6):
             ticks_per_rupture = 3 + i + 2 * self.glyphs.rupture
-            attacks_per_second['rupture_ticks'][i] = ticks_per_rupture * attacks_per_second['rupture'] * finisher_size_breakdown[i]
+            rupture_ticks[i] = ticks_per_rupture * rates[ledger.RUPTURE] * finisher_size_breakdown[i]
+        counts.set_finisher_rates(ledger.RUPTURE_TICKS, rupture_ticks)
 
-        total_rupture_ticks = sum(attacks_per_second['rupture_ticks'])
-        attacks_per_second['venomous_wounds'] = total_rupture_ticks * .3 * self.talents.venomous_wounds * self.spell_hit_chance()
+        total_rupture_ticks = rates[ledger.RUPTURE_TICKS]
+        rates[ledger.VENOMOUS_WOUNDS] = total_rupture_ticks * .3 * self.talents.venomous_wounds * self.poison_hit_chance
 
-        attacks_per_second['mh_autoattacks'] = attack_speed_multiplier / self.stats.mh.speed
-        attacks_per_second['oh_autoattacks'] = attack_speed_multiplier / self.stats.oh.speed
+        rates[ledger.MH_AUTOATTACKS] = attack_speed_multiplier / self.stats.mh.speed
+        rates[ledger.OH_AUTOATTACKS] = attack_speed_multiplier / self.stats.oh.speed
 
-        attacks_per_second['mh_autoattack_hits'] = attacks_per_second['mh_autoattacks'] * self.dual_wield_mh_hit_chance()
-        attacks_per_second['oh_autoattack_hits'] = attacks_per_second['oh_autoattacks'] * self.dual_wield_oh_hit_chance()
+        rates[ledger.MH_AUTOATTACK_HITS] = rates[ledger.MH_AUTOATTACKS] * self.mh_autoattack_hit_chance
+        rates[ledger.OH_AUTOATTACK_HITS] = rates[ledger.OH_AUTOATTACKS] * self.oh_autoattack_hit_chance
 
-        total_mh_hits_per_second = attacks_per_second['mh_autoattack_hits'] + attacks_per_second['backstab'] + envenoms_per_second + attacks_per_second['rupture']
-        total_oh_hits_per_second = attacks_per_second['oh_autoattack_hits']
+        total_mh_hits_per_second = rates[ledger.MH_AUTOATTACK_HITS] + rates[ledger.BACKSTAB] + envenoms_per_second + rates[ledger.RUPTURE]
+        total_oh_hits_per_second = rates[ledger.OH_AUTOATTACK_HITS]
 
         if self.settings.mh_poison == 'ip':
             ip_base_proc_rate = .3 * self.stats.mh.speed / 1.4
@@ -829,7 +1089,7 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
         dp_base_proc_rate = .5
         dp_envenom_proc_rate = dp_base_proc_rate + .15
 
-        envenom_uptime = min(sum([(1 / self.strike_hit_chance + cps) * attacks_per_second['envenom'][cps] for cps in xrange(1,6)]), 1)
+        envenom_uptime = arrays.minimum(sum([(1 / self.strike_hit_chance + cps) * envenoms[cps] for cps in xrange(1,6)]), 1)
         avg_ip_proc_rate = ip_base_proc_rate * (1 - envenom_uptime) + ip_envenom_proc_rate * envenom_uptime
         avg_dp_proc_rate = dp_base_proc_rate * (1 - envenom_uptime) + dp_envenom_proc_rate * envenom_uptime
 
@@ -840,19 +1100,41 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
             mh_poison_procs = avg_dp_proc_rate * total_mh_hits_per_second
             oh_poison_procs = avg_ip_proc_rate * total_oh_hits_per_second
 
-        attacks_per_second['instant_poison'] = (mh_poison_procs + oh_poison_procs) * self.spell_hit_chance()
-        attacks_per_second['deadly_poison'] = 1. / 3
+        rates[ledger.INSTANT_POISON] = (mh_poison_procs + oh_poison_procs) * self.poison_hit_chance
+        rates[ledger.DEADLY_POISON] = 1. / 3
 
-        return attacks_per_second, crit_rates
+        return counts
 
     ###########################################################################
     # Combat DPS functions
     ###########################################################################
 
     def combat_dps_estimate(self):
-        return sum(self.combat_dps_breakdown().values())
+        self.init_combat()
+        return self.compute_damage(self.combat_attack_counts, self.get_combat_multipliers)
 
     def combat_dps_breakdown(self):
+        self.init_combat()
+        damage_breakdown = self.compute_damage(self.combat_attack_counts)
+        return self.apply_multipliers(damage_breakdown, self.get_combat_multipliers())
+
+    def get_combat_multipliers(self):
+        # See get_assassination_multipliers.
+        if self.settings.cycle.ksp_immediately:
+            killing_spree_multiplier = self.bandits_guile_multiplier * (1.2 + .1 * self.glyphs.killing_spree)
+        else:
+            killing_spree_multiplier = self.max_bandits_guile_buff * (1.2 + .1 * self.glyphs.killing_spree)
+        multipliers = {
+            'killing_spree': killing_spree_multiplier,
+            'sinister_strike': self.bandits_guile_multiplier,
+            'revealing_strike': self.bandits_guile_multiplier,
+            'eviscerate': self.bandits_guile_multiplier * self.revealing_strike_multiplier,
+            'rupture': self.bandits_guile_multiplier * self.ksp_multiplier * self.revealing_strike_multiplier
+        }
+        return multipliers, self.bandits_guile_multiplier * self.ksp_multiplier
+
+    def init_combat(self):
+        # Like init_assassination.
         if self.settings.cycle._cycle_type != 'combat':
             raise InputNotModeledException(_('You must specify a combat cycle to match your combat spec.'))
 
@@ -874,26 +1156,15 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
 
         self.base_energy_regen = 12.5
 
-        damage_breakdown = self.compute_damage(self.combat_attack_counts)
-        for key in damage_breakdown:
-            if key == 'killing_spree':
-                if self.settings.cycle.ksp_immediately:
-                    damage_breakdown[key] *= self.bandits_guile_multiplier * (1.2 + .1 * self.glyphs.killing_spree)
-                else:
-                    damage_breakdown[key] *= self.max_bandits_guile_buff * (1.2 + .1 * self.glyphs.killing_spree)
-            elif key in ('sinister_strike', 'revealing_strike'):
-                damage_breakdown[key] *= self.bandits_guile_multiplier
-            elif key == 'eviscerate':
-                damage_breakdown[key] *= self.bandits_guile_multiplier * self.revealing_strike_multiplier
-            elif key == 'rupture':
-                damage_breakdown[key] *= self.bandits_guile_multiplier * self.ksp_multiplier * self.revealing_strike_multiplier
-            else:
-                damage_breakdown[key] *= self.bandits_guile_multiplier * self.ksp_multiplier
-
-        return damage_breakdown
-
-    def combat_attack_counts(self, current_stats):
-        attacks_per_second = {}
+    def combat_attack_counts(self, current_stats, counts=None):
+        # Fills counts, an AbilityLedger (see calcs.rogue.Aldriana.ledger),
+        # or a new one, and returns it.
+        if counts is None:
+            counts = ledger.AbilityLedger()
+        else:
+            counts.reset()
+        rates = counts.rates
+        crit_rates = counts.crit_rates
 
         base_melee_crit_rate = self.melee_crit_rate(agi=current_stats['agi'], crit=current_stats['crit'])
         base_spell_crit_rate = self.spell_crit_rate(crit=current_stats['crit'])
@@ -902,16 +1173,16 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
 
         attack_speed_multiplier = self.base_speed_multiplier * haste_multiplier * (1 + .02 * self.talents.lightning_reflexes)
 
-        attacks_per_second['mh_autoattacks'] = attack_speed_multiplier / self.stats.mh.speed
-        attacks_per_second['oh_autoattacks'] = attack_speed_multiplier / self.stats.oh.speed
+        rates[ledger.MH_AUTOATTACKS] = attack_speed_multiplier / self.stats.mh.speed
+        rates[ledger.OH_AUTOATTACKS] = attack_speed_multiplier / self.stats.oh.speed
 
-        attacks_per_second['mh_autoattack_hits'] = attacks_per_second['mh_autoattacks'] * self.dual_wield_mh_hit_chance()
-        attacks_per_second['oh_autoattack_hits'] = attacks_per_second['oh_autoattacks'] * self.dual_wield_oh_hit_chance()
+        rates[ledger.MH_AUTOATTACK_HITS] = rates[ledger.MH_AUTOATTACKS] * self.mh_autoattack_hit_chance
+        rates[ledger.OH_AUTOATTACK_HITS] = rates[ledger.OH_AUTOATTACKS] * self.oh_autoattack_hit_chance
 
-        main_gauche_proc_rate = .02 * self.stats.get_mastery_from_rating(current_stats['mastery']) * self.off_hand_melee_hit_chance()
-        attacks_per_second['main_gauche'] = main_gauche_proc_rate * attacks_per_second['mh_autoattacks']
+        main_gauche_proc_rate = .02 * self.stats.get_mastery_from_rating(current_stats['mastery']) * self.oh_strike_hit_chance
+        rates[ledger.MAIN_GAUCHE] = main_gauche_proc_rate * rates[ledger.MH_AUTOATTACKS]
 
-        autoattack_cp_regen = self.talents.combat_potency * (attacks_per_second['oh_autoattack_hits'] + attacks_per_second['main_gauche'])
+        autoattack_cp_regen = self.talents.combat_potency * (rates[ledger.OH_AUTOATTACK_HITS] + rates[ledger.MAIN_GAUCHE])
         energy_regen = self.base_energy_regen * haste_multiplier + self.bonus_energy_regen + autoattack_cp_regen
 
         rupture_energy_cost = self.base_rupture_energy_cost - main_gauche_proc_rate * self.talents.combat_potency
@@ -919,20 +1190,18 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
         revealing_strike_energy_cost = self.base_revealing_strike_energy_cost - main_gauche_proc_rate * self.talents.combat_potency
         sinister_strike_energy_cost = self.base_sinister_strike_energy_cost - main_gauche_proc_rate * self.talents.combat_potency
 
-        crit_rates = {
-            'mh_autoattacks': min(base_melee_crit_rate, self.dual_wield_mh_hit_chance() - self.GLANCE_RATE),
-            'oh_autoattacks': min(base_melee_crit_rate, self.dual_wield_oh_hit_chance() - self.GLANCE_RATE),
-            'main_gauche': base_melee_crit_rate,
-            'sinister_strike': base_melee_crit_rate + self.stats.gear_buffs.rogue_t11_2pc_crit_bonus(),
-            'revealing_strike': base_melee_crit_rate,
-            'eviscerate': base_melee_crit_rate + .1 * self.glyphs.eviscerate,
-            'mh_killing_spree': base_melee_crit_rate,
-            'oh_killing_spree': base_melee_crit_rate,
-            'rupture_ticks': base_melee_crit_rate,
-            'instant_poison': base_spell_crit_rate,
-            'deadly_poison': base_spell_crit_rate,
-            'wound_poison': base_spell_crit_rate
-        }
+        crit_rates[ledger.MH_AUTOATTACKS] = arrays.minimum(base_melee_crit_rate, self.mh_autoattack_hit_chance - self.GLANCE_RATE)
+        crit_rates[ledger.OH_AUTOATTACKS] = arrays.minimum(base_melee_crit_rate, self.oh_autoattack_hit_chance - self.GLANCE_RATE)
+        crit_rates[ledger.MAIN_GAUCHE] = base_melee_crit_rate
+        crit_rates[ledger.SINISTER_STRIKE] = base_melee_crit_rate + self.stats.gear_buffs.rogue_t11_2pc_crit_bonus()
+        crit_rates[ledger.REVEALING_STRIKE] = base_melee_crit_rate
+        crit_rates[ledger.EVISCERATE] = base_melee_crit_rate + .1 * self.glyphs.eviscerate
+        crit_rates[ledger.MH_KILLING_SPREE] = base_melee_crit_rate
+        crit_rates[ledger.OH_KILLING_SPREE] = base_melee_crit_rate
+        crit_rates[ledger.RUPTURE_TICKS] = base_melee_crit_rate
+        crit_rates[ledger.INSTANT_POISON] = base_spell_crit_rate
+        crit_rates[ledger.DEADLY_POISON] = base_spell_crit_rate
+        crit_rates[ledger.WOUND_POISON] = base_spell_crit_rate
 
         extra_cp_chance = 0
         if self.glyphs.sinister_strike:
@@ -998,15 +1267,15 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
         avg_rupture_gap = (total_rupture_cost - .5 * total_eviscerate_cost) / energy_regen
         avg_rupture_duration = 2 * (3 + 2 * self.glyphs.rupture + cp_per_finisher)
         if self.settings.cycle.use_rupture:
-            attacks_per_second['rupture'] = 1 / (avg_rupture_duration + avg_rupture_gap)
+            rates[ledger.RUPTURE] = 1 / (avg_rupture_duration + avg_rupture_gap)
         else:
-            attacks_per_second['rupture'] = 0
-        energy_spent_on_rupture = total_rupture_cost * attacks_per_second['rupture']
+            rates[ledger.RUPTURE] = 0
+        energy_spent_on_rupture = total_rupture_cost * rates[ledger.RUPTURE]
 
         energy_available_for_evis = energy_regen - energy_spent_on_snd - energy_spent_on_rupture
         evis_per_second = energy_available_for_evis / total_eviscerate_cost
 
-        cp_spent_on_damage_finishers_per_second = (attacks_per_second['rupture'] + evis_per_second) * cp_per_finisher
+        cp_spent_on_damage_finishers_per_second = (rates[ledger.RUPTURE] + evis_per_second) * cp_per_finisher
 
         if self.talents.adrenaline_rush:
             ar_duration = 15 + 5 * self.glyphs.adrenaline_rush
@@ -1024,18 +1293,18 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
         ar_uptime = ar_duration / ar_actual_cooldown
         ar_autoattack_multiplier = 1 + .2 * ar_uptime
 
-        for attack in ('mh_autoattacks', 'mh_autoattack_hits', 'oh_autoattacks', 'oh_autoattack_hits', 'main_gauche'):
-            attacks_per_second[attack] *= ar_autoattack_multiplier
+        for attack in (ledger.MH_AUTOATTACKS, ledger.MH_AUTOATTACK_HITS, ledger.OH_AUTOATTACKS, ledger.OH_AUTOATTACK_HITS, ledger.MAIN_GAUCHE):
+            rates[attack] *= ar_autoattack_multiplier
 
-        total_restless_blades_benefit = (total_evis_per_second + attacks_per_second['rupture']) * cp_per_finisher * self.talents.restless_blades
+        total_restless_blades_benefit = (total_evis_per_second + rates[ledger.RUPTURE]) * cp_per_finisher * self.talents.restless_blades
         ksp_cooldown = 120 / total_restless_blades_benefit + self.settings.response_time
 
-        attacks_per_second['sinister_strike'] = (total_evis_per_second + attacks_per_second['rupture']) * ss_per_finisher + ss_per_snd / (snd_duration - self.settings.response_time)
-        attacks_per_second['revealing_strike'] = (total_evis_per_second + attacks_per_second['rupture']) * rvs_per_finisher
-        attacks_per_second['main_gauche'] += (attacks_per_second['sinister_strike'] + attacks_per_second['revealing_strike'] + total_evis_per_second + attacks_per_second['rupture']) * main_gauche_proc_rate
+        rates[ledger.SINISTER_STRIKE] = (total_evis_per_second + rates[ledger.RUPTURE]) * ss_per_finisher + ss_per_snd / (snd_duration - self.settings.response_time)
+        rates[ledger.REVEALING_STRIKE] = (total_evis_per_second + rates[ledger.RUPTURE]) * rvs_per_finisher
+        rates[ledger.MAIN_GAUCHE] += (rates[ledger.SINISTER_STRIKE] + rates[ledger.REVEALING_STRIKE] + total_evis_per_second + rates[ledger.RUPTURE]) * main_gauche_proc_rate
 
         if self.talents.bandits_guile:
-            time_at_level = 9 / ((attacks_per_second['sinister_strike'] + attacks_per_second['revealing_strike']) * self.talents.bandits_guile)
+            time_at_level = 9 / ((rates[ledger.SINISTER_STRIKE] + rates[ledger.REVEALING_STRIKE]) * self.talents.bandits_guile)
             cycle_duration = 3 * time_at_level + 15
             if not self.settings.cycle.ksp_immediately:
                 avg_wait_till_full_stack = 1.5 * time_at_level / cycle_duration
@@ -1046,8 +1315,8 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
             self.bandits_guile_multiplier = 1
 
         if self.talents.killing_spree:
-            attacks_per_second['mh_killing_spree'] = 5 * self.strike_hit_chance / ksp_cooldown
-            attacks_per_second['oh_killing_spree'] = 5 * self.off_hand_melee_hit_chance() / ksp_cooldown
+            rates[ledger.MH_KILLING_SPREE] = 5 * self.strike_hit_chance / ksp_cooldown
+            rates[ledger.OH_KILLING_SPREE] = 5 * self.oh_strike_hit_chance / ksp_cooldown
             ksp_uptime = 2. / ksp_cooldown
 
             ksp_buff = .2 + .1 * self.glyphs.killing_spree
@@ -1056,32 +1325,58 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
             else:
                 self.ksp_multiplier = 1 + ksp_uptime * ksp_buff * self.max_bandits_guile_buff / self.bandits_guile_multiplier
         else:
-            attacks_per_second['mh_killing_spree'] = 0
-            attacks_per_second['oh_killing_spree'] = 0
+            rates[ledger.MH_KILLING_SPREE] = 0
+            rates[ledger.OH_KILLING_SPREE] = 0
             self.ksp_multiplier = 1
 
-        attacks_per_second['eviscerate'] = [finisher_chance * total_evis_per_second for finisher_chance in finisher_size_breakdown]
+        counts.set_finisher_rates(ledger.EVISCERATE, [finisher_chance * total_evis_per_second for finisher_chance in finisher_size_breakdown])
 
-        attacks_per_second['rupture_ticks'] = [0, 0, 0, 0, 0, 0]
+        rupture_ticks = [0, 0, 0, 0, 0, 0]
         for i in xrange(1, 6):
             ticks_per_rupture = 3 + i + 2 * self.glyphs.rupture
-            attacks_per_second['rupture_ticks'][i] = ticks_per_rupture * attacks_per_second['rupture'] * finisher_size_breakdown[i]
+            rupture_ticks[i] = ticks_per_rupture * rates[ledger.RUPTURE] * finisher_size_breakdown[i]
+        counts.set_finisher_rates(ledger.RUPTURE_TICKS, rupture_ticks)
 
-        total_mh_hits = attacks_per_second['mh_autoattack_hits'] + attacks_per_second['sinister_strike'] + attacks_per_second['revealing_strike'] + attacks_per_second['mh_killing_spree'] + attacks_per_second['rupture'] + total_evis_per_second
-        total_oh_hits = attacks_per_second['oh_autoattack_hits'] + attacks_per_second['main_gauche'] + attacks_per_second['oh_killing_spree']
+        total_mh_hits = rates[ledger.MH_AUTOATTACK_HITS] + rates[ledger.SINISTER_STRIKE] + rates[ledger.REVEALING_STRIKE] + rates[ledger.MH_KILLING_SPREE] + rates[ledger.RUPTURE] + total_evis_per_second
+        total_oh_hits = rates[ledger.OH_AUTOATTACK_HITS] + rates[ledger.MAIN_GAUCHE] + rates[ledger.OH_KILLING_SPREE]
 
-        self.get_poison_counts(total_mh_hits, total_oh_hits, attacks_per_second)
+        self.get_poison_counts(total_mh_hits, total_oh_hits, counts)
 
-        return attacks_per_second, crit_rates
+        return counts
 
     ###########################################################################
     # Subtlety DPS functions
     ###########################################################################
 
     def subtlety_dps_estimate(self):
-        return sum(self.subtlety_dps_breakdown().values())
+        self.init_subtlety()
+        return self.compute_damage(self.subtlety_attack_counts_backstab, self.get_subtlety_multipliers)
 
     def subtlety_dps_breakdown(self):
+        self.init_subtlety()
+        damage_breakdown = self.compute_damage(self.subtlety_attack_counts_backstab)
+        return self.apply_multipliers(damage_breakdown, self.get_subtlety_multipliers())
+
+    def get_subtlety_multipliers(self):
+        # See get_assassination_multipliers.
+        if self.talents.find_weakness:
+            armor_value = self.target_armor()
+            armor_reduction = (1 - .25 * self.talents.find_weakness)
+            find_weakness_damage_boost = self.armor_mitigation_multiplier(armor_reduction * armor_value) / self.armor_mitigation_multiplier(armor_value)
+            find_weakness_multiplier = 1 + (find_weakness_damage_boost - 1) * self.find_weakness_uptime
+        else:
+            find_weakness_damage_boost = 1
+            find_weakness_multiplier = 1
+
+        multipliers = {
+            'ambush': ((1.3 * self.ambush_shadowstep_rate) + (1-self.ambush_shadowstep_rate) * find_weakness_damage_boost)
+        }
+        for key in ('autoattack', 'backstab', 'eviscerate', 'hemorrhage'):
+            multipliers[key] = find_weakness_multiplier
+        return multipliers, 1
+
+    def init_subtlety(self):
+        # Like init_assassination.
         if self.settings.cycle._cycle_type != 'subtlety':
             raise InputNotModeledException(_('You must specify a subtlety cycle to match your subtlety spec.'))
 
@@ -1103,25 +1398,15 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
 
         self.agi_multiplier *= 1.25
 
-        damage_breakdown = self.compute_damage(self.subtlety_attack_counts_backstab)
-        if self.talents.find_weakness:
-            armor_value = self.target_armor()
-            armor_reduction = (1 - .25 * self.talents.find_weakness)
-            find_weakness_damage_boost = self.armor_mitigation_multiplier(armor_reduction * armor_value) / self.armor_mitigation_multiplier(armor_value)
-            find_weakness_multiplier = 1 + (find_weakness_damage_boost - 1) * self.find_weakness_uptime
+    def subtlety_attack_counts_backstab(self, current_stats, counts=None):
+        # Fills counts, an AbilityLedger (see calcs.rogue.Aldriana.ledger),
+        # or a new one, and returns it.
+        if counts is None:
+            counts = ledger.AbilityLedger()
         else:
-            find_weakness_multiplier = 1
-
-        for key in damage_breakdown:
-            if key in ('autoattack', 'backstab', 'eviscerate', 'hemorrhage'):
-                damage_breakdown[key] *= find_weakness_multiplier
-            if key == 'ambush':
-                damage_breakdown[key] *= ((1.3 * self.ambush_shadowstep_rate) + (1-self.ambush_shadowstep_rate) * find_weakness_damage_boost)
-
-        return damage_breakdown
-
-    def subtlety_attack_counts_backstab(self, current_stats):
-        attacks_per_second = {}
+            counts.reset()
+        rates = counts.rates
+        crit_rates = counts.crit_rates
 
         base_melee_crit_rate = self.melee_crit_rate(agi=current_stats['agi'], crit=current_stats['crit'])
         base_spell_crit_rate = self.spell_crit_rate(crit=current_stats['crit'])
@@ -1132,32 +1417,28 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
 
         attack_speed_multiplier = self.base_speed_multiplier * haste_multiplier * mastery_snd_speed / 1.4
 
-        attacks_per_second['mh_autoattacks'] = attack_speed_multiplier / self.stats.mh.speed
-        attacks_per_second['oh_autoattacks'] = attack_speed_multiplier / self.stats.oh.speed
+        rates[ledger.MH_AUTOATTACKS] = attack_speed_multiplier / self.stats.mh.speed
+        rates[ledger.OH_AUTOATTACKS] = attack_speed_multiplier / self.stats.oh.speed
 
-        attacks_per_second['mh_autoattack_hits'] = attacks_per_second['mh_autoattacks'] * self.dual_wield_mh_hit_chance()
-        attacks_per_second['oh_autoattack_hits'] = attacks_per_second['oh_autoattacks'] * self.dual_wield_oh_hit_chance()
+        rates[ledger.MH_AUTOATTACK_HITS] = rates[ledger.MH_AUTOATTACKS] * self.mh_autoattack_hit_chance
+        rates[ledger.OH_AUTOATTACK_HITS] = rates[ledger.OH_AUTOATTACKS] * self.oh_autoattack_hit_chance
 
         backstab_crit_rate = base_melee_crit_rate + self.stats.gear_buffs.rogue_t11_2pc_crit_bonus() + .1 * self.talents.puncturing_wounds
-        if backstab_crit_rate > 1:
-            backstab_crit_rate = 1.
+        backstab_crit_rate = arrays.minimum(backstab_crit_rate, 1.)
 
         ambush_crit_rate = base_melee_crit_rate + .2 * self.talents.improved_ambush
-        if ambush_crit_rate > 1:
-            ambush_crit_rate = 1
-
-        crit_rates = {
-            'mh_autoattacks': min(base_melee_crit_rate, self.dual_wield_mh_hit_chance() - self.GLANCE_RATE),
-            'oh_autoattacks': min(base_melee_crit_rate, self.dual_wield_oh_hit_chance() - self.GLANCE_RATE),
-            'eviscerate': base_melee_crit_rate + .1 * self.glyphs.eviscerate,
-            'backstab': backstab_crit_rate,
-            'ambush': ambush_crit_rate,
-            'hemorrhage': base_melee_crit_rate,
-            'rupture_ticks': base_melee_crit_rate,
-            'instant_poison': base_spell_crit_rate,
-            'deadly_poison': base_spell_crit_rate,
-            'wound_poison': base_spell_crit_rate
-        }
+        ambush_crit_rate = arrays.minimum(ambush_crit_rate, 1)
+
+        crit_rates[ledger.MH_AUTOATTACKS] = arrays.minimum(base_melee_crit_rate, self.mh_autoattack_hit_chance - self.GLANCE_RATE)
+        crit_rates[ledger.OH_AUTOATTACKS] = arrays.minimum(base_melee_crit_rate, self.oh_autoattack_hit_chance - self.GLANCE_RATE)
+        crit_rates[ledger.EVISCERATE] = base_melee_crit_rate + .1 * self.glyphs.eviscerate
+        crit_rates[ledger.BACKSTAB] = backstab_crit_rate
+        crit_rates[ledger.AMBUSH] = ambush_crit_rate
+        crit_rates[ledger.HEMORRHAGE] = base_melee_crit_rate
+        crit_rates[ledger.RUPTURE_TICKS] = base_melee_crit_rate
+        crit_rates[ledger.INSTANT_POISON] = base_spell_crit_rate
+        crit_rates[ledger.DEADLY_POISON] = base_spell_crit_rate
+        crit_rates[ledger.WOUND_POISON] = base_spell_crit_rate
 
         if self.glyphs.backstab:
             backstab_energy_cost = self.base_backstab_energy_cost - 5 * backstab_crit_rate
@@ -1230,9 +1511,9 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
         total_cost_of_extra_eviscerate = (5 - .2 * self.talents.ruthlessness) * backstab_energy_cost + self.base_eviscerate_energy_cost - 5 * self.relentless_strikes_energy_return_per_cp
         extra_eviscerates_per_cycle = energy_for_evis_spam / total_cost_of_extra_eviscerate
 
-        attacks_per_second['backstab'] = (5 - .2 * self.talents.ruthlessness) * extra_eviscerates_per_cycle / cycle_length
-        attacks_per_second['eviscerate'] = [0, 0, 0, 0, 0, (bonus_eviscerates + extra_eviscerates_per_cycle) / cycle_length]
-        attacks_per_second['ambush'] = ambushes_from_vanish
+        rates[ledger.BACKSTAB] = (5 - .2 * self.talents.ruthlessness) * extra_eviscerates_per_cycle / cycle_length
+        eviscerates = [0, 0, 0, 0, 0, (bonus_eviscerates + extra_eviscerates_per_cycle) / cycle_length]
+        rates[ledger.AMBUSH] = ambushes_from_vanish
 
         if self.talents.shadow_dance:
             shadow_dance_duration = 6 + 2 * self.glyphs.shadow_dance
@@ -1259,19 +1540,20 @@ class AldrianasRogueDamageCalculator(RogueDamageCalculator):
 
             self.ambush_shadowstep_rate = (shadow_dance_frequency + ambushes_from_vanish) / (shadow_dance_extra_ambushes + ambushes_from_vanish)
 
-            attacks_per_second['backstab'] -= shadow_dance_replaced_backstabs * shadow_dance_frequency
-            attacks_per_second['ambush'] += shadow_dance_extra_ambushes * shadow_dance_frequency
-            attacks_per_second['eviscerate'][5] += shadow_dance_extra_eviscerates * shadow_dance_frequency
+            rates[ledger.BACKSTAB] -= shadow_dance_replaced_backstabs * shadow_dance_frequency
+            rates[ledger.AMBUSH] += shadow_dance_extra_ambushes * shadow_dance_frequency
+            eviscerates[5] += shadow_dance_extra_eviscerates * shadow_dance_frequency
 
             self.find_weakness_uptime += (10 + shadow_dance_duration - self.settings.response_time) * shadow_dance_frequency
         else:
             self.ambush_shadowstep_rate = 1
 
-        attacks_per_second['rupture_ticks'] = (0, 0, 0, 0, 0, .5)
+        counts.set_finisher_rates(ledger.EVISCERATE, eviscerates)
+        counts.set_finisher_rates(ledger.RUPTURE_TICKS, (0, 0, 0, 0, 0, .5))
 
-        total_mh_hits = attacks_per_second['mh_autoattack_hits'] + attacks_per_second['backstab'] + sum(attacks_per_second['eviscerate']) + attacks_per_second['ambush']
-        total_oh_hits = attacks_per_second['oh_autoattack_hits']
+        total_mh_hits = rates[ledger.MH_AUTOATTACK_HITS] + rates[ledger.BACKSTAB] + rates[ledger.EVISCERATE] + rates[ledger.AMBUSH]
+        total_oh_hits = rates[ledger.OH_AUTOATTACK_HITS]
 
-        self.get_poison_counts(total_mh_hits, total_oh_hits, attacks_per_second)
+        self.get_poison_counts(total_mh_hits, total_oh_hits, counts)
 
-        return attacks_per_second, crit_rates
+        return counts
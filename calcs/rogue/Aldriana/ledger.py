@@ -0,0 +1,153 @@
+import collections
+
+from calcs import arrays
+
+# How often every ability in a cycle happens and how often it crits, as the
+# attack counts functions of AldrianasRogueDamageCalculator work them out.
+# Every ability the model knows has a fixed slot, so a ledger is a few flat
+# lists rather than dicts keyed by name; the fixed point loop compares and
+# sums them by position, and refills the same ledgers on every iteration
+# instead of building new ones.
+#
+# Slots of AbilityLedger.rates and AbilityLedger.crit_rates:
+(MH_AUTOATTACKS, MH_AUTOATTACK_HITS, OH_AUTOATTACKS, OH_AUTOATTACK_HITS,
+ MUTILATE, BACKSTAB, HEMORRHAGE, SINISTER_STRIKE, REVEALING_STRIKE, AMBUSH,
+ MAIN_GAUCHE, MH_KILLING_SPREE, OH_KILLING_SPREE, RUPTURE, VENOMOUS_WOUNDS,
+ INSTANT_POISON, DEADLY_POISON, WOUND_POISON,
+ ENVENOM, EVISCERATE, RUPTURE_TICKS) = range(21)
+
+# The name of each slot, as the attacks_per_second and crit_rates dicts the
+# model used to pass around had them.
+NAMES = ('mh_autoattacks', 'mh_autoattack_hits', 'oh_autoattacks', 'oh_autoattack_hits',
+    'mutilate', 'backstab', 'hemorrhage', 'sinister_strike', 'revealing_strike', 'ambush',
+    'main_gauche', 'mh_killing_spree', 'oh_killing_spree', 'rupture', 'venomous_wounds',
+    'instant_poison', 'deadly_poison', 'wound_poison',
+    'envenom', 'eviscerate', 'rupture_ticks')
+
+SLOTS = dict((name, slot) for slot, name in enumerate(NAMES))
+
+# Finishers (and rupture's ticks) happen at every combo point count; their
+# rates are rows of six, indexed by combo points, in finisher_rates, and
+# their slot in rates holds the sum of the row.  They come last.
+FINISHERS = (ENVENOM, EVISCERATE, RUPTURE_TICKS)
+FIRST_FINISHER = ENVENOM
+ABILITIES = tuple(range(FIRST_FINISHER))
+
+_zeros = [0] * len(NAMES)
+
+
+class AbilityLedger(object):
+    __slots__ = ('rates', 'crit_rates', 'finisher_rates', 'finishers_present', 'proc_rates', 'trigger_rates')
+
+    def __init__(self):
+        self.rates = list(_zeros)
+        self.crit_rates = list(_zeros)
+        self.finisher_rates = [[0] * 6 for finisher in FINISHERS]
+        self.finishers_present = [False] * len(FINISHERS)
+        # How often each damaging proc hits, by proc name.
+        self.proc_rates = {}
+        # How often each class of thing procs are triggered by happens, once
+        # the calculator has worked it out from the rest; see
+        # AldrianasRogueDamageCalculator.get_trigger_rates.  Anything that
+        # changes rates or crit_rates after that must bring it up to date or
+        # set it back to None.
+        self.trigger_rates = None
+
+    def reset(self):
+        # Back to nothing happening, for refilling.
+        self.rates[:] = _zeros
+        self.crit_rates[:] = _zeros
+        for row in self.finisher_rates:
+            row[:] = _zeros[:6]
+        self.finishers_present[:] = [False] * len(FINISHERS)
+        self.proc_rates.clear()
+        self.trigger_rates = None
+
+    def copy(self):
+        ledger = AbilityLedger()
+        ledger.rates[:] = self.rates
+        ledger.crit_rates[:] = self.crit_rates
+        ledger.finisher_rates = [list(row) for row in self.finisher_rates]
+        ledger.finishers_present[:] = self.finishers_present
+        ledger.proc_rates.update(self.proc_rates)
+        return ledger
+
+    def set_finisher_rates(self, finisher, rates):
+        # rates is anything holding the six per combo point rates.
+        row = self.finisher_rates[finisher - FIRST_FINISHER]
+        row[:] = rates
+        self.rates[finisher] = sum(row)
+        self.finishers_present[finisher - FIRST_FINISHER] = True
+
+    def get_finisher_rates(self, finisher):
+        return self.finisher_rates[finisher - FIRST_FINISHER]
+
+    def has_finisher(self, finisher):
+        return self.finishers_present[finisher - FIRST_FINISHER]
+
+    def get_max_difference(self, other):
+        # The largest change in the rate of any ability, or at any combo
+        # point count of any finisher, between two ledgers.  Damaging procs
+        # are left out; they are worked out from the rest.
+        # For a batch (see calcs.arrays), it's the largest for any
+        # character.
+        differences = [arrays.get_max(abs(new - old)) for new, old in zip(self.rates[:FIRST_FINISHER], other.rates[:FIRST_FINISHER])]
+        for new_row, old_row in zip(self.finisher_rates, other.finisher_rates):
+            differences.extend([arrays.get_max(abs(new - old)) for new, old in zip(new_row, old_row)])
+        return max([0] + differences)
+
+    def is_close_to(self, other, precision):
+        # Whether no rate get_max_difference looks at has moved by more than
+        # precision.
+        for new, old in zip(self.rates[:FIRST_FINISHER], other.rates[:FIRST_FINISHER]):
+            if arrays.get_max(abs(new - old)) > precision:
+                return False
+        for new_row, old_row in zip(self.finisher_rates, other.finisher_rates):
+            for new, old in zip(new_row, old_row):
+                if arrays.get_max(abs(new - old)) > precision:
+                    return False
+        return True
+
+    def get_attacks_per_second(self):
+        # A read-only {name: rate} view, finishers' rates being tuples by
+        # combo points and damaging procs included; abilities that don't
+        # happen are left out.
+        return LedgerView(self, 'rates')
+
+    def get_crit_rates(self):
+        # A read-only {name: crit rate} view for the same abilities.
+        return LedgerView(self, 'crit_rates')
+
+
+class LedgerView(collections.Mapping):
+    def __init__(self, ledger, kind):
+        self.ledger = ledger
+        self.kind = kind
+
+    def get_names(self):
+        names = [NAMES[slot] for slot in ABILITIES if arrays.is_nonzero(self.ledger.rates[slot])]
+        names.extend([NAMES[finisher] for finisher in FINISHERS if self.ledger.has_finisher(finisher)])
+        if self.kind == 'rates':
+            names.extend(sorted(self.ledger.proc_rates))
+        return names
+
+    def __getitem__(self, name):
+        if self.kind == 'rates' and name in self.ledger.proc_rates:
+            return self.ledger.proc_rates[name]
+        if name not in SLOTS:
+            raise KeyError(name)
+        slot = SLOTS[name]
+        if slot in FINISHERS:
+            if not self.ledger.has_finisher(slot):
+                raise KeyError(name)
+            if self.kind == 'rates':
+                return tuple(self.ledger.get_finisher_rates(slot))
+        elif not arrays.is_nonzero(self.ledger.rates[slot]):
+            raise KeyError(name)
+        return getattr(self.ledger, self.kind)[slot]
+
+    def __iter__(self):
+        return iter(self.get_names())
+
+    def __len__(self):
+        return len(self.get_names())
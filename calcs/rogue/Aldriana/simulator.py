@@ -0,0 +1,683 @@
+import heapq
+import math
+import random
+
+from calcs.rogue.Aldriana import AldrianasRogueDamageCalculator
+from calcs.rogue.Aldriana import InputNotModeledException
+from core import exceptions
+from core import worker_pool
+
+# A discrete event simulation of the fight AldrianasRogueDamageCalculator
+# models in closed form, for checking its numbers where averaging is most
+# likely to be off: procs with internal cooldowns and stacks, several of
+# them at once, and cooldowns such as heroism, vendetta and potions that the
+# model spreads out over the fight.  Energy, combo points, swing timers,
+# poisons, procs and cooldowns are all tracked as they happen, each fight
+# with its own seeded random numbers, and the fights are repeated until the
+# confidence interval on the mean dps is as narrow as asked for.
+#
+# The damage of every hit comes from the calculator's own formulas, at the
+# stats of the moment, so the two only differ in how often things happen.
+# Only the assassination cycle is simulated so far.
+#
+#     simulator = Simulator(calculator, seed=1)
+#     result = simulator.simulate(precision=.005, processes=4)
+#     print calculator.get_dps(), result.dps, result.confidence_interval
+
+class SimulationResult(object):
+    # The mean dps over a number of simulated fights, the confidence
+    # interval on it and the mean dps of every damage source.
+
+    def __init__(self, dps, half_width, confidence, iterations, breakdown):
+        self.dps = dps
+        self.half_width = half_width
+        self.confidence = confidence
+        self.iterations = iterations
+        self.breakdown = breakdown
+        self.confidence_interval = (dps - half_width, dps + half_width)
+
+    def __repr__(self):
+        return 'SimulationResult(%r, %r, %r, %r)' % (self.dps, self.half_width, self.confidence, self.iterations)
+
+
+class Event(object):
+    # Something the fight has to do at a time; events at the same time
+    # happen in the order they were scheduled.
+    __slots__ = ('time', 'order', 'action')
+
+    def __init__(self, time, order, action):
+        self.time = time
+        self.order = order
+        self.action = action
+
+    def __lt__(self, other):
+        if self.time != other.time:
+            return self.time < other.time
+        return self.order < other.order
+
+
+class ProcState(object):
+    # A proc, where it can trigger from and how it stands in one fight.
+    # hand is 'mh' or 'oh' for a weapon enchant, which only procs off the
+    # weapon it's on.
+    __slots__ = ('proc', 'hand', 'triggers', 'stacks', 'ready', 'expiry')
+
+    def __init__(self, proc, hand=None):
+        self.proc = proc
+        self.hand = hand
+        triggers = set()
+        if proc.procs_off_auto_attacks():
+            triggers.add('auto_attack')
+        if proc.procs_off_strikes():
+            triggers.add('strike')
+        if proc.procs_off_apply_debuff():
+            triggers.add('apply_debuff')
+        if proc.procs_off_harmful_spells():
+            triggers.add('harmful_spell')
+        if proc.procs_off_periodic_spell_damage():
+            triggers.add('periodic_spell')
+        if proc.procs_off_bleeds():
+            triggers.add('bleed')
+        self.triggers = frozenset(triggers)
+        self.stacks = 0
+        self.ready = 0
+        self.expiry = None
+
+
+class Simulator(object):
+
+    def __init__(self, calculator, seed=0):
+        # The calculator is copied (see DamageCalculator.for_request), so
+        # simulating never changes it.
+        if not isinstance(calculator, AldrianasRogueDamageCalculator):
+            raise exceptions.InvalidInputException(_('The simulator needs an AldrianasRogueDamageCalculator'))
+        self.calculator = calculator.for_request()
+        self.seed = seed
+        if not self.calculator.talents.is_assassination_rogue():
+            raise InputNotModeledException(_('Only assassination fights can be simulated so far.'))
+        self.calculator.init_assassination()
+
+    def simulate(self, precision=.005, confidence=.95, min_iterations=10, max_iterations=1000, batch_size=10, processes=None):
+        # Simulates fights batch_size at a time until the confidence interval
+        # on the mean dps is within precision of the mean either side, or
+        # max_iterations have been run.  Fight n always has the same random
+        # numbers for a given seed, so the result doesn't depend on
+        # processes, which runs each batch across a pool of that many.
+        if min_iterations < 2 or max_iterations < min_iterations or batch_size < 1:
+            raise exceptions.InvalidInputException(_('The simulator needs at least two iterations and batches of at least one'))
+        if not 0 < confidence < 1:
+            raise exceptions.InvalidInputException(_('Confidence must be between 0 and 1'))
+        z = get_z(confidence)
+
+        pool = None
+        if processes is not None:
+            pool = worker_pool.start(processes, self)
+        try:
+            results = []
+            while len(results) < max_iterations:
+                count = min(batch_size, max_iterations - len(results))
+                if pool is None:
+                    results.extend(self.run_fights(len(results), count))
+                else:
+                    indices = xrange(len(results), len(results) + count)
+                    results.extend(worker_pool.map_method(pool, 'run_fight', [(index,) for index in indices]))
+                if len(results) >= min_iterations:
+                    dps, half_width = get_interval([total for total, breakdown in results], z)
+                    if half_width <= precision * dps:
+                        break
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        dps, half_width = get_interval([total for total, breakdown in results], z)
+        breakdown = {}
+        for total, fight_breakdown in results:
+            for source, source_dps in fight_breakdown.iteritems():
+                breakdown[source] = breakdown.get(source, 0) + source_dps / len(results)
+        return SimulationResult(dps, half_width, confidence, len(results), breakdown)
+
+    def run_fights(self, start, count):
+        return [self.run_fight(index) for index in xrange(start, start + count)]
+
+    def run_fight(self, index):
+        # (dps, {source: dps}) for fight number index.
+        rng = random.Random(hash((self.seed, index)))
+        breakdown = Fight(self.calculator, rng).run()
+        duration = self.calculator.settings.duration
+        for source in breakdown:
+            breakdown[source] /= duration
+        return sum(breakdown.values()), breakdown
+
+
+class Fight(object):
+    # One simulated fight.  Energy is brought up to date whenever it's
+    # needed rather than ticked; swing timers take the attack speed of the
+    # moment each swing is made.
+
+    GCD = 1
+    ENERGY_REFUND = .8
+    DAMAGE_PROC_STATS = ('spell_damage', 'physical_damage')
+
+    def __init__(self, calculator, rng):
+        self.calculator = calculator
+        self.random = rng.random
+        self.queue = []
+        self.order = 0
+        self.time = 0
+        self.damage = {}
+
+        c = calculator
+        talents = c.talents
+        settings = c.settings
+        self.duration = settings.duration
+        self.response_time = settings.response_time
+        self.cycle = settings.cycle
+        self.execute_time = self.duration * (1 - settings.time_in_execute_range)
+
+        # Stats without any of the procs and cooldowns the fight turns on
+        # and off; see set_constants.
+        self.stats = {
+            'agi': c.stats.agi + c.get_profession_stat_bonus('agi') + c.buffs.buff_agi() + c.race.racial_agi,
+            'ap': c.stats.ap + 140,
+            'crit': c.stats.crit + c.get_profession_stat_bonus('crit'),
+            'haste': c.stats.haste,
+            'mastery': c.stats.mastery
+        }
+        self.ap_multiplier = c.buffs.attack_power_multiplier() * (1 + .01 * talents.savage_combat)
+        self.base_attack_speed = 1.4 * c.buffs.melee_haste_multiplier()
+
+        self.strike_hit_chance = c.strike_hit_chance
+        self.spell_hit_chance = c.spell_hit_chance()
+        self.white_hit_chances = {'mh': c.dual_wield_mh_hit_chance(), 'oh': c.dual_wield_oh_hit_chance()}
+        self.weapons = {'mh': c.stats.mh, 'oh': c.stats.oh}
+        self.poisons = {'mh': settings.mh_poison, 'oh': settings.oh_poison}
+        if settings.mh_poison == 'ip':
+            self.ip_chance = .3 * c.stats.mh.speed / 1.4
+        else:
+            self.ip_chance = .3 * c.stats.oh.speed / 1.4
+
+        self.crit_bonus = c.stats.gear_buffs.rogue_t11_2pc_crit_bonus()
+        self.relentless_strikes_chance = c.relentless_strikes_energy_return_per_cp / 25.
+        self.ruthlessness_chance = .2 * talents.ruthlessness
+        self.seal_fate_chance = .5 * talents.seal_fate
+        self.mutilate_cost = 60 - 5 * c.glyphs.mutilate
+        self.backstab_cost = 60 - 15 * talents.murderous_intent
+        self.rupture_ticks = 3 + 2 * c.glyphs.rupture
+        self.venomous_wounds_chance = .3 * talents.venomous_wounds
+        self.max_energy = 100
+        if c.stats.mh.type == 'dagger':
+            self.max_energy += 20
+
+        self.procs = []
+        for proc in c.stats.procs.get_all_procs_for_stat():
+            self.procs.append(ProcState(proc))
+        for hand in ('mh', 'oh'):
+            for enchant in ('landslide', 'hurricane'):
+                if getattr(self.weapons[hand], enchant):
+                    self.procs.append(ProcState(getattr(self.weapons[hand], enchant), hand))
+
+        self.energy = self.max_energy
+        self.energy_time = 0
+        self.cp = 0
+        self.gcd_ready = 0
+        self.next_decision = None
+        self.rupture_ticks_left = 0
+        self.rupture_cp = 0
+        self.envenom_expiry = None
+        self.dp_stacks = 0
+        self.dp_expiry = None
+        self.guaranteed_crit = False
+        self.deadly_scheme = None
+        self.heedless_carnage = None
+        self.speed_multipliers = {}
+        self.regen_multiplier = 1
+        self.damage_multiplier = 1
+        self.energy_regen = 0
+        self.update_stats()
+
+    def schedule(self, delay, action):
+        event = Event(self.time + delay, self.order, action)
+        self.order += 1
+        heapq.heappush(self.queue, event)
+        return event
+
+    def run(self):
+        self.start_cooldowns()
+        self.schedule(0, lambda event: self.swing('mh'))
+        self.schedule(0, lambda event: self.swing('oh'))
+        self.schedule_decision(0)
+        queue = self.queue
+        while queue:
+            event = heapq.heappop(queue)
+            if event.time > self.duration:
+                break
+            self.time = event.time
+            event.action(event)
+        return self.damage
+
+    ###########################################################################
+    # Stats, energy and damage.
+    ###########################################################################
+
+    def update_stats(self):
+        c = self.calculator
+        stats = self.stats
+        agi = stats['agi'] * c.agi_multiplier
+        self.ap = (stats['ap'] + 2 * agi + c.base_strength) * self.ap_multiplier
+        self.melee_crit = c.melee_crit_rate(agi=agi, crit=stats['crit'])
+        self.spell_crit = c.spell_crit_rate(crit=stats['crit'])
+        self.mastery = stats['mastery']
+        self.haste_multiplier = c.stats.get_haste_multiplier_from_rating(stats['haste'])
+        self.update_speed()
+
+    def update_speed(self):
+        self.attack_speed = self.base_attack_speed * self.haste_multiplier
+        for multiplier in self.speed_multipliers.itervalues():
+            self.attack_speed *= multiplier
+        self.settle_energy()
+        self.energy_regen = 10 * self.haste_multiplier * self.regen_multiplier
+        # Energy comes in at a new rate, so when there's enough changes.
+        self.reconsider()
+
+    def add_stat(self, stat, amount):
+        self.stats[stat] += amount
+        self.update_stats()
+
+    def settle_energy(self):
+        self.energy = min(self.energy + self.energy_regen * (self.time - self.energy_time), self.max_energy)
+        self.energy_time = self.time
+
+    def add_energy(self, amount):
+        self.settle_energy()
+        self.energy = max(min(self.energy + amount, self.max_energy), 0)
+        self.reconsider()
+
+    def deal(self, source, damage_tuple, crit):
+        if crit:
+            damage = damage_tuple[1]
+        else:
+            damage = damage_tuple[0]
+        self.damage[source] = self.damage.get(source, 0) + damage * self.damage_multiplier
+
+    ###########################################################################
+    # Cooldowns, each used as soon as it's up.
+    ###########################################################################
+
+    def start_cooldowns(self):
+        c = self.calculator
+        if c.buffs.short_term_haste_buff:
+            self.repeat(600, lambda: self.window(40, self.set_speed_multiplier, 'heroism', 1.3))
+        if c.race.berserking:
+            self.repeat(180 + self.response_time, lambda: self.window(10, self.set_speed_multiplier, 'berserking', 1.2))
+        if c.race.time_is_money:
+            self.speed_multipliers['time_is_money'] = 1.01
+        if c.race.arcane_torrent:
+            self.repeat(120 + self.response_time, lambda: self.add_energy(15))
+        if c.race.rocket_barrage:
+            self.repeat(120 + self.response_time, self.rocket_barrage)
+        if c.settings.tricks_on_cooldown and not c.glyphs.tricks_of_the_trade:
+            self.repeat(30 + self.response_time, lambda: self.add_energy(-15))
+        if c.talents.overkill:
+            self.repeat(180 + self.response_time, lambda: self.window(20, self.set_regen_multiplier, 1.3))
+        if c.talents.cold_blood:
+            self.repeat(120 + self.response_time, self.cold_blood)
+        if c.talents.vendetta:
+            self.repeat(120 + self.response_time, lambda: self.window(30 * (1 + .2 * c.glyphs.vendetta), self.set_damage_multiplier, 1.2))
+
+        for boost in c.race.get_racial_stat_boosts() + c.stats.gear_buffs.get_all_activated_boosts():
+            if boost['stat'] not in self.stats:
+                continue
+            if boost['cooldown'] is None:
+                interval = self.duration + 1
+            else:
+                interval = boost['cooldown'] + self.response_time
+            self.repeat(interval, self.boost_action(boost))
+        self.update_speed()
+
+    def boost_action(self, boost):
+        stat, value = boost['stat'], boost['value']
+        def use():
+            self.add_stat(stat, value)
+            self.schedule(boost['duration'], lambda event: self.add_stat(stat, -value))
+        return use
+
+    def repeat(self, interval, use):
+        def action(event):
+            use()
+            self.schedule(interval, action)
+        self.schedule(0, action)
+
+    def window(self, duration, setter, *args):
+        # Turns something on for duration; the last argument is the value
+        # while it lasts, and the setter's default the value after.
+        setter(*args)
+        self.schedule(duration, lambda event: setter(*args[:-1]))
+
+    def set_speed_multiplier(self, name, multiplier=None):
+        if multiplier is None:
+            self.speed_multipliers.pop(name, None)
+        else:
+            self.speed_multipliers[name] = multiplier
+        self.update_speed()
+
+    def set_regen_multiplier(self, multiplier=1):
+        self.regen_multiplier = multiplier
+        self.update_speed()
+
+    def set_damage_multiplier(self, multiplier=1):
+        self.damage_multiplier = multiplier
+
+    def cold_blood(self):
+        self.guaranteed_crit = True
+        self.add_energy(25)
+
+    def rocket_barrage(self):
+        c = self.calculator
+        damage = c.race.calculate_rocket_barrage(self.ap, 0, 0) * c.raid_settings_modifiers(is_spell=True)
+        self.deal('rocket_barrage', (damage, damage * c.crit_damage_modifiers(is_spell=True)), self.random() < self.spell_crit)
+
+    ###########################################################################
+    # Autoattacks, poisons and procs.
+    ###########################################################################
+
+    def swing(self, hand):
+        c = self.calculator
+        weapon = self.weapons[hand]
+        self.schedule(weapon.speed / self.attack_speed, lambda event: self.swing(hand))
+        roll = self.random()
+        if roll >= self.white_hit_chances[hand]:
+            return
+        if hand == 'mh':
+            damage = c.mh_damage(self.ap)
+        else:
+            damage = c.oh_damage(self.ap)
+        crit = False
+        if roll < c.GLANCE_RATE:
+            damage = (damage[0] * c.GLANCE_MULTIPLIER, damage[0] * c.GLANCE_MULTIPLIER)
+        elif roll < c.GLANCE_RATE + self.melee_crit:
+            crit = True
+        if self.heedless_carnage is not None:
+            multiplier = 1 + self.heedless_carnage.value
+            damage = (damage[0] * multiplier, damage[1] * multiplier)
+        self.deal('autoattack', damage, crit)
+        self.trigger('auto_attack', hand, crit)
+        self.poison(hand)
+
+    def poison(self, hand):
+        envenomed = self.envenom_expiry is not None
+        if self.poisons[hand] == 'ip':
+            chance = self.ip_chance * (1 + .5 * envenomed)
+        else:
+            chance = .5 + .15 * envenomed
+        if self.random() >= chance or self.random() >= self.spell_hit_chance:
+            return
+        if self.poisons[hand] == 'ip':
+            self.instant_poison()
+        else:
+            self.deadly_poison()
+
+    def instant_poison(self):
+        crit = self.random() < self.spell_crit
+        self.deal('instant_poison', self.calculator.instant_poison_damage(self.ap, mastery=self.mastery), crit)
+        self.trigger('harmful_spell', None, crit)
+
+    def deadly_poison(self):
+        # Deadly poison at five doses is refreshed and applies the other
+        # weapon's poison instead.
+        self.dp_expiry = self.time + 12
+        if self.dp_stacks == 5:
+            self.instant_poison()
+            return
+        if self.dp_stacks == 0:
+            self.schedule(3, self.deadly_poison_tick)
+        self.dp_stacks += 1
+
+    def deadly_poison_tick(self, event):
+        if self.time > self.dp_expiry:
+            self.dp_stacks = 0
+            return
+        crit = self.random() < self.spell_crit
+        self.deal('deadly_poison', self.calculator.deadly_poison_tick_damage(self.ap, mastery=self.mastery, dp_stacks=self.dp_stacks), crit)
+        self.trigger('periodic_spell', None, crit)
+        self.schedule(3, self.deadly_poison_tick)
+
+    def trigger(self, kind, hand, crit):
+        # Rolls every proc that can come from an attack or spell of this
+        # kind, from this hand (None for spells).
+        for state in self.procs:
+            proc = state.proc
+            if kind not in state.triggers or (proc.on_crit and not crit):
+                continue
+            if state.hand is not None and state.hand != hand:
+                continue
+            if self.time < state.ready:
+                continue
+            if proc.is_ppm():
+                if hand is None:
+                    continue
+                chance = proc.proc_rate(self.weapons[hand].speed)
+            else:
+                chance = proc.proc_rate()
+            if self.random() < chance:
+                if proc.icd:
+                    state.ready = self.time + proc.icd
+                self.proc(state)
+
+    def proc(self, state):
+        proc = state.proc
+        c = self.calculator
+        if proc.stat in self.DAMAGE_PROC_STATS:
+            if proc.stat == 'spell_damage':
+                hit_chance, crit_rate = self.spell_hit_chance, self.spell_crit
+                multiplier = c.raid_settings_modifiers(is_spell=True)
+                crit_multiplier = c.crit_damage_modifiers(is_spell=True)
+            else:
+                hit_chance, crit_rate = self.strike_hit_chance, self.melee_crit
+                multiplier = c.raid_settings_modifiers(is_physical=True)
+                crit_multiplier = c.crit_damage_modifiers()
+            if self.random() < hit_chance:
+                damage = proc.value * multiplier
+                self.deal(proc.proc_name, (damage, damage * crit_multiplier), self.random() < crit_rate)
+            return
+
+        if proc is c.stats.procs.rogue_t11_4pc:
+            self.deadly_scheme = self.time + proc.duration
+            return
+        if proc is c.stats.procs.unheeded_warning:
+            self.heedless_carnage = proc
+        elif proc.stat in self.stats and state.stacks < proc.max_stacks:
+            state.stacks += 1
+            self.add_stat(proc.stat, proc.value)
+
+        # Every proc refreshes the duration of all its stacks.
+        state.expiry = self.schedule(proc.duration, lambda event: self.expire(state, event))
+
+    def expire(self, state, event):
+        if event is not state.expiry:
+            return
+        state.expiry = None
+        if state.proc is self.calculator.stats.procs.unheeded_warning:
+            self.heedless_carnage = None
+        elif state.stacks:
+            self.add_stat(state.proc.stat, -state.proc.value * state.stacks)
+            state.stacks = 0
+
+    ###########################################################################
+    # The rotation.
+    ###########################################################################
+
+    def schedule_decision(self, delay):
+        self.next_decision = self.schedule(max(delay, 0), self.decide)
+
+    def reconsider(self):
+        # Something changed how soon the next ability can be used.
+        if self.next_decision is not None and self.next_decision.time > self.time:
+            self.schedule_decision(0)
+
+    def decide(self, event):
+        if event is not self.next_decision:
+            return
+        self.settle_energy()
+        ability, cost = self.choose()
+        if self.time < self.gcd_ready:
+            self.schedule_decision(self.gcd_ready - self.time)
+        elif self.energy >= cost - 1e-9:
+            # (Allowing for rounding in the wait for it.)
+            self.energy = max(self.energy - cost, 0)
+            self.gcd_ready = self.time + self.GCD
+            ability(cost)
+            self.schedule_decision(self.GCD)
+        else:
+            self.schedule_decision((cost - self.energy) / self.energy_regen)
+
+    def choose(self):
+        # Build to the envenom size for this part of the fight, then rupture
+        # if it's down and envenom if not; like the model, the finishers are
+        # the same size whichever of them the cycle prioritizes.
+        if self.time < self.execute_time:
+            min_cp = self.cycle.min_envenom_size_mutilate
+            builder = (self.mutilate, self.mutilate_cost)
+        else:
+            min_cp = self.cycle.min_envenom_size_backstab
+            builder = (self.backstab, self.backstab_cost)
+        if self.cp < min_cp:
+            return builder
+        if self.rupture_ticks_left == 0:
+            return self.rupture, 25
+        return self.envenom, 35
+
+    def strike_lands(self, cost):
+        # Missed or dodged strikes refund most of their energy.
+        if self.random() < self.strike_hit_chance:
+            return True
+        self.add_energy(cost * self.ENERGY_REFUND)
+        return False
+
+    def add_cp(self, cp):
+        self.cp = min(self.cp + cp, 5)
+
+    def mutilate(self, cost):
+        if not self.strike_lands(cost):
+            return
+        c = self.calculator
+        crit_rate = min(self.melee_crit + self.crit_bonus + .05 * c.talents.puncturing_wounds, 1)
+        poisoned = self.dp_stacks > 0
+        cp = 2
+        for hand, damage in (('mh', c.mh_mutilate_damage(self.ap, poisoned)), ('oh', c.oh_mutilate_damage(self.ap, poisoned))):
+            crit = self.random() < crit_rate
+            self.deal('mutilate', damage, crit)
+            if crit and self.random() < self.seal_fate_chance:
+                cp = 3
+            self.trigger('strike', hand, crit)
+            self.poison(hand)
+        self.add_cp(cp)
+
+    def backstab(self, cost):
+        if not self.strike_lands(cost):
+            return
+        c = self.calculator
+        crit_rate = min(self.melee_crit + self.crit_bonus + .1 * c.talents.puncturing_wounds, 1)
+        crit = self.random() < crit_rate
+        self.deal('backstab', c.backstab_damage(self.ap), crit)
+        cp = 1
+        if crit:
+            if c.glyphs.backstab:
+                self.add_energy(5)
+            if self.random() < self.seal_fate_chance:
+                cp = 2
+        self.add_cp(cp)
+        self.trigger('strike', 'mh', crit)
+        self.poison('mh')
+
+    def finish(self):
+        # Spends the combo points, with relentless strikes for each and
+        # ruthlessness to start the next finisher on one.
+        cp = self.cp
+        self.cp = 0
+        for i in xrange(cp):
+            if self.random() < self.relentless_strikes_chance:
+                self.add_energy(25)
+        if self.random() < self.ruthlessness_chance:
+            self.cp = 1
+        return cp
+
+    def rupture(self, cost):
+        if not self.strike_lands(cost):
+            return
+        self.rupture_cp = self.finish()
+        self.rupture_ticks_left = self.rupture_ticks + self.rupture_cp
+        self.schedule(2, self.rupture_tick)
+        self.trigger('apply_debuff', 'mh', False)
+        self.poison('mh')
+
+    def rupture_tick(self, event):
+        c = self.calculator
+        crit = self.random() < self.melee_crit
+        self.deal('rupture', c.rupture_tick_damage(self.ap, self.rupture_cp), crit)
+        self.trigger('bleed', None, crit)
+        if self.random() < self.venomous_wounds_chance:
+            self.add_energy(10)
+            if self.random() < self.spell_hit_chance:
+                crit = self.random() < self.spell_crit
+                self.deal('venomous_wounds', c.venomous_wounds_damage(self.ap, mastery=self.mastery), crit)
+                self.trigger('harmful_spell', None, crit)
+        self.rupture_ticks_left -= 1
+        if self.rupture_ticks_left:
+            self.schedule(2, self.rupture_tick)
+
+    def envenom(self, cost):
+        if not self.strike_lands(cost):
+            return
+        c = self.calculator
+        crit = self.random() < self.melee_crit
+        if self.guaranteed_crit:
+            crit = True
+            self.guaranteed_crit = False
+        if self.deadly_scheme is not None and self.time <= self.deadly_scheme:
+            crit = True
+            self.deadly_scheme = None
+        cp = self.finish()
+        self.deal('envenom', c.envenom_damage(self.ap, cp, self.mastery), crit)
+        self.envenom_expiry = self.schedule(1 + cp, self.end_envenom)
+        self.trigger('strike', 'mh', crit)
+        self.poison('mh')
+
+    def end_envenom(self, event):
+        if event is self.envenom_expiry:
+            self.envenom_expiry = None
+
+
+def get_interval(values, z):
+    # The mean of values and the half width of the confidence interval on
+    # it, z standard errors either side.
+    count = len(values)
+    mean = sum(values) / count
+    variance = sum((value - mean) ** 2 for value in values) / (count - 1)
+    return mean, z * math.sqrt(variance / count)
+
+def get_z(confidence):
+    # The number of standard deviations either side of the mean of a normal
+    # distribution that hold this much of it: the normal quantile of
+    # (1 + confidence) / 2, by Acklam's rational approximation, which is
+    # good to about 1e-9.  (math.erf would need Python 2.7.)
+    p = (1 + confidence) / 2.
+    if p <= 1 - _Z_TAIL:
+        q = p - .5
+        r = q * q
+        return _evaluate(_Z_CENTRAL_NUMERATOR, r) * q / _evaluate(_Z_CENTRAL_DENOMINATOR + (1.,), r)
+    q = math.sqrt(-2 * math.log(1 - p))
+    return -_evaluate(_Z_TAIL_NUMERATOR, q) / _evaluate(_Z_TAIL_DENOMINATOR + (1.,), q)
+
+def _evaluate(coefficients, x):
+    # The polynomial with these coefficients, highest power first, at x.
+    value = 0.
+    for coefficient in coefficients:
+        value = value * x + coefficient
+    return value
+
+_Z_TAIL = .02425
+_Z_CENTRAL_NUMERATOR = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02, 1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_Z_CENTRAL_DENOMINATOR = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02, 6.680131188771972e+01, -1.328068155288572e+01)
+_Z_TAIL_NUMERATOR = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00, -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_Z_TAIL_DENOMINATOR = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00)
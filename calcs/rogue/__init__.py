@@ -1,7 +1,8 @@
 import gettext
 import __builtin__
 
-__builtin__._ = gettext.gettext
+if not callable(getattr(__builtin__, '_', None)):
+    __builtin__._ = gettext.gettext
 
 from calcs import DamageCalculator
 from core import exceptions
@@ -37,6 +38,15 @@ class RogueDamageCalculator(DamageCalculator):
     MELEE_CRIT_REDUCTION =        .048
     SPELL_CRIT_REDUCTION =        .021
 
+    INSTRUMENTED_ABILITIES = ('mh_damage', 'oh_damage', 'backstab_damage', 'mh_mutilate_damage',
+        'oh_mutilate_damage', 'sinister_strike_damage', 'hemorrhage_damage', 'ambush_damage',
+        'revealing_strike_damage', 'venomous_wounds_damage', 'main_gauche_damage',
+        'mh_killing_spree_damage', 'oh_killing_spree_damage', 'instant_poison_damage',
+        'deadly_poison_tick_damage', 'wound_poison_damage', 'garrote_tick_damage',
+        'rupture_tick_damage', 'eviscerate_damage', 'envenom_damage')
+    INSTRUMENTED_TABLES = dict(DamageCalculator.INSTRUMENTED_TABLES,
+        talents_modifiers='compile_talents_modifiers', crit_damage_modifiers='compile_crit_damage_modifiers')
+
     def __setattr__(self, name, value):
         object.__setattr__(self, name, value)
         if name == 'level':
@@ -87,14 +97,32 @@ class RogueDamageCalculator(DamageCalculator):
         # Parameters are booleans distinguishing which talents affect the
         # spell in question. It returns the final modifier for their
         # respective additive/multiplicative values
+        table = self.get_modifier_table().talents_modifiers
+        key = (opportunity, coup_de_grace, executioner, aggression, improved_sinister_strike, vile_poisons, improved_ambush, potent_poisons, assassins_resolve)
+        if key not in table:
+            table[key] = self.compile_talents_modifiers(*key)
+        base_modifier, mastery_modifier, multiplier, total_modifier = table[key]
+        if not mastery_modifier:
+            return total_modifier
+        return (base_modifier + mastery_modifier * self.stats.get_mastery_from_rating(mastery)) * multiplier
+
+    def compile_talents_modifiers(self, opportunity, coup_de_grace, executioner,
+                                  aggression, improved_sinister_strike,
+                                  vile_poisons, improved_ambush, potent_poisons,
+                                  assassins_resolve):
+        # Splits talents_modifiers into the additive modifier from talents,
+        # the additive modifier per point of mastery and the multiplicative
+        # modifier, since only mastery changes within a solve.  The last
+        # entry is the whole thing for abilities mastery doesn't touch.
         base_modifier = 1
+        mastery_modifier = 0
         if opportunity:
             base_modifier += .1 * self.talents.opportunity
         if coup_de_grace:
             cdg_tuple = (0, .07, .14, .2)
             base_modifier += cdg_tuple[self.talents.coup_de_grace]
         if executioner and self.talents.is_subtlety_rogue():
-            base_modifier += .02 * self.stats.get_mastery_from_rating(mastery)
+            mastery_modifier += .02
         if aggression:
             aggression_tuple = (0, .07, .14, .2)
             base_modifier += aggression_tuple[self.talents.aggression]
@@ -106,9 +134,10 @@ class RogueDamageCalculator(DamageCalculator):
         if improved_ambush:
             base_modifier += .05 * self.talents.improved_ambush
         if potent_poisons and self.talents.is_assassination_rogue():
-            base_modifier += .035 * self.stats.get_mastery_from_rating(mastery)
+            mastery_modifier += .035
+        multiplier = 1
         if assassins_resolve and self.talents.is_assassination_rogue() and (self.stats.mh.type == 'dagger'):
-            base_modifier *= 1.15
+            multiplier *= 1.15
         # TODO: This probably wants to be updated to default to this behavior but still
         # allow it to be overridden - I'd prefer to make as few assumptions as possible
         # about what the cycle looks like, so the modeler can figure that out for themself.
@@ -116,11 +145,18 @@ class RogueDamageCalculator(DamageCalculator):
         # Passing Sanguinary Vein without talent parameter (it affects all damage)
         # nor is_bleeding since the target will most likely be bleeding from
         # refreshed ruptures in subtletly builds.
-        base_modifier *= (1 + .05 * self.talents.sanguinary_vein)
+        multiplier *= (1 + .05 * self.talents.sanguinary_vein)
 
-        return base_modifier
+        return base_modifier, mastery_modifier, multiplier, base_modifier * multiplier
 
     def crit_damage_modifiers(self, lethality=False, is_spell=False):
+        table = self.get_modifier_table().crit_damage_modifiers
+        key = (lethality, is_spell)
+        if key not in table:
+            table[key] = self.compile_crit_damage_modifiers(lethality, is_spell)
+        return table[key]
+
+    def compile_crit_damage_modifiers(self, lethality, is_spell):
         # This formula may need to be splited in two and bring the meta and
         # base_modifier to the general object if/when we start to
         # support another classes
@@ -392,12 +428,16 @@ class RogueDamageCalculator(DamageCalculator):
         return damage, crit_damage
 
     def melee_crit_rate(self, agi=None, crit=None):
-        if agi == None:
-            agi = self.stats.agi
+        if agi is None:
+            agi = self.stats.agi + self.get_profession_stat_bonus('agi')
+        if crit is None:
+            crit = self.stats.crit + self.get_profession_stat_bonus('crit')
         base_crit = self.AGI_CRIT_INTERCEPT + agi / self.agi_per_crit
         base_crit += self.stats.get_crit_from_rating(crit)
         return base_crit + self.buffs.buff_all_crit() + self.race.get_racial_crit() - self.MELEE_CRIT_REDUCTION
 
     def spell_crit_rate(self, crit=None):
+        if crit is None:
+            crit = self.stats.crit + self.get_profession_stat_bonus('crit')
         base_crit = self.stats.get_crit_from_rating(crit)
         return base_crit + self.buffs.buff_all_crit() + self.buffs.buff_spell_crit() + self.race.get_racial_crit() - self.SPELL_CRIT_REDUCTION
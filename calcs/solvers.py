@@ -0,0 +1,125 @@
+from calcs import arrays
+from core import exceptions
+
+
+class ConvergenceException(exceptions.InvalidInputException):
+    # Raised when a solve runs out of iterations; a calculator should never
+    # loop forever on an input it can't settle.
+    pass
+
+
+class ConvergenceReport(object):
+    # What happened during one fixed point solve: which solver ran, how many
+    # iterations it took, whether it converged, and the largest change in any
+    # attack frequency over the last iteration.
+
+    def __init__(self, solver, iterations, converged, residual):
+        self.solver = solver
+        self.iterations = iterations
+        self.converged = converged
+        self.residual = residual
+
+    def __repr__(self):
+        return 'ConvergenceReport(%r, %r, %r, %r)' % (self.solver, self.iterations, self.converged, self.residual)
+
+
+class SuccessiveSubstitutionSolver(object):
+    # Solvers find the stats x for which x == G(x), where G(x) is the stats
+    # you end up with once procs are applied at the attack rates x gives.
+    # The calculator evaluates G; a solver only picks the next guess from the
+    # history of (guess, G(guess)) pairs so far, each a dict of stat values.
+    # Solvers hold no state of their own between solves, so one can be
+    # shared between calculators.
+    #
+    # This one just takes G of the latest guess as the next guess.  It is
+    # slow when procs feed strongly into each other, but it is what the
+    # model has always done and its results are the reference.
+    name = 'successive_substitution'
+
+    def __init__(self, max_iterations=100):
+        if max_iterations < 1:
+            raise exceptions.InvalidInputException(_('Solvers need at least one iteration'))
+        self.max_iterations = max_iterations
+
+    def next_guess(self, history):
+        return history[-1][1]
+
+
+class AndersonSolver(SuccessiveSubstitutionSolver):
+    # Anderson acceleration: the next guess is the combination of the last
+    # few images of G whose residuals G(x) - x best cancel out, by least
+    # squares.  With feedback between several stacking or haste procs this
+    # converges in a handful of iterations where successive substitution
+    # takes many; the answer agrees with it to within the solve precision.
+    name = 'anderson'
+
+    def __init__(self, max_iterations=100, memory=3):
+        super(AndersonSolver, self).__init__(max_iterations)
+        self.memory = memory
+
+    def next_guess(self, history):
+        history = history[-(self.memory + 1):]
+        if len(history) < 2:
+            return history[-1][1]
+        stats = sorted(history[-1][1].keys())
+
+        # A batch (see calcs.arrays) gets a least squares solve of its own
+        # for each character.
+        size = arrays.get_size([pair[index][stat] for pair in history for index in (0, 1) for stat in stats])
+        if size is not None:
+            row_guesses = []
+            for row in xrange(size):
+                row_history = [tuple([dict([(stat, arrays.get_row(values[stat], row)) for stat in stats]) for values in pair]) for pair in history]
+                row_guesses.append(self.next_guess(row_history))
+            next_guess = {}
+            for stat in stats:
+                next_guess[stat] = arrays.get_column([row_guess[stat] for row_guess in row_guesses])
+            return next_guess
+
+        images = [[image[stat] for stat in stats] for guess, image in history]
+        residuals = [[image[stat] - guess[stat] for stat in stats] for guess, image in history]
+
+        # Differences between successive residuals and images, one column
+        # per step of history.
+        residual_steps = [[new - old for new, old in zip(residuals[i + 1], residuals[i])] for i in range(len(history) - 1)]
+        image_steps = [[new - old for new, old in zip(images[i + 1], images[i])] for i in range(len(history) - 1)]
+
+        # Normal equations for min |residual - sum(gamma[j] * residual_steps[j])|
+        size = len(residual_steps)
+        matrix = [[dot(residual_steps[i], residual_steps[j]) for j in range(size)] for i in range(size)]
+        vector = [dot(residual_steps[i], residuals[-1]) for i in range(size)]
+        gamma = solve_linear_system(matrix, vector)
+        if gamma is None:
+            return history[-1][1]
+
+        next_guess = {}
+        for index, stat in enumerate(stats):
+            next_guess[stat] = images[-1][index] - sum([gamma[j] * image_steps[j][index] for j in range(size)])
+        return next_guess
+
+
+def dot(a, b):
+    return sum([x * y for x, y in zip(a, b)])
+
+def solve_linear_system(matrix, vector):
+    # Gaussian elimination with partial pivoting on a small dense system.
+    # Returns None if the system is singular (or too close to it to trust),
+    # in which case callers should fall back to something simpler.
+    size = len(vector)
+    rows = [list(matrix[i]) + [vector[i]] for i in range(size)]
+    scale = max([abs(value) for row in rows for value in row[:size]] + [0])
+    if not scale:
+        return None
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda row: abs(rows[row][column]))
+        if abs(rows[pivot][column]) <= 1e-12 * scale:
+            return None
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        for row in range(column + 1, size):
+            factor = rows[row][column] / rows[column][column]
+            for index in range(column, size + 1):
+                rows[row][index] -= factor * rows[column][index]
+    solution = [0] * size
+    for row in reversed(range(size)):
+        solution[row] = (rows[row][size] - sum([rows[row][index] * solution[index] for index in range(row + 1, size)])) / rows[row][row]
+    return solution
@@ -0,0 +1,125 @@
+import threading
+
+from core import exceptions
+from core import lru_cache
+
+# Converged solver states kept across calculators, so that a solve for a
+# character much like one solved before - one item or one reforge away, as
+# when browsing gear - starts from where that one ended up instead of from
+# the unprocced stats.  States are filed under everything about a character
+# but its rating stats (talents, glyphs, buffs, settings and cycle, procs,
+# gear buffs and weapons; see DamageCalculator.get_warm_start), and within
+# that by the vector of rating stats they were solved at; a solve starts
+# from the state whose vector is nearest its own.
+#
+# The fixed point a solve converges to doesn't depend on where it started,
+# but where within the solver's precision it stops does, so results from a
+# calculator using one of these can differ from a cold solve's in the last
+# few digits.  Calculators only use one when given it (as
+# calculator.warm_start_cache), and it may be shared between any number of
+# calculators and threads.
+
+
+class ConvergedStateCache(object):
+    def __init__(self, max_size=256, states_per_key=8, max_distance=None):
+        # max_size is the number of sets of inputs to keep states for, and
+        # states_per_key the number of stat vectors to keep for each.
+        # States further than max_distance (see get_distance) from a solve's
+        # vector aren't used; get_stats shows whether nearby ones save any
+        # iterations for the characters at hand.
+        if states_per_key < 1:
+            raise exceptions.InvalidInputException(_('A cache needs room for at least one entry'))
+        self.states = lru_cache.LRUCache(max_size)
+        self.states_per_key = states_per_key
+        self.max_distance = max_distance
+        self.lock = threading.Lock()
+        self.clear_stats()
+
+    def clear(self):
+        self.states.clear()
+        self.clear_stats()
+
+    def clear_stats(self):
+        self.lock.acquire()
+        try:
+            # Solves seeded from a cached state, and those that weren't.
+            self.hits = 0
+            self.misses = 0
+            # {solve name: [cold solves, cold iterations, warm solves, warm
+            # iterations]}
+            self.solves = {}
+        finally:
+            self.lock.release()
+
+    def get_nearest(self, key, vector):
+        # The state stored under key at the vector nearest this one, or
+        # None.  States are shared; callers copy them before changing them.
+        nearest = None
+        entries = self.states.get(key)
+        if entries:
+            distance, state = min([(get_distance(entry_vector, vector), state) for entry_vector, state in entries], key=lambda entry: entry[0])
+            if self.max_distance is None or distance <= self.max_distance:
+                nearest = state
+        self.lock.acquire()
+        try:
+            if nearest is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        finally:
+            self.lock.release()
+        return nearest
+
+    def store(self, key, vector, state):
+        self.lock.acquire()
+        try:
+            entries = [entry for entry in self.states.get(key, ()) if entry[0] != vector]
+            entries.append((vector, state))
+            # Entries are never changed once stored, only replaced, so
+            # get_nearest can read them without the lock.
+            self.states[key] = tuple(entries[-self.states_per_key:])
+        finally:
+            self.lock.release()
+
+    def record_solve(self, name, warm, iterations):
+        self.lock.acquire()
+        try:
+            totals = self.solves.setdefault(name, [0, 0, 0, 0])
+            if warm:
+                totals[2] += 1
+                totals[3] += iterations
+            else:
+                totals[0] += 1
+                totals[1] += iterations
+        finally:
+            self.lock.release()
+
+    def get_stats(self):
+        # Hits and misses, and for each solve the cold and warm solves and
+        # iterations and the iterations saved: how many more the warm solves
+        # would have taken at the cold ones' average.  Saving estimates need
+        # at least one cold solve of the same name.
+        self.lock.acquire()
+        try:
+            solves = {}
+            iterations_saved = 0
+            for name, (cold_solves, cold_iterations, warm_solves, warm_iterations) in self.solves.iteritems():
+                saved = 0
+                if cold_solves:
+                    saved = warm_solves * float(cold_iterations) / cold_solves - warm_iterations
+                solves[name] = {
+                    'cold_solves': cold_solves,
+                    'cold_iterations': cold_iterations,
+                    'warm_solves': warm_solves,
+                    'warm_iterations': warm_iterations,
+                    'iterations_saved': saved
+                }
+                iterations_saved += saved
+            return {'hits': self.hits, 'misses': self.misses, 'solves': solves, 'iterations_saved': iterations_saved}
+        finally:
+            self.lock.release()
+
+
+def get_distance(vector, other_vector):
+    # The sum of the differences in each rating.
+    return sum([abs(value - other_value) for value, other_value in zip(vector, other_vector)])
@@ -68,15 +68,13 @@ test_level = 85
 # Build a DPS object.
 calculator = AldrianasRogueDamageCalculator(test_stats, test_talents, test_glyphs, test_buffs, test_race, test_settings, test_level)
 
-# Compute EP values.
-ep_values = calculator.get_ep()
-
-# Compute talents ranking
-main_tree_talents_ranking, off_tree_talents_ranking = calculator.get_talents_ranking()
-
-# Compute DPS Breakdown.
-dps_breakdown = calculator.get_dps_breakdown()
-total_dps = sum(entry[1] for entry in dps_breakdown.items())
+# Compute DPS, its breakdown, EP values and the talents ranking.
+report = calculator.get_report(('dps', 'breakdown', 'ep', 'talents_ranking'))
+ep_values = report['ep']
+main_tree_talents_ranking = report['talents_ranking']['main_tree']
+off_tree_talents_ranking = report['talents_ranking']['off_trees']
+dps_breakdown = report['breakdown']
+total_dps = report['dps']
 
 def pretty_print(dict_list):
     max_len = 0
@@ -0,0 +1,290 @@
+import copy
+import gc
+import json
+import optparse
+import platform
+import sys
+import time
+
+from core import jsoninput
+
+# Times every public entry point of the calculator on a corpus of
+# representative characters and keeps the results in a file, so a change
+# that slows any of them down can be caught by comparing against a saved
+# baseline:
+#
+#     python -m core.benchmark run -o baseline.json
+#     (make changes)
+#     python -m core.benchmark compare baseline.json
+#
+# Times are also stored divided by the time a fixed piece of pure Python
+# takes on the same machine, which is what compare goes by, so baselines
+# stay roughly comparable between machines.  How many compute_damage
+# iterations each call takes is recorded too; that doesn't depend on the
+# machine at all, so any increase is flagged.
+
+_base_character = {
+    'level': 85,
+    'stats': {
+        'str': 20,
+        'agi': 4756,
+        'ap': 190,
+        'crit': 1022,
+        'hit': 1329,
+        'exp': 597,
+        'haste': 1189,
+        'mastery': 1377,
+        'gear_buffs': ['rogue_t11_2pc', 'leather_specialization', 'potion_of_the_tolvir', 'chaotic_metagem'],
+        'procs': ['heroic_prestors_talisman_of_machination', 'fluid_death', 'rogue_t11_4pc'],
+        'mh': {'type': 'dagger', 'speed': 1.8, 'damage': 939.5, 'enchant': 'landslide'},
+        'oh': {'type': 'dagger', 'speed': 1.4, 'damage': 730.5, 'enchant': 'landslide'},
+        'ranged': {'type': 'thrown', 'speed': 2.2, 'damage': 1371.5}
+    },
+    'buffs': ['short_term_haste_buff', 'stat_multiplier_buff', 'crit_chance_buff', 'all_damage_buff',
+        'melee_haste_buff', 'attack_power_buff', 'str_and_agi_buff', 'armor_debuff',
+        'physical_vulnerability_debuff', 'spell_damage_debuff', 'spell_crit_debuff',
+        'bleed_damage_debuff', 'agi_flask', 'guild_feast'],
+    'race': 'night_elf'
+}
+
+_specs = {
+    'assassination': {
+        'talents': ['0333230113022110321', '0020000000000000000', '2030030000000000000'],
+        'glyphs': ['backstab', 'mutilate', 'rupture'],
+        'settings': {'type': 'assassination', 'response_time': 1}
+    },
+    'combat': {
+        'talents': ['0232000000000000000', '0332230310032012321', '0030000000000000000'],
+        'glyphs': ['sinister_strike', 'adrenaline_rush', 'slice_and_dice', 'tricks_of_the_trade'],
+        'settings': {'type': 'combat', 'response_time': 1},
+        'mh': {'type': '1h_axe', 'speed': 2.6, 'damage': 1356.5, 'enchant': 'landslide'}
+    },
+    'subtlety': {
+        'talents': ['0230030000000000000', '0020000000000000000', '0332031321310012321'],
+        'glyphs': ['backstab', 'slice_and_dice', 'shadow_dance', 'tricks_of_the_trade'],
+        'settings': {'type': 'subtlety', 'response_time': 1, 'cycle': {'raid_crits_per_second': 5}}
+    }
+}
+
+# (name, spec, cycle settings) for every character in the corpus.
+_profiles = [
+    ('assassination', 'assassination', {}),
+    ('combat', 'combat', {}),
+    ('combat_no_revealing_strike', 'combat', {'use_revealing_strike': 'never'}),
+    ('combat_no_rupture', 'combat', {'use_rupture': False}),
+    ('subtlety', 'subtlety', {}),
+    ('subtlety_clip_recuperate', 'subtlety', {'clip_recuperate': True})
+]
+
+profile_names = [name for name, spec, cycle in _profiles]
+
+# Things for get_other_ep to price: procs and gear buffs, with and without.
+other_ep_list = ['heroic_left_eye_of_rajh', 'darkmoon_card_hurricane', 'unheeded_warning', 'chaotic_metagem', 'lifeblood']
+
+# Every entry point and how to call it; each takes a calculator, apart from
+# from_json, which takes the character as JSON.
+entry_points = [
+    ('get_dps', lambda calculator: calculator.get_dps()),
+    ('get_dps_breakdown', lambda calculator: calculator.get_dps_breakdown()),
+    ('get_ep', lambda calculator: calculator.get_ep()),
+    ('get_weapon_ep', lambda calculator: calculator.get_weapon_ep(speed_list=[1.4, 1.8, 2.6], dps=True, enchants=True)),
+    ('get_other_ep', lambda calculator: calculator.get_other_ep(other_ep_list)),
+    ('get_talents_ranking', lambda calculator: calculator.get_talents_ranking()),
+    ('get_glyphs_ranking', lambda calculator: calculator.get_glyphs_ranking()),
+    ('from_json', lambda json_string: jsoninput.from_json(json_string))
+]
+
+entry_point_names = [name for name, call in entry_points]
+
+def get_profile(name):
+    # The character called name, in the format jsoninput.from_dict reads.
+    for profile_name, spec, cycle in _profiles:
+        if profile_name == name:
+            break
+    else:
+        raise KeyError(name)
+    character = copy.deepcopy(_base_character)
+    spec_data = copy.deepcopy(_specs[spec])
+    character['talents'] = spec_data['talents']
+    character['glyphs'] = spec_data['glyphs']
+    character['settings'] = spec_data['settings']
+    character['settings'].setdefault('cycle', {}).update(cycle)
+    if 'mh' in spec_data:
+        character['stats']['mh'] = spec_data['mh']
+    return character
+
+def calibrate(repeat=5):
+    # The best time, in seconds, of a fixed piece of pure Python that does
+    # the sort of things the engine does: float arithmetic, attribute and
+    # dict lookups and method calls.
+    class Point(object):
+        def __init__(self, x):
+            self.x = x
+
+        def scaled(self, factor):
+            return self.x * factor
+
+    best = None
+    for i in xrange(repeat):
+        start = time.time()
+        table = {}
+        total = 0.
+        for j in xrange(200000):
+            point = Point(j * .5)
+            table[j & 255] = point.scaled(1.0001)
+            total += table[j & 255] - j / 3.
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def count_iterations(calculator, counts):
+    # Adds the fixed point iterations and solves of every compute_damage
+    # call this calculator makes to counts.
+    compute_damage = calculator.compute_damage
+
+    def counting_compute_damage(attack_counts_function, *args):
+        try:
+            return compute_damage(attack_counts_function, *args)
+        finally:
+            report = calculator.convergence_reports.get(attack_counts_function.__name__)
+            if report is not None:
+                counts['solves'] += 1
+                counts['iterations'] += report.iterations
+    calculator.compute_damage = counting_compute_damage
+
+def time_entry_point(character, entry_point, repeat=3, min_time=.1):
+    # Returns {'seconds': ..., 'number': ..., 'iterations': ..., 'solves':
+    # ...}: the best time per call of entry_point on character over repeat
+    # runs of enough calls to take min_time, and the compute_damage
+    # iterations and solves in one call.
+    call = dict(entry_points)[entry_point]
+    json_string = json.dumps(character)
+
+    def run(number):
+        counts = {'iterations': 0, 'solves': 0}
+        if entry_point == 'from_json':
+            arguments = [json_string] * number
+        else:
+            arguments = [jsoninput.from_dict(character) for i in xrange(number)]
+            for calculator in arguments:
+                count_iterations(calculator, counts)
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.time()
+            for argument in arguments:
+                call(argument)
+            elapsed = time.time() - start
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        return elapsed, counts
+
+    # The first call warms the shared caches; it also says how many calls
+    # make up min_time.
+    elapsed, counts = run(1)
+    number = max(1, int(min_time / max(elapsed, 1e-6)))
+    best = None
+    for i in xrange(repeat):
+        elapsed, run_counts = run(number)
+        if best is None or elapsed < best:
+            best = elapsed
+    return {'seconds': best / number, 'number': number, 'iterations': counts['iterations'], 'solves': counts['solves']}
+
+def run_benchmarks(profiles=None, entry_point_list=None, repeat=3, min_time=.1, log=None):
+    # Times every entry point on every profile; the result is what the
+    # benchmark file holds.
+    if profiles is None:
+        profiles = profile_names
+    if entry_point_list is None:
+        entry_point_list = entry_point_names
+    calibration = calibrate()
+    results = {}
+    for profile in profiles:
+        character = get_profile(profile)
+        for entry_point in entry_point_list:
+            result = time_entry_point(character, entry_point, repeat, min_time)
+            result['normalized'] = result['seconds'] / calibration
+            key = profile + '/' + entry_point
+            results[key] = result
+            if log is not None:
+                log.write('%-50s %10.3f ms %8d iterations\n' % (key, result['seconds'] * 1000, result['iterations']))
+    return {
+        'version': 1,
+        'calibration': calibration,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results
+    }
+
+def compare(baseline, current, threshold=.1):
+    # Returns a (key, what, baseline value, current value) for every
+    # regression: a normalized time more than threshold slower than the
+    # baseline, or more compute_damage iterations.  Entries either side
+    # doesn't have are left out.
+    regressions = []
+    for key in sorted(current['results']):
+        if key not in baseline['results']:
+            continue
+        old, new = baseline['results'][key], current['results'][key]
+        if new['normalized'] > old['normalized'] * (1 + threshold):
+            regressions.append((key, 'normalized', old['normalized'], new['normalized']))
+        if new['iterations'] > old['iterations']:
+            regressions.append((key, 'iterations', old['iterations'], new['iterations']))
+    return regressions
+
+def write_comparison(baseline, current, regressions, output):
+    for key in sorted(current['results']):
+        if key not in baseline['results']:
+            continue
+        old, new = baseline['results'][key], current['results'][key]
+        change = new['normalized'] / old['normalized'] - 1
+        output.write('%-50s %+7.1f%% %8d -> %d iterations\n' % (key, change * 100, old['iterations'], new['iterations']))
+    for key, what, old, new in regressions:
+        output.write(_('REGRESSION {key}: {what} {old} -> {new}').format(key=key, what=what, old=old, new=new) + '\n')
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage=_('%prog [options] run | compare baseline [current]'))
+    parser.add_option('-o', '--output',
+        help=_('file to write the results of run to'))
+    parser.add_option('-p', '--profile', action='append', choices=profile_names,
+        help=_('benchmark only this profile (may be repeated)'))
+    parser.add_option('-e', '--entry-point', action='append', choices=entry_point_names,
+        help=_('benchmark only this entry point (may be repeated)'))
+    parser.add_option('-r', '--repeat', type='int', default=3,
+        help=_('runs of each benchmark to take the best of'))
+    parser.add_option('-m', '--min-time', type='float', default=.1,
+        help=_('seconds each run should take at least'))
+    parser.add_option('-t', '--threshold', type='float', default=.1,
+        help=_('slowdown, as a fraction, that compare flags'))
+    options, args = parser.parse_args()
+
+    if len(args) == 1 and args[0] == 'run':
+        results = run_benchmarks(options.profile, options.entry_point, options.repeat, options.min_time, sys.stderr)
+        if options.output is None:
+            json.dump(results, sys.stdout, indent=1, sort_keys=True)
+        else:
+            with open(options.output, 'w') as output_file:
+                json.dump(results, output_file, indent=1, sort_keys=True)
+    elif len(args) in (2, 3) and args[0] == 'compare':
+        with open(args[1]) as baseline_file:
+            baseline = json.load(baseline_file)
+        if len(args) == 3:
+            with open(args[2]) as current_file:
+                current = json.load(current_file)
+        else:
+            # Just what the baseline has, unless told otherwise.
+            profiles = options.profile or sorted(set(key.split('/')[0] for key in baseline['results']))
+            entry_point_list = options.entry_point or sorted(set(key.split('/')[1] for key in baseline['results']))
+            current = run_benchmarks(profiles, entry_point_list, options.repeat, options.min_time, sys.stderr)
+            if options.output is not None:
+                with open(options.output, 'w') as output_file:
+                    json.dump(current, output_file, indent=1, sort_keys=True)
+        regressions = compare(baseline, current, options.threshold)
+        write_comparison(baseline, current, regressions, sys.stdout)
+        if regressions:
+            sys.exit(1)
+    else:
+        parser.error(_('expected run or compare'))
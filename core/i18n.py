@@ -1,9 +1,15 @@
 import gettext
 import os.path
 import locale
+import threading
 import __builtin__
 
-__builtin__._ = gettext.gettext
+# The one place _() is installed for the engine; the packages only install
+# it if nothing has yet, so importing them never undoes set_language or
+# install_thread_aware.  (An interactive session's _ holds the last result,
+# which isn't callable.)
+if not callable(getattr(__builtin__, '_', None)):
+    __builtin__._ = gettext.gettext
 
 # Domain: this needs to be the name of our .mo files
 TRANSLATION_DOMAIN = 'SCE'
@@ -26,7 +32,42 @@ def set_language(language):
         if (gnu_lang):
             languages_list += gnu_lang.split(":")
 
-        gettext.translation(TRANSLATION_DOMAIN, LOCALE_DIR, fallback=True, languages=languages_list).install(unicode=True)
+        translation = gettext.translation(TRANSLATION_DOMAIN, LOCALE_DIR, fallback=True, languages=languages_list)
 
     else:
-        gettext.translation(TRANSLATION_DOMAIN, LOCALE_DIR, fallback=True, languages=[language]).install(unicode=True)
+        translation = gettext.translation(TRANSLATION_DOMAIN, LOCALE_DIR, fallback=True, languages=[language])
+
+    if __builtin__._ is translate:
+        # Keep the thread-aware _() installed; this is now the language of
+        # threads that haven't picked their own.
+        global _process_translate
+        _process_translate = translation.ugettext
+    else:
+        translation.install(unicode=True)
+
+
+# Per-thread languages, for servers that answer requests in several languages
+# from threads.  Once install_thread_aware() has replaced _(), each thread
+# translates into the language it last gave set_thread_language, and threads
+# that never did into whatever set_language chose.
+_thread_state = threading.local()
+_process_translate = gettext.gettext
+
+def install_thread_aware():
+    global _process_translate
+    if __builtin__._ is not translate:
+        _process_translate = __builtin__._
+        __builtin__._ = translate
+
+def set_thread_language(language):
+    # None goes back to the process-wide language.
+    if language is None:
+        _thread_state.translation = None
+    else:
+        _thread_state.translation = gettext.translation(TRANSLATION_DOMAIN, LOCALE_DIR, fallback=True, languages=[language])
+
+def translate(message):
+    translation = getattr(_thread_state, 'translation', None)
+    if translation is None:
+        return _process_translate(message)
+    return translation.ugettext(message)
@@ -0,0 +1,137 @@
+import itertools
+import json
+import multiprocessing
+import optparse
+import sys
+
+from calcs import warm_start
+from core import jsoninput
+
+# Evaluates a stream of characters, one JSON object per line (the format
+# jsoninput.from_json reads), and writes one JSON result per line as each is
+# done.  Only a window of records is held at a time, so memory use doesn't
+# grow with the size of the input, and a record that fails comes back as an
+# error object rather than ending the run.
+#
+# Results look like
+#     {"line": 3, "id": ..., "dps": ..., "breakdown": {...}, "ep": {...}}
+# or, for a record that could not be evaluated,
+#     {"line": 3, "id": ..., "error": {"type": ..., "message": ...}}
+# where line counts from 1 and id is copied from the record if it has one.
+#
+# From the top of the tree:
+#     python -m core.jsonbatch [options] [input [output]]
+
+# The calcs.warm_start.ConvergedStateCache every calculator in this process
+# starts its solves from, if set_warm_start has set one up.  Streams of
+# records that are all small variations on one character go faster with it,
+# at the price of results that can differ from a cold solve's in the last
+# few digits.
+warm_start_cache = None
+
+def set_warm_start(max_size):
+    # Also a pool initializer, so each worker process has its own.
+    global warm_start_cache
+    if max_size:
+        warm_start_cache = warm_start.ConvergedStateCache(max_size)
+    else:
+        warm_start_cache = None
+
+def evaluate(character, character_class='rogue'):
+    # The dps, breakdown and ep of one decoded character.
+    calculator = jsoninput.from_dict(character, character_class)
+    if warm_start_cache is not None:
+        calculator.warm_start_cache = warm_start_cache
+    return calculator.get_report(('dps', 'breakdown', 'ep'))
+
+def evaluate_line(numbered_line, character_class='rogue'):
+    line_number, line = numbered_line
+    result = {'line': line_number}
+    try:
+        character = json.loads(line)
+        if isinstance(character, dict) and 'id' in character:
+            result['id'] = character['id']
+        result.update(evaluate(character, character_class))
+    except Exception as e:
+        result['error'] = {'type': e.__class__.__name__, 'message': str(e)}
+    return result
+
+def evaluate_stream(lines, processes=None, ordered=True, window=None, character_class='rogue', warm_start_size=None):
+    # Yields a result for each non-blank line.  With processes, records are
+    # spread over a pool of that many worker processes (or one per cpu, for
+    # processes=0); unless ordered, results then come back as they finish
+    # rather than in input order, though never more than a window of records
+    # out of order.  With warm_start_size, solves start from a
+    # warm_start_cache of that size (see set_warm_start) in every process.
+    numbered_lines = ((number, line) for number, line in enumerate(lines, 1) if line.strip())
+    if processes is None:
+        set_warm_start(warm_start_size)
+        for numbered_line in numbered_lines:
+            yield evaluate_line(numbered_line, character_class)
+        return
+
+    if not processes:
+        processes = multiprocessing.cpu_count()
+    if window is None:
+        window = 16 * processes
+    pool = multiprocessing.Pool(processes, set_warm_start, (warm_start_size,))
+    try:
+        while True:
+            chunk = list(itertools.islice(numbered_lines, window))
+            if not chunk:
+                break
+            arguments = [(numbered_line, character_class) for numbered_line in chunk]
+            if ordered:
+                results = pool.imap(_evaluate_line, arguments)
+            else:
+                results = pool.imap_unordered(_evaluate_line, arguments)
+            for result in results:
+                yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+def _evaluate_line(arguments):
+    return evaluate_line(*arguments)
+
+def write_results(results, output):
+    count = 0
+    for result in results:
+        output.write(json.dumps(result, sort_keys=True) + '\n')
+        output.flush()
+        count += 1
+    return count
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage=_('%prog [options] [input [output]]'))
+    parser.add_option('-p', '--processes', type='int', default=None,
+        help=_('evaluate in a pool of this many worker processes (0 for one per cpu)'))
+    parser.add_option('-u', '--unordered', action='store_true', default=False,
+        help=_('write results as they finish instead of in input order'))
+    parser.add_option('-c', '--class', dest='character_class', default='rogue',
+        help=_('character class of every record'))
+    parser.add_option('-w', '--warm-start', type='int', default=None,
+        help=_('start solves from the nearest of up to this many characters solved before'))
+    options, args = parser.parse_args()
+    if len(args) > 2:
+        parser.error(_('at most an input and an output file'))
+
+    input_file = sys.stdin
+    output_file = sys.stdout
+    if len(args) > 0 and args[0] != '-':
+        input_file = open(args[0])
+    if len(args) > 1 and args[1] != '-':
+        output_file = open(args[1], 'w')
+
+    try:
+        # Iterating over a file reads ahead in large blocks; readline hands
+        # over each record as soon as it arrives on a pipe.
+        lines = iter(input_file.readline, '')
+        results = evaluate_stream(lines, options.processes, not options.unordered, character_class=options.character_class, warm_start_size=options.warm_start)
+        write_results(results, output_file)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
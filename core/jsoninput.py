@@ -13,7 +13,10 @@ class InvalidJSONException(exceptions.InvalidInputException):
     pass
 
 def from_json(json_string, character_class='rogue'):
-    j = json.loads(json_string)
+    return from_dict(json.loads(json_string), character_class)
+
+def from_dict(j, character_class='rogue'):
+    # Same as from_json, for a character that has already been decoded.
     try: 
         race_object = race.Race(str(j['race']), character_class=character_class)
         level = int(j['level'])
@@ -140,8 +143,9 @@ if __name__ == '__main__':
 
 
     calculator = from_json(json_string)
+    report = calculator.get_report(('dps', 'breakdown', 'ep'))
     # Compute EP values.
-    ep_values = calculator.get_ep().items()
+    ep_values = report['ep'].items()
     ep_values.sort(key=lambda entry: entry[1], reverse=True)
     max_len = max(len(entry[0]) for entry in ep_values)
     for value in ep_values:
@@ -150,10 +154,10 @@ if __name__ == '__main__':
     print '---------'
 
     # Compute DPS Breakdown.
-    dps_breakdown = calculator.get_dps_breakdown().items()
+    dps_breakdown = report['breakdown'].items()
     dps_breakdown.sort(key=lambda entry: entry[1], reverse=True)
     max_len = max(len(entry[0]) for entry in dps_breakdown)
-    total_dps = sum(entry[1] for entry in dps_breakdown)
+    total_dps = report['dps']
     for entry in dps_breakdown:
         print entry[0] + ':' + ' ' * (max_len - len(entry[0])), entry[1]
 
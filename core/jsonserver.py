@@ -0,0 +1,247 @@
+import BaseHTTPServer
+import SocketServer
+import json
+import multiprocessing
+import optparse
+import threading
+import urlparse
+
+from core import exceptions
+from core import jsonbatch
+from core import jsoninput
+
+# A long running HTTP service for the engine.  Characters are POSTed as
+# JSON in the format jsoninput.from_json reads, to one of
+#     /evaluate    {"dps": ..., "breakdown": {...}, "ep": {...}}
+#     /rankings    {"glyphs": {...}, "talents": [{main tree}, {off trees}]}
+# and the answer comes back as JSON.  Errors come back as
+#     {"error": {"type": ..., "message": ...}}
+# with status 400 for bad input, 404 for an unknown path, 500 if the engine
+# fails, 503 when too many calculations are already queued and 504 when one
+# takes longer than the timeout.
+#
+# Calculations run in a pool of worker processes that are started once,
+# with the engine already imported, so a request pays for nothing but the
+# calculation itself.  Identical requests that arrive while one is still
+# being worked on all wait for that one's answer instead of queueing again.
+# A calculation that times out is stopped: the workers are replaced, and
+# whatever else was in flight starts again on the new ones.
+#
+# From the top of the tree:
+#     python -m core.jsonserver [options]
+
+class CalculationServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, processes=None, max_pending=None, timeout=30, quiet=False, warm_start_size=None):
+        # processes defaults to one per cpu; max_pending, the number of
+        # distinct calculations that may be queued or running at once, to
+        # four per process.  With warm_start_size, each worker starts
+        # /evaluate solves from a jsonbatch.warm_start_cache of that size,
+        # which suits clients browsing through small changes to one
+        # character.
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        if max_pending is None:
+            max_pending = 4 * processes
+        if max_pending < 1:
+            raise exceptions.InvalidInputException(_('The server needs room for at least one calculation'))
+        self.processes = processes
+        self.warm_start_size = warm_start_size
+        self.calculation_timeout = timeout
+        self.quiet = quiet
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.in_flight = {}
+        self.in_flight_lock = threading.Lock()
+        # Start the workers before any threads exist to be forked.
+        self.pool = self.start_pool()
+        BaseHTTPServer.HTTPServer.__init__(self, address, CalculationRequestHandler)
+
+    def start_pool(self):
+        return multiprocessing.Pool(self.processes, jsonbatch.set_warm_start, (self.warm_start_size,))
+
+    def submit(self, path, character):
+        # Returns the PendingCalculation for this calculation, starting it
+        # if an identical one isn't already under way, or None if the
+        # server is full.
+        key = (path, json.dumps(character, sort_keys=True))
+        self.in_flight_lock.acquire()
+        try:
+            if key in self.in_flight:
+                return self.in_flight[key]
+            if not self.slots.acquire(False):
+                return None
+            pending = PendingCalculation(key, path, character)
+            self.in_flight[key] = pending
+            self.start(pending)
+            return pending
+        finally:
+            self.in_flight_lock.release()
+
+    def start(self, pending):
+        # Hands pending to the current pool; in_flight_lock must be held.
+        pool = self.pool
+        def finished(outcome):
+            self.finish(pending, pool, outcome)
+        pool.apply_async(calculate, (pending.path, pending.character), callback=finished)
+
+    def finish(self, pending, pool, outcome):
+        # Called by pool when pending is done.  A pool that has since been
+        # replaced (see abandon) no longer answers for anything.
+        self.in_flight_lock.acquire()
+        try:
+            if pool is not self.pool or self.in_flight.get(pending.key) is not pending:
+                return
+            del self.in_flight[pending.key]
+            self.slots.release()
+        finally:
+            self.in_flight_lock.release()
+        pending.set_outcome(outcome)
+
+    def abandon(self, pending):
+        # Gives up on a calculation that took longer than the timeout.  A
+        # pool can't stop one task, so the workers are replaced: that frees
+        # the worker and pending's slot, and the calculations still in
+        # flight start again on the new ones.  Everyone still waiting on
+        # pending gets the timeout.
+        self.in_flight_lock.acquire()
+        try:
+            if self.in_flight.get(pending.key) is not pending:
+                # It finished meanwhile, or another waiter gave up on it.
+                return
+            del self.in_flight[pending.key]
+            self.slots.release()
+            old_pool = self.pool
+            # The engine is already imported, so the new workers have
+            # nothing to import while request threads run.
+            self.pool = self.start_pool()
+            for other in self.in_flight.values():
+                self.start(other)
+        finally:
+            self.in_flight_lock.release()
+        pending.set_outcome(timeout_error(self.calculation_timeout))
+        # Outside the lock: terminating waits for the old pool's result
+        # thread, which may be waiting for the lock in finish.
+        old_pool.terminate()
+        old_pool.join()
+
+    def server_close(self):
+        BaseHTTPServer.HTTPServer.server_close(self)
+        self.pool.terminate()
+        self.pool.join()
+
+
+class PendingCalculation(object):
+    # A calculation in flight, and its (http status, response body) once a
+    # worker has sent it back.  Every request for it waits on the same one.
+    def __init__(self, key, path, character):
+        self.key = key
+        self.path = path
+        self.character = character
+        self.outcome = None
+        self.finished = threading.Event()
+
+    def set_outcome(self, outcome):
+        self.outcome = outcome
+        self.finished.set()
+
+    def get(self, timeout):
+        # Raises multiprocessing.TimeoutError if there's no outcome within
+        # timeout seconds.
+        self.finished.wait(timeout)
+        if not self.finished.isSet():
+            raise multiprocessing.TimeoutError()
+        return self.outcome
+
+
+def timeout_error(timeout):
+    return 504, {'error': {'type': 'Timeout', 'message': _('Calculation took longer than {timeout} seconds').format(timeout=timeout)}}
+
+
+class CalculationRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_POST(self):
+        path = urlparse.urlparse(self.path)[2]
+        if path not in calculations:
+            self.send_error_json(404, 'NotFound', _('No such calculation: {path}').format(path=path))
+            return
+        try:
+            character = json.loads(self.rfile.read(int(self.headers.getheader('content-length', 0))))
+        except ValueError as e:
+            self.send_error_json(400, e.__class__.__name__, str(e))
+            return
+
+        result = self.server.submit(path, character)
+        if result is None:
+            self.send_error_json(503, 'Busy', _('Too many calculations in progress'))
+            return
+        try:
+            status, body = result.get(self.server.calculation_timeout)
+        except multiprocessing.TimeoutError:
+            self.server.abandon(result)
+            status, body = timeout_error(self.server.calculation_timeout)
+        self.send_json(status, body)
+
+    def send_json(self, status, body):
+        content = json.dumps(body, sort_keys=True)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def send_error_json(self, status, error_type, message):
+        self.send_json(status, {'error': {'type': error_type, 'message': message}})
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            BaseHTTPServer.BaseHTTPRequestHandler.log_message(self, format, *args)
+
+
+def get_rankings(character):
+    calculator = jsoninput.from_dict(character)
+    return {
+        'glyphs': calculator.get_glyphs_ranking(),
+        'talents': calculator.get_talents_ranking()
+    }
+
+calculations = {
+    '/evaluate': jsonbatch.evaluate,
+    '/rankings': get_rankings
+}
+
+def calculate(path, character):
+    # Runs in a worker process; returns (http status, response body) and
+    # never raises, so that every calculation finishes its result.
+    try:
+        return 200, calculations[path](character)
+    except (exceptions.InvalidInputException, KeyError, ValueError, TypeError) as e:
+        return 400, {'error': {'type': e.__class__.__name__, 'message': str(e)}}
+    except Exception as e:
+        return 500, {'error': {'type': e.__class__.__name__, 'message': str(e)}}
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage=_('%prog [options]'))
+    parser.add_option('-H', '--host', default='127.0.0.1',
+        help=_('address to listen on'))
+    parser.add_option('-P', '--port', type='int', default=8080,
+        help=_('port to listen on'))
+    parser.add_option('-p', '--processes', type='int', default=None,
+        help=_('number of worker processes (default one per cpu)'))
+    parser.add_option('-m', '--max-pending', type='int', default=None,
+        help=_('most calculations to queue at once (default four per process)'))
+    parser.add_option('-t', '--timeout', type='float', default=30,
+        help=_('seconds to wait for a calculation before stopping it; that restarts the workers and everything else in flight'))
+    parser.add_option('-q', '--quiet', action='store_true', default=False,
+        help=_('do not log requests'))
+    parser.add_option('-w', '--warm-start', type='int', default=None,
+        help=_('start solves from the nearest of up to this many characters solved before, per worker'))
+    options, args = parser.parse_args()
+
+    server = CalculationServer((options.host, options.port), options.processes, options.max_pending, options.timeout, options.quiet, options.warm_start)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
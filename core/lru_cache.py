@@ -0,0 +1,111 @@
+import threading
+
+from core import exceptions
+
+class LRUCache(object):
+    # A dict-like cache holding at most max_size entries; once full, storing
+    # a new key throws out the one that was used longest ago.  Entries live
+    # in a circular doubly linked list ordered by use, so every operation is
+    # constant time.  Safe to share between threads.  hits and misses count
+    # the lookups through get (and so []) since the cache was made.
+
+    # Indices into the [previous, next, key, value] lists that make up the
+    # linked list.
+    PREVIOUS, NEXT, KEY, VALUE = 0, 1, 2, 3
+
+    def __init__(self, max_size):
+        if max_size < 1:
+            raise exceptions.InvalidInputException(_('A cache needs room for at least one entry'))
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.clear()
+
+    def clear(self):
+        self.lock.acquire()
+        try:
+            self.links = {}
+            # Sentinel: root[NEXT] is the most recently used entry and
+            # root[PREVIOUS] the least.
+            self.root = []
+            self.root[:] = [self.root, self.root, None, None]
+        finally:
+            self.lock.release()
+
+    def __len__(self):
+        return len(self.links)
+
+    def __contains__(self, key):
+        return key in self.links
+
+    def get(self, key, default=None):
+        self.lock.acquire()
+        try:
+            link = self.links.get(key)
+            if link is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._unlink(link)
+            self._link_first(link)
+            return link[self.VALUE]
+        finally:
+            self.lock.release()
+
+    def __getitem__(self, key):
+        missing = []
+        value = self.get(key, missing)
+        if value is missing:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.lock.acquire()
+        try:
+            link = self.links.get(key)
+            if link is not None:
+                self._unlink(link)
+                link[self.VALUE] = value
+            else:
+                if len(self.links) >= self.max_size:
+                    oldest = self.root[self.PREVIOUS]
+                    self._unlink(oldest)
+                    del self.links[oldest[self.KEY]]
+                link = [None, None, key, value]
+                self.links[key] = link
+            self._link_first(link)
+        finally:
+            self.lock.release()
+
+    def __delitem__(self, key):
+        self.lock.acquire()
+        try:
+            link = self.links.pop(key)
+            self._unlink(link)
+        finally:
+            self.lock.release()
+
+    def keys(self):
+        # Most recently used first.
+        self.lock.acquire()
+        try:
+            keys = []
+            link = self.root[self.NEXT]
+            while link is not self.root:
+                keys.append(link[self.KEY])
+                link = link[self.NEXT]
+            return keys
+        finally:
+            self.lock.release()
+
+    def _unlink(self, link):
+        link[self.PREVIOUS][self.NEXT] = link[self.NEXT]
+        link[self.NEXT][self.PREVIOUS] = link[self.PREVIOUS]
+
+    def _link_first(self, link):
+        first = self.root[self.NEXT]
+        link[self.PREVIOUS] = self.root
+        link[self.NEXT] = first
+        first[self.PREVIOUS] = link
+        self.root[self.NEXT] = link
@@ -0,0 +1,143 @@
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+import calcs
+import objects
+from core import lru_cache
+from objects import frozen
+
+# Caches the results of calculator methods such as get_dps, get_ep and
+# get_dps_breakdown by a hash of every input that goes into them, so that the
+# same character asked about twice is only worked out once.  Results are
+# kept in a bounded in-memory LRU and, optionally, in an SQLite file that any
+# number of processes can share.
+#
+# Keys include a version of the model - a hash of the source of the calcs
+# and objects packages - so results worked out by an older version of the
+# engine are never returned once any constant or formula changes.
+
+class ResultCache(object):
+    def __init__(self, max_size=1024, path=None):
+        self.memory = lru_cache.LRUCache(max_size)
+        self.path = path
+        self.local = threading.local()
+        self.counters_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_dps(self, calculator):
+        return self.get(calculator, 'get_dps')
+
+    def get_ep(self, calculator):
+        return self.get(calculator, 'get_ep')
+
+    def get_dps_breakdown(self, calculator):
+        return self.get(calculator, 'get_dps_breakdown')
+
+    def get(self, calculator, method_name):
+        # Returns calculator.<method_name>(), from the cache if it's there.
+        # The method must take no arguments and return something JSON can
+        # hold if there is a disk tier.
+        key = get_key(calculator, method_name)
+        value = self.memory.get(key, _missing)
+        if value is not _missing:
+            self.count('memory_hits')
+            return copy.deepcopy(value)
+
+        if self.path is not None:
+            row = self.get_connection().execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self.count('disk_hits')
+                value = json.loads(row[0])
+                self.memory[key] = value
+                return copy.deepcopy(value)
+
+        self.count('misses')
+        value = getattr(calculator, method_name)()
+        self.memory[key] = copy.deepcopy(value)
+        if self.path is not None:
+            connection = self.get_connection()
+            connection.execute('INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)', (key, json.dumps(value)))
+            connection.commit()
+        return value
+
+    def count(self, counter):
+        self.counters_lock.acquire()
+        try:
+            setattr(self, counter, getattr(self, counter) + 1)
+        finally:
+            self.counters_lock.release()
+
+    def get_connection(self):
+        # SQLite connections can't be shared between threads, nor survive a
+        # fork, so each thread of each process opens its own.
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            connection.commit()
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    def clear(self):
+        # Empties both tiers, for every process sharing the file.
+        self.memory.clear()
+        if self.path is not None:
+            connection = self.get_connection()
+            connection.execute('DELETE FROM results')
+            connection.commit()
+
+    def __getstate__(self):
+        # Worker processes get an empty memory tier and their own
+        # connections to the disk one.
+        return {'max_size': self.memory.max_size, 'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['max_size'], state['path'])
+
+
+_missing = object()
+
+def get_key(calculator, method_name):
+    inputs = {
+        'model': get_model_version(),
+        'method': method_name,
+        'calculator': '.'.join((calculator.__class__.__module__, calculator.__class__.__name__)),
+        'level': calculator.level,
+        'stats': frozen.get_canonical_form(calculator.stats),
+        'talents': frozen.get_canonical_form(calculator.talents),
+        'glyphs': frozen.get_canonical_form(calculator.glyphs),
+        'buffs': frozen.get_canonical_form(calculator.buffs),
+        'race': (calculator.race.race_name, calculator.race.character_class, calculator.race.level),
+        'settings': frozen.get_canonical_form(getattr(calculator, 'settings', None))
+    }
+    # Everything is already in a fixed order, which lets json use its fast
+    # encoder (it can't when asked to sort keys).
+    return hashlib.sha1(json.dumps(sorted(inputs.items()))).hexdigest()
+
+_model_version = None
+
+def get_model_version():
+    global _model_version
+    if _model_version is None:
+        digest = hashlib.sha1()
+        for package in (calcs, objects):
+            root = os.path.dirname(os.path.abspath(package.__file__))
+            for directory, subdirectories, files in sorted(os.walk(root)):
+                for name in sorted(files):
+                    if name.endswith('.py'):
+                        path = os.path.join(directory, name)
+                        digest.update(os.path.relpath(path, root))
+                        source = open(path, 'rb')
+                        try:
+                            digest.update(source.read())
+                        finally:
+                            source.close()
+        _model_version = digest.hexdigest()
+    return _model_version
@@ -0,0 +1,26 @@
+import multiprocessing
+
+# Process pools whose workers each hold a copy of one object and call its
+# methods.  Pools call their initializer and tasks by name from the worker
+# processes, so those, and the object they share, live here at module level.
+#
+#     pool = worker_pool.start(processes, simulator)
+#     results = worker_pool.map_method(pool, 'run_fight', [(0,), (1,)])
+
+_worker_object = None
+
+def _set_worker_object(worker_object):
+    global _worker_object
+    _worker_object = worker_object
+
+def _call_method(task):
+    name, args = task
+    return getattr(_worker_object, name)(*args)
+
+def start(processes, worker_object):
+    return multiprocessing.Pool(processes, _set_worker_object, (worker_object,))
+
+def map_method(pool, name, args_list):
+    # The results of worker_object.name(*args) for each args in args_list,
+    # in order.
+    return pool.map(_call_method, [(name, args) for args in args_list])
@@ -1,10 +1,11 @@
 from core import exceptions
+from objects import revisions
 
 class InvalidBuffException(exceptions.InvalidInputException):
     pass
 
 
-class Buffs(object):
+class Buffs(revisions.Revised):
     # Will need to add the caster/tank (de)buffs at some point if we want to
     # support other classes with this framework.
 
@@ -27,7 +28,12 @@ class Buffs(object):
     
     str_and_agi_buff_values = {80:155, 85:549}
 
+    # Every buff is a fixed slot that __init__ fills in.
+    __slots__ = tuple(allowed_buffs) + ('level', 'str_and_agi_buff_bonus')
+
     def __init__(self, *args, **kwargs):
+        for buff in self.allowed_buffs:
+            setattr(self, buff, False)
         for buff in args:
             if buff not in self.allowed_buffs:
                 raise InvalidBuffException(_('Invalid buff {buff}').format(buff=buff))
@@ -41,7 +47,7 @@ class Buffs(object):
         object.__getattribute__(self, name)
     
     def __setattr__(self, name, value):
-        object.__setattr__(self, name, value)
+        revisions.Revised.__setattr__(self, name, value)
         if name == 'level':
             self._set_constants_for_level()
     
@@ -0,0 +1,174 @@
+import json
+import types
+
+from core import exceptions
+from objects import slotted
+
+# Frozen copies of input objects (Stats, Weapon, ProcsList, GearBuffs, Buffs,
+# Race, talents, glyphs, Settings and cycles).  A frozen object reads exactly
+# like the one it was made from but can't be changed, and it is hashable and
+# compares equal to any other frozen copy of equal inputs, so one input can
+# back any number of calculators, threads and worker processes at once and
+# can key a cache.  freeze copies an object and everything it holds; thaw
+# gives back an ordinary, mutable copy.
+
+class FrozenInputException(exceptions.InvalidInputException):
+    pass
+
+
+class Frozen(object):
+    # Mixed in ahead of the class it freezes; see frozen_class.
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise FrozenInputException(_('Cannot set {name} on a frozen {cls}').format(name=name, cls=self.thawed_class.__name__))
+
+    def __delattr__(self, name):
+        raise FrozenInputException(_('Cannot delete {name} from a frozen {cls}').format(name=name, cls=self.thawed_class.__name__))
+
+    def get_canonical_json(self):
+        # Worked out once; nothing it depends on can change.
+        try:
+            return object.__getattribute__(self, '_canonical_json')
+        except AttributeError:
+            canonical_json = json.dumps(get_canonical_form(self))
+            object.__setattr__(self, '_canonical_json', canonical_json)
+            return canonical_json
+
+    def __hash__(self):
+        return hash(self.get_canonical_json())
+
+    def __eq__(self, other):
+        if not isinstance(other, Frozen) or other.thawed_class is not self.thawed_class:
+            return False
+        return other.get_canonical_json() == self.get_canonical_json()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return freeze, (thaw(self),)
+
+
+class FrozenDict(dict):
+    # A dict that can't be changed once made, for the dicts input objects
+    # hold (talent lookups, racial data and the like).
+    def _frozen(self, *args, **kwargs):
+        raise FrozenInputException(_('Cannot change a frozen dict'))
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _frozen
+
+    def __hash__(self):
+        return hash(json.dumps(get_canonical_form(self)))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+_frozen_classes = {}
+
+def frozen_class(cls):
+    # The frozen variant of an input class: the class itself with Frozen
+    # ahead of it, plus somewhere to keep the canonical form once it has
+    # been worked out.
+    if cls not in _frozen_classes:
+        _frozen_classes[cls] = type('Frozen' + cls.__name__, (Frozen, cls), {
+            '__slots__': ('_canonical_json',),
+            '__module__': cls.__module__,
+            'thawed_class': cls
+        })
+    return _frozen_classes[cls]
+
+def is_frozen(value):
+    return isinstance(value, (Frozen, FrozenDict))
+
+def freeze(value, memo=None):
+    # Numbers, strings, classes, functions and things already frozen are
+    # returned as they are; lists and tuples become tuples, dicts
+    # FrozenDicts and input objects instances of their frozen class, all
+    # with their contents frozen too.  Objects that refer back to each other
+    # (talent trees and their owner) stay that way.
+    if memo is None:
+        memo = {}
+    if value is None or isinstance(value, (bool, int, long, float, basestring, type, types.FunctionType, Frozen, FrozenDict)):
+        return value
+    if id(value) in memo:
+        return memo[id(value)]
+    if isinstance(value, (list, tuple)):
+        frozen_value = tuple(freeze(item, memo) for item in value)
+    elif isinstance(value, dict):
+        frozen_value = FrozenDict((key, freeze(item, memo)) for key, item in value.iteritems())
+    else:
+        frozen_value = object.__new__(frozen_class(value.__class__))
+        memo[id(value)] = frozen_value
+        for name, item in get_state(value).iteritems():
+            object.__setattr__(frozen_value, name, freeze(item, memo))
+    memo[id(value)] = frozen_value
+    return frozen_value
+
+def thaw(value, memo=None):
+    # An ordinary copy of a frozen object, thawed all the way down; anything
+    # that isn't frozen is returned as it is.
+    if memo is None:
+        memo = {}
+    if not is_frozen(value):
+        return value
+    if id(value) in memo:
+        return memo[id(value)]
+    if isinstance(value, FrozenDict):
+        thawed_value = dict((key, thaw_item(item, memo)) for key, item in value.iteritems())
+    else:
+        thawed_value = object.__new__(value.thawed_class)
+        memo[id(value)] = thawed_value
+        for name, item in get_state(value).iteritems():
+            object.__setattr__(thawed_value, name, thaw_item(item, memo))
+    memo[id(value)] = thawed_value
+    return thawed_value
+
+def thaw_item(value, memo):
+    # Tuples inside a frozen object were lists before it was frozen.
+    if isinstance(value, tuple):
+        return [thaw_item(item, memo) for item in value]
+    return thaw(value, memo)
+
+def get_state(value):
+    # The attributes of an input object.
+    if isinstance(value, slotted.Slotted):
+        state = value.__getstate__()
+    elif isinstance(value, Frozen):
+        state = dict(object.__getattribute__(value, '__dict__'))
+    else:
+        state = dict(vars(value))
+    state.pop('_canonical_json', None)
+    return state
+
+def get_canonical_form(value):
+    # Something JSON writes out the same way every time for equal inputs:
+    # numbers, strings and containers as they are, and objects as their
+    # class name and attributes.  Attributes a class lists as
+    # reference_attributes only point at other inputs (or back at their
+    # container) and are left out.
+    if value is None or isinstance(value, (bool, int, long, float, basestring)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [get_canonical_form(item) for item in value]
+    if isinstance(value, dict):
+        return sorted((str(key), get_canonical_form(item)) for key, item in value.iteritems())
+    if isinstance(value, (type, types.FunctionType)):
+        return '.'.join((value.__module__, value.__name__))
+    state = get_state(value)
+    for name in getattr(value, 'reference_attributes', ()):
+        state.pop(name, None)
+    return [getattr(value, 'thawed_class', value.__class__).__name__, get_canonical_form(state)]
@@ -1,7 +1,15 @@
-class Glyphs(object):
+from objects import revisions
+
+class Glyphs(revisions.Revised):
     allowed_glyphs = frozenset()
 
+    # Subclasses should set __slots__ to tuple(allowed_glyphs), so every glyph
+    # is a fixed slot that __init__ fills in.
+    __slots__ = ()
+
     def __init__(self, *args):
+        for glyph in self.allowed_glyphs:
+            setattr(self, glyph, False)
         for arg in args:
             if arg in self.allowed_glyphs:
                 setattr(self, arg, True)
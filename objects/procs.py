@@ -1,5 +1,6 @@
 from core import exceptions
 from objects import proc_data
+from objects import slotted
 
 class InvalidProcException(exceptions.InvalidInputException):
     pass
@@ -89,10 +90,15 @@ class Proc(object):
         else:
             raise InvalidProcException(_('Invalid data for proc {proc}').format(proc=self.proc_name))
 
-class ProcsList(object):
+class ProcsList(slotted.Slotted):
     allowed_procs = proc_data.allowed_procs
 
+    # Every proc is a fixed slot that __init__ fills in.
+    __slots__ = tuple(allowed_procs)
+
     def __init__(self, *args):
+        for proc in self.allowed_procs:
+            setattr(self, proc, False)
         for arg in args:
             if arg in self.allowed_procs:
                 setattr(self, arg, Proc(**self.allowed_procs[arg]))
@@ -113,8 +113,12 @@ class Race(object):
     def _set_constants_for_level(self):
         try:
             self.stats = self.stat_set[self.level]
-            self.activated_racial_data["blood_fury_physical"]["value"] = self.blood_fury_bonuses[self.level]["ap"]
-            self.activated_racial_data["blood_fury_spell"]["value"] = self.blood_fury_bonuses[self.level]["sp"]
+            # Each race gets its own copy of the racial data to fill in, so
+            # races at different levels don't overwrite each other's.
+            activated_racial_data = dict(Race.activated_racial_data)
+            activated_racial_data["blood_fury_physical"] = dict(activated_racial_data["blood_fury_physical"], value=self.blood_fury_bonuses[self.level]["ap"])
+            activated_racial_data["blood_fury_spell"] = dict(activated_racial_data["blood_fury_spell"], value=self.blood_fury_bonuses[self.level]["sp"])
+            self.activated_racial_data = activated_racial_data
             self.stats = map(sum, zip(self.stats, Race.racial_stat_offset[self.race_name]))
         except KeyError as e:
             raise InvalidRaceException(_('Unsupported class/level combination {character_class}/{level}').format(character_class=self.character_class, level=self.level))
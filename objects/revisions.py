@@ -0,0 +1,56 @@
+import itertools
+import threading
+
+from objects import slotted
+
+# Calculators compile the parts of their inputs that don't change within a
+# solve into tables (see calcs.DamageCalculator.get_modifier_table), and
+# need to know when those tables have gone stale.  Each input object the
+# tables depend on (talent trees and ClassTalents, glyphs, buffs, gear buffs
+# and weapons) is a Revised object, which forgets its revision whenever
+# anything on it is set or deleted; get hands it a new one, a number no
+# other object in this process has had, the next time one is asked for.
+# A calculator compares the revisions of its own inputs against those its
+# tables were built for, so building or changing some other character's
+# inputs leaves its tables alone.
+
+_counter = itertools.count(1)
+_lock = threading.Lock()
+
+def get(input_object):
+    # The revision of input_object, or None if there isn't one.
+    if input_object is None:
+        return None
+    try:
+        revision = input_object.revision
+    except AttributeError:
+        revision = None
+    if revision is None:
+        _lock.acquire()
+        try:
+            revision = _counter.next()
+        finally:
+            _lock.release()
+        # Frozen objects (see objects.frozen) get one too; it isn't part of
+        # what they hold.
+        object.__setattr__(input_object, 'revision', revision)
+    return revision
+
+
+class Revised(slotted.Slotted):
+    __slots__ = ('revision',)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, 'revision', None)
+
+    def __delattr__(self, name):
+        object.__delattr__(self, name)
+        object.__setattr__(self, 'revision', None)
+
+    def __getstate__(self):
+        # Copies, pickled or frozen, are new objects with revisions of
+        # their own, and the number means nothing in another process.
+        state = slotted.Slotted.__getstate__(self)
+        state.pop('revision', None)
+        return state
@@ -45,3 +45,5 @@ class RogueGlyphs(glyphs.Glyphs):
         'poisons',
         'safe_fall'
     ])
+
+    __slots__ = tuple(allowed_glyphs)
@@ -23,6 +23,8 @@ class Assassination(talents.TalentTree):
         'vendetta': (1, 7)
     }
 
+    __slots__ = tuple(allowed_talents)
+
     def populate_talents_from_list(self, values_list):
         self.set_talent('deadly_momentum', values_list[0])
         self.set_talent('coup_de_grace', values_list[1])
@@ -67,6 +69,8 @@ class Combat(talents.TalentTree):
         'killing_spree': (1, 7)
     }
 
+    __slots__ = tuple(allowed_talents)
+
     def populate_talents_from_list(self, values_list):
         self.set_talent('improved_recuperate', values_list[0])
         self.set_talent('improved_sinister_strike', values_list[1])
@@ -111,6 +115,8 @@ class Subtlety(talents.TalentTree):
         'shadow_dance': (1, 7)
     }
 
+    __slots__ = tuple(allowed_talents)
+
     def populate_talents_from_list(self, values_list):
         self.set_talent('nightstalker', values_list[0])
         self.set_talent('improved_ambush', values_list[1])
@@ -133,6 +139,8 @@ class Subtlety(talents.TalentTree):
         self.set_talent('shadow_dance', values_list[18])
 
 class RogueTalents(talents.ClassTalents):
+    __slots__ = tuple(Assassination.allowed_talents) + tuple(Combat.allowed_talents) + tuple(Subtlety.allowed_talents)
+
     @classmethod
     def treeClasses(cls):
         return [ Assassination, Combat, Subtlety ]
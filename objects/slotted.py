@@ -0,0 +1,21 @@
+class Slotted(object):
+    # Base for the small input containers (talents, glyphs, buffs, procs...)
+    # that keep their attributes in fixed __slots__ rather than a __dict__:
+    # reads are plain slot loads and each instance is a fraction of the size.
+    # Slotted classes can't be pickled by the older pickle protocols on their
+    # own, so save and restore whichever slots have been filled in.
+    __slots__ = ()
+
+    def __getstate__(self):
+        state = {}
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get('__slots__', ()):
+                try:
+                    state[name] = object.__getattribute__(self, name)
+                except AttributeError:
+                    pass
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.iteritems():
+            setattr(self, name, value)
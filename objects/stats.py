@@ -1,5 +1,6 @@
 import procs
 from core import exceptions
+from objects import revisions
 
 class Stats(object):
     # For the moment, lets define this as raw stats from gear + race; AP is
@@ -80,7 +81,7 @@ class Stats(object):
             rating = self.haste
         return 1 + rating / (100 * self.haste_rating_conversion)
 
-class Weapon(object):
+class Weapon(revisions.Revised):
     allowed_melee_enchants = {  # Completely guessing at proc behavior.  Also at the proc name.
         'hurricane': {
             'stat': 'haste',
@@ -102,7 +103,12 @@ class Weapon(object):
         }
     }
 
+    # Every enchant is a fixed slot that __init__ fills in.
+    __slots__ = ('speed', 'weapon_dps', 'type', '_normalization_speed') + tuple(allowed_melee_enchants)
+
     def __init__(self, damage, speed, weapon_type, enchant=None):
+        for enchant_name in self.allowed_melee_enchants:
+            setattr(self, enchant_name, False)
         self.speed = speed
         self.weapon_dps = damage * 1.0 / speed
         self.type = weapon_type
@@ -138,7 +144,7 @@ class Weapon(object):
     def del_enchant(self):
         for i in self.allowed_melee_enchants:
             if getattr(self, i):
-                delattr(self, i)
+                setattr(self, i, False)
 
     def __getattr__(self, name):
         # Any enchant we haven't assigned a value to, we don't have.
@@ -156,7 +162,7 @@ class Weapon(object):
         return self.speed * self.weapon_dps + self._normalization_speed * ap / 14.
 
 # Catch-all for non-proc gear based buffs (static or activated)
-class GearBuffs(object):
+class GearBuffs(revisions.Revised):
     allowed_buffs = frozenset([
         'leather_specialization',       # Increase %stat by 5%
         'chaotic_metagem',              # Increase critical damage by 3%
@@ -179,7 +185,12 @@ class GearBuffs(object):
         'lifeblood':                {'stat': 'haste', 'value': 480, 'duration': 20, 'cooldown': 120},
     }
 
+    # Every gear buff is a fixed slot that __init__ fills in.
+    __slots__ = tuple(allowed_buffs)
+
     def __init__(self, *args):
+        for buff in self.allowed_buffs:
+            setattr(self, buff, False)
         for arg in args:
             if arg in self.allowed_buffs:
                 setattr(self, arg, True)
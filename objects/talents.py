@@ -1,10 +1,11 @@
 from core import exceptions
+from objects import revisions
 
 class InvalidTalentException(exceptions.InvalidInputException):
     pass
 
 
-class TalentTree(object):
+class TalentTree(revisions.Revised):
     # Base class for talent trees.  Any general property of that any talent 
     # tree will need to have should be defined here.  Note that constructing
     # one of these directly is almost completely useless; always subclass and
@@ -13,14 +14,27 @@ class TalentTree(object):
     # Allowed_talents is a dictionary of talent_name: max_value entries.
     allowed_talents = {}
 
+    # Subclasses should set __slots__ to tuple(allowed_talents): every talent
+    # is then a fixed slot that __init__ fills in, so reading one is a plain
+    # attribute load.  owner is the ClassTalents holding this tree, if any.
+    __slots__ = ('owner',)
+    reference_attributes = ('owner',)
+
     def __getattr__(self, name):
         # If someone tries to access a talent that is defined for the tree but
         # has not had a value assigned to it yet (i.e., the initialization did
         # not put any points into it), we return 0 for the value of the talent.
-        if name in self.allowed_talents.keys():
+        if name in self.allowed_talents:
             return 0
         object.__getattribute__(self, name)
 
+    def __setattr__(self, name, value):
+        revisions.Revised.__setattr__(self, name, value)
+        # Our ClassTalents keeps its own copy of every talent; keep it in step.
+        owner = getattr(self, 'owner', None)
+        if owner is not None and name in self.allowed_talents:
+            revisions.Revised.__setattr__(owner, name, value)
+
     def set_talent(self, talent_name, talent_value):
         if talent_name not in self.allowed_talents.keys():
             raise InvalidTalentException(_('Invalid talent name {talent_name}').format(talent_name=talent_name))
@@ -31,6 +45,9 @@ class TalentTree(object):
         setattr(self, talent_name, int(talent_value))
 
     def __init__(self, talent_string = '', **kwargs):
+        self.owner = None
+        for talent_name in self.allowed_talents:
+            setattr(self, talent_name, 0)
         if not talent_string:
             for talent_name in kwargs.keys():
                 self.set_talent(talent_name, kwargs[talent_name])
@@ -55,7 +72,13 @@ class TalentTree(object):
         # message, but again, I'm being lazy.
         assert False
 
-class ClassTalents(object):
+class ClassTalents(revisions.Revised):
+    # Every talent in the trees is copied onto this object too (the trees
+    # keep the copies up to date), so subclasses should add the names of all
+    # their trees' talents to __slots__.
+    __slots__ = ('trees', 'spec', 'treeForTalent')
+    reference_attributes = ('treeForTalent',)
+
     # override in subclasses to return a list of three TalentTree classes
     # available to this class
     @classmethod
@@ -83,6 +106,8 @@ class ClassTalents(object):
         for tree in self.trees:
             for name in tree.allowed_talents.keys():
                 self.treeForTalent[name] = tree
+                setattr(self, name, getattr(tree, name))
+            tree.owner = self
 
     def is_specced(self, treeClass):
         return self.spec == treeClass
@@ -93,7 +118,8 @@ class ClassTalents(object):
 
     def __getattr__(self, name):
         # If someone tries to access a talent defined on one of the trees,
-        # access it through that tree.
-        if name in self.treeForTalent.keys():
+        # access it through that tree.  treeForTalent itself is missing while
+        # a copy is being unpickled, and must not recurse into itself then.
+        if name != 'treeForTalent' and name in self.treeForTalent:
             return getattr(self.treeForTalent[name], name)
         object.__getattribute__(self, name)
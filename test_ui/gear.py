@@ -0,0 +1,250 @@
+from os import path
+import sys
+sys.path.append(path.abspath(path.join(path.dirname(__file__), '..')))
+
+import copy
+
+from calcs.rogue.Aldriana import AldrianasRogueDamageCalculator
+from calcs.rogue.Aldriana import settings
+from objects import buffs
+from objects import procs
+from objects import race
+from objects import stats
+from objects.rogue import rogue_glyphs
+from objects.rogue import rogue_talents
+
+import ui_data
+
+# The gear side of GearPage without the windows: items out of ui_data by
+# slot, and what a set of items, gems and enchants adds up to.  A gear set is
+# a dict of slot to Item (or Weapon); gems a dict of slot to {socket color:
+# gem name}, enchants a dict of slot to enchant name and reforges a dict of
+# slot to (from stat, to stat), any of which can leave slots out.
+
+gear_slots = [
+    'head',
+    'neck',
+    'shoulders',
+    'back',
+    'chest',
+    'wrists',
+    'hands',
+    'waist',
+    'legs',
+    'feet',
+    'ring1',
+    'ring2',
+    'trinket1',
+    'trinket2',
+    'mainhand',
+    'offhand',
+    'ranged'
+]
+
+gear_stats = [
+    'str',
+    'agi',
+    'ap',
+    'crit',
+    'hit',
+    'exp',
+    'haste',
+    'mastery',
+]
+
+weapon_slots = frozenset(['mainhand', 'offhand', 'ranged'])
+
+def get_items_for_slot(slot):
+    return getattr(ui_data, slot)
+
+def get_item(slot, item_name):
+    item_data = get_items_for_slot(slot)[item_name]
+    if slot in weapon_slots:
+        return ui_data.Weapon(item_name, **item_data)
+    return ui_data.Item(item_name, **item_data)
+
+def get_enchants_for_slot(slot):
+    if slot in ('mainhand', 'offhand'):
+        return ui_data.enchants['melee_weapons']
+    elif slot in ('ring1', 'ring2'):
+        return ui_data.enchants['rings']
+    return ui_data.enchants.get(slot, {})
+
+def get_socket_gems(item, slot_gems):
+    # The gem in each of the item's sockets, in order, '' for none.  Gems
+    # for a slot are either a list like that or, as GearPage keeps them, a
+    # dict of socket color to the gem in every socket of that color.
+    if slot_gems is None:
+        return [''] * len(item.sockets)
+    if isinstance(slot_gems, dict):
+        return [slot_gems.get(color, '') for color in item.sockets]
+    return list(slot_gems)
+
+def get_gem_colors(gem_names):
+    # How many gems of each color there are; a gem of two colors counts as
+    # both, and meta gems as none.
+    counts = {'red': 0, 'yellow': 0, 'blue': 0}
+    for gem_name in gem_names:
+        if len(gem_name) > 0:
+            for color in ui_data.gems[gem_name][0]:
+                if color in counts:
+                    counts[color] += 1
+    return counts
+
+def is_meta_gem_active(gem_name, gem_colors):
+    requirement = ui_data.meta_gem_requirements.get(gem_name)
+    if requirement is None:
+        return True
+    color, than_color = requirement
+    return gem_colors[color] > gem_colors[than_color]
+
+def get_hit_caps(calculator, ep):
+    # [(cap, ep)] in order: the hit rating at which yellow attacks, spells
+    # and white attacks stop missing, and what a point of hit below each is
+    # worth.
+    return [(cap, ep[name]) for cap, name in calculator.get_stat_breakpoints('hit')]
+
+def get_expertise_caps(calculator, ep):
+    # [(cap, ep)]: the expertise rating at which each hand can no longer be
+    # dodged (or parried, if that's worth anything) and what a point below
+    # that is worth to the hand.  Racial expertise can give the hands
+    # different caps, so each carries half the EP.
+    stats = calculator.stats
+    expertise_caps = []
+    for weapon in (stats.mh, stats.oh):
+        expertise = calculator.race.get_racial_expertise(weapon.type)
+        expertise_caps.append((max(calculator.BASE_DODGE_CHANCE - expertise, 0) * 100 * stats.expertise_rating_conversion, ep['dodge_exp'] / 2))
+        if ep['parry_exp'] > 0:
+            expertise_caps.append((max(calculator.BASE_PARRY_CHANCE - expertise, 0) * 100 * stats.expertise_rating_conversion, ep['parry_exp'] / 2))
+    return expertise_caps
+
+def get_weights(calculator, others=()):
+    # EP per point of every item stat at this gear, and for whichever of
+    # the procs and gear buffs in others the engine supports.  Hit and
+    # expertise are worth what they are up to the next cap.
+    ep = calculator.get_ep()
+    hit = calculator.stats.hit
+    expertise = calculator.stats.exp
+    weights = {
+        'str': ep['str'],
+        'agi': ep['agi'],
+        'ap': 1.,
+        'crit': ep['crit'],
+        'hit': ([cap_ep for cap, cap_ep in get_hit_caps(calculator, ep) if hit < cap] + [0])[0],
+        'exp': sum(cap_ep for cap, cap_ep in get_expertise_caps(calculator, ep) if expertise < cap),
+        'haste': ep['haste'],
+        'mastery': ep['mastery']
+    }
+    if others:
+        for name, value in calculator.get_other_ep(sorted(others)).iteritems():
+            # Procs the engine doesn't support come back as messages.
+            if isinstance(value, float):
+                weights[name] = value
+    return weights
+
+def get_gem_value(gem_name, weights):
+    colors, gem_stats = ui_data.gems[gem_name]
+    value = 0
+    for stat, amount in gem_stats.iteritems():
+        if stat == 'gear_buff':
+            value += sum(weights.get(gear_buff, 0) for gear_buff in amount)
+        else:
+            value += amount * weights[stat]
+    return value
+
+def get_stats(gear, gems=None, enchants=None):
+    # The keyword arguments of objects.stats.Stats for this gear.
+    if gems is None:
+        gems = {}
+    if enchants is None:
+        enchants = {}
+    socket_gems = dict((slot, get_socket_gems(gear[slot], gems.get(slot))) for slot in gear_slots)
+    gem_colors = get_gem_colors(sum(socket_gems.values(), []))
+    current_stats = {'str': 0, 'agi': 0, 'ap': 0, 'crit': 0, 'hit': 0, 'exp': 0, 'haste': 0, 'mastery': 0, 'procs': [], 'gear_buffs': []}
+    current_stats['gear_buffs'] = ['leather_specialization'] #Assuming this rather than give equipment an armor type
+
+    tier11_count = 0
+    for slot in gear_slots:
+        item = gear[slot]
+        for stat in gear_stats:
+            current_stats[stat] += getattr(item, stat)
+        if 'tier_11' == item.gear_buff:
+            tier11_count += 1
+        elif len(item.gear_buff) > 0:
+            current_stats['gear_buffs'].append(item.gear_buff)
+        if len(item.proc) > 0:
+            current_stats['procs'].append(item.proc)
+        get_bonus = True
+        for slot_color, gem_name in zip(item.sockets, socket_gems[slot]):
+            if len(gem_name) > 0:
+                gem = ui_data.gems[gem_name]
+                # A meta gem does nothing unless the other gems are the
+                # colors it needs, but still counts for the socket bonus.
+                gem_stats = gem[1]
+                if not is_meta_gem_active(gem_name, gem_colors):
+                    gem_stats = {}
+                for stat in gem_stats:
+                    if stat == 'proc':
+                        current_stats['procs'] += gem_stats[stat]
+                    elif stat == 'gear_buff':
+                        current_stats['gear_buffs'] += gem_stats[stat]
+                    else:
+                        current_stats[stat] += gem_stats[stat]
+                if not slot_color in gem[0] and slot_color != 'prismatic':
+                    get_bonus = False
+            else:
+                get_bonus = False
+        if get_bonus and len(item.bonus_stat) > 0:
+            current_stats[item.bonus_stat] += item.bonus_value
+        enchant_name = enchants.get(slot, '')
+        if len(enchant_name) > 0 and slot not in weapon_slots:
+            enchant_data = get_enchants_for_slot(slot)[enchant_name]
+            for stat in enchant_data.keys():
+                current_stats[stat] += enchant_data[stat]
+    if tier11_count >= 2:
+        current_stats['gear_buffs'].append('rogue_t11_2pc')
+        if tier11_count >= 4:
+            current_stats['procs'].append('rogue_t11_4pc')
+
+    for slot, hand in (('mainhand', 'mh'), ('offhand', 'oh')):
+        weapon = gear[slot]
+        enchant = None
+        if len(enchants.get(slot, '')) > 0:
+            enchant = ui_data.enchants['melee_weapons'][enchants[slot]]
+        current_stats[hand] = stats.Weapon(weapon.damage, weapon.speed, weapon.type, enchant)
+
+    rngd = gear['ranged']
+    current_stats['ranged'] = stats.Weapon(rngd.damage, rngd.speed, rngd.type)
+
+    current_stats['procs'] = procs.ProcsList(*set(current_stats['procs']))
+
+    current_stats['gear_buffs'] = stats.GearBuffs(*set(current_stats['gear_buffs']))
+
+    return current_stats
+
+def get_reforged_gear(gear, reforges):
+    # Copies of the items reforges changes; the rest are shared.
+    reforged_gear = dict(gear)
+    for slot, (from_stat, to_stat) in reforges.iteritems():
+        reforged_gear[slot] = copy.copy(gear[slot])
+        reforged_gear[slot].reforge(from_stat, to_stat)
+    return reforged_gear
+
+def get_calculator(gear, talents, glyphs, buffs, race, settings, level=85, gems=None, enchants=None, reforges=None):
+    if reforges is not None:
+        gear = get_reforged_gear(gear, reforges)
+    gear_stats = get_stats(gear, gems, enchants)
+    return AldrianasRogueDamageCalculator(stats.Stats(level=level, **gear_stats), talents, glyphs, buffs, race, settings, level)
+
+
+specs = {
+    'assassination': (('0333230113022110321', '0020000000000000000', '2030030000000000000'), ('mutilate', 'backstab', 'rupture'), lambda: settings.AssassinationCycle()),
+    'combat': (('0232000000000000000', '0332230310032012321', '0030000000000000000'), ('sinister_strike', 'adrenaline_rush', 'slice_and_dice'), lambda: settings.CombatCycle()),
+    'subtlety': (('0230030000000000000', '0020000000000000000', '0332031321310012321'), ('backstab', 'slice_and_dice', 'shadow_dance'), lambda: settings.SubtletyCycle(5))
+}
+
+def get_character(spec='assassination', race_name='night_elf'):
+    # (talents, glyphs, buffs, race, settings) for a raid buffed rogue of
+    # the given spec, with the talents and prime glyphs most of them run.
+    talents, glyphs, cycle = specs[spec]
+    return rogue_talents.RogueTalents(*talents), rogue_glyphs.RogueGlyphs(*glyphs), buffs.Buffs(*buffs.Buffs.allowed_buffs), race.Race(race_name), settings.Settings(cycle(), response_time=1)
@@ -0,0 +1,351 @@
+from os import path
+import sys
+sys.path.append(path.abspath(path.join(path.dirname(__file__), '..')))
+
+import optparse
+
+from core import exceptions
+from core import worker_pool
+from objects import frozen
+
+import gear
+import ui_data
+
+# Best in slot from the ui_data item database, worked out without clicking
+# through GearPage one combobox at a time.  The search alternates two steps
+# until the gear stops changing:
+#   - With EP worked out at the current gear, find the set EP says is best.
+#     EP is linear, so every slot is picked on its own, except that rings
+#     and trinkets are unique pairs and the tier 11 bonuses depend on how
+#     many pieces are worn, so every choice of tier slots is tried.
+#   - With the calculator itself, swap one slot at a time among the few
+#     items EP likes best, while any swap gains dps.  Weapons are compared
+#     this way too: EP can't weigh a change of speed or type, so the best few
+#     of each kind go forward.
+# Every candidate set in a pass is evaluated at once, across a pool of worker
+# processes if asked, and no set is evaluated twice.
+#
+# From the top of the tree:
+#     python test_ui/gear_optimizer.py [options]
+
+class GearOptimizer(object):
+    tier_bonuses = ((2, 'rogue_t11_2pc'), (4, 'rogue_t11_4pc'))
+    paired_slots = {
+        'ring1': 'ring2',
+        'ring2': 'ring1',
+        'trinket1': 'trinket2',
+        'trinket2': 'trinket1'
+    }
+    socket_colors = ('meta', 'red', 'yellow', 'blue', 'prismatic')
+
+    def __init__(self, talents, glyphs, buffs, race, settings, level=85, gems=None, enchants=None, candidates=3, max_rounds=10, processes=None):
+        # gems maps a socket color to the gem to put in every socket of that
+        # color; left out, each round gems every color with what EP likes
+        # best for it.  enchants maps slot to enchant name.  candidates is
+        # how many items per slot (per kind, for weapons and tier slots) the
+        # calculator gets to compare.  processes is as for the rankings:
+        # None evaluates in this process.
+        self.talents = frozen.freeze(talents)
+        self.glyphs = frozen.freeze(glyphs)
+        self.buffs = frozen.freeze(buffs)
+        self.race = frozen.freeze(race)
+        self.settings = frozen.freeze(settings)
+        self.level = level
+        self.gems = gems
+        if enchants is None:
+            enchants = {}
+        self.enchants = enchants
+        if candidates < 1:
+            raise exceptions.InvalidInputException(_('The optimizer needs at least one candidate per slot'))
+        self.candidates = candidates
+        self.max_rounds = max_rounds
+        self.processes = processes
+        self.items = {}
+        self.evaluated = {}
+        self.pool = None
+
+    def optimize(self, names=None):
+        # Returns (gear, gems, dps): item names by slot, the gems by slot and
+        # socket color that go with them, and the dps they come to.  Starts
+        # from names if given.
+        if names is None:
+            names = self.get_starting_gear()
+        gem_plan = self.gems
+        if gem_plan is None:
+            gem_plan = {}
+        dps = self.get_dps(names, gem_plan)
+        if dps is None:
+            # Evaluate it again, outside get_dps, for the reason why.
+            self.get_calculator(names, gem_plan).get_dps()
+
+        if self.processes is not None:
+            self.pool = worker_pool.start(self.processes, self)
+        try:
+            for round in xrange(self.max_rounds):
+                weights = self.get_weights(self.get_calculator(names, gem_plan))
+                new_gem_plan = gem_plan
+                if self.gems is None:
+                    new_gem_plan = self.get_gem_plan(weights)
+
+                # The EP optimum and the current gear under the new gems,
+                # then single swaps from whichever does best.
+                linear_names = self.get_linear_best(names, weights, new_gem_plan)
+                starts = [(dps, names, gem_plan)]
+                for start_names, start_dps in zip([names, linear_names], self.get_dps_list([names, linear_names], new_gem_plan)):
+                    if start_dps is not None:
+                        starts.append((start_dps, start_names, new_gem_plan))
+                new_dps, new_names, new_gem_plan = max(starts, key=lambda start: start[0])
+                new_names, new_dps = self.climb(new_names, new_dps, new_gem_plan, self.get_shortlists(weights, new_gem_plan))
+
+                if new_names == names and new_gem_plan == gem_plan:
+                    break
+                names, dps, gem_plan = new_names, new_dps, new_gem_plan
+        finally:
+            if self.pool is not None:
+                self.pool.terminate()
+                self.pool.join()
+                self.pool = None
+
+        return names, self.get_gems(names, gem_plan), dps
+
+    def get_starting_gear(self):
+        # The most agility in every slot, and the fastest hitting daggers,
+        # which every spec can use.
+        names = {}
+        for slot in gear.gear_slots:
+            items = gear.get_items_for_slot(slot)
+            if slot in ('mainhand', 'offhand'):
+                items = dict((name, data) for name, data in items.iteritems() if data['type'] == 'dagger')
+            if slot in gear.weapon_slots:
+                key = lambda name: (items[name]['damage'] / items[name]['speed'], name)
+            else:
+                key = lambda name: (items[name].get('agi', 0), name)
+            names[slot] = max(items, key=key)
+            partner = self.paired_slots.get(slot)
+            if partner in names and names[partner] == names[slot]:
+                names[slot] = max([name for name in items if name != names[partner]], key=key)
+        return names
+
+    def get_item(self, slot, name):
+        if (slot, name) not in self.items:
+            self.items[(slot, name)] = gear.get_item(slot, name)
+        return self.items[(slot, name)]
+
+    def get_gear(self, names):
+        return dict((slot, self.get_item(slot, names[slot])) for slot in gear.gear_slots)
+
+    def get_gems(self, names, gem_plan):
+        gems = {}
+        for slot in gear.gear_slots:
+            gems[slot] = dict((color, gem_plan[color]) for color in self.get_item(slot, names[slot]).sockets if color in gem_plan)
+        return gems
+
+    def get_calculator(self, names, gem_plan):
+        return gear.get_calculator(self.get_gear(names), self.talents, self.glyphs, self.buffs, self.race, self.settings, self.level, self.get_gems(names, gem_plan), self.enchants)
+
+    def get_exact_dps(self, names, gem_plan):
+        # None for gear the calculator won't model (say, a sword in an
+        # assassination rogue's main hand).
+        try:
+            return self.get_calculator(names, gem_plan).get_dps()
+        except exceptions.InvalidInputException:
+            return None
+
+    def get_dps(self, names, gem_plan):
+        return self.get_dps_list([names], gem_plan)[0]
+
+    def get_dps_list(self, names_list, gem_plan):
+        gem_key = tuple(sorted(gem_plan.items()))
+        keys = [(tuple(sorted(names.items())), gem_key) for names in names_list]
+        missing = []
+        for key, names in zip(keys, names_list):
+            if key not in self.evaluated:
+                self.evaluated[key] = None
+                missing.append((key, names))
+        if self.pool is not None and len(missing) > 1:
+            results = worker_pool.map_method(self.pool, 'get_exact_dps', [(names, gem_plan) for key, names in missing])
+        else:
+            results = [self.get_exact_dps(names, gem_plan) for key, names in missing]
+        for (key, names), dps in zip(missing, results):
+            self.evaluated[key] = dps
+        return [self.evaluated[key] for key in keys]
+
+    def get_weights(self, calculator):
+        # EP for item stats, weapon dps in each hand and every proc and gear
+        # buff the database (or a set bonus) can add.
+        others = set(bonus for threshold, bonus in self.tier_bonuses)
+        for slot in gear.gear_slots:
+            for data in gear.get_items_for_slot(slot).itervalues():
+                others.update(data.get(key) for key in ('proc', 'gear_buff'))
+        for colors, gem_stats in ui_data.gems.itervalues():
+            others.update(gem_stats.get('gear_buff', []))
+        others.difference_update([None, 'tier_11'])
+        weights = gear.get_weights(calculator, others)
+
+        mh_ep, oh_ep = calculator.get_weapon_ep(dps=True)
+        weights['mainhand_dps'] = mh_ep['mh_dps']
+        weights['offhand_dps'] = oh_ep['oh_dps']
+        return weights
+
+    def get_gem_plan(self, weights):
+        # The gem EP likes best for each socket color; meta gems only fit
+        # meta sockets, and anything else fits a prismatic one.
+        gem_plan = {}
+        for color in self.socket_colors:
+            fits = []
+            for gem_name, (colors, gem_stats) in ui_data.gems.iteritems():
+                if color in colors or (color == 'prismatic' and 'meta' not in colors):
+                    fits.append(gem_name)
+            gem_plan[color] = max(sorted(fits), key=lambda gem_name: gear.get_gem_value(gem_name, weights))
+        return gem_plan
+
+    def get_value(self, slot, name, weights, gem_plan):
+        item = self.get_item(slot, name)
+        value = sum(getattr(item, stat) * weights[stat] for stat in gear.gear_stats)
+        value += weights.get(item.proc, 0) + weights.get(item.gear_buff, 0)
+        get_bonus = True
+        for color in item.sockets:
+            if color not in gem_plan:
+                get_bonus = False
+                continue
+            value += gear.get_gem_value(gem_plan[color], weights)
+            if color not in ui_data.gems[gem_plan[color]][0] and color != 'prismatic':
+                get_bonus = False
+        if get_bonus and len(item.bonus_stat) > 0:
+            value += item.bonus_value * weights[item.bonus_stat]
+        if slot in ('mainhand', 'offhand'):
+            value += item.damage * weights[slot + '_dps'] / item.speed
+        return value
+
+    def get_values(self, weights, gem_plan):
+        values = {}
+        for slot in gear.gear_slots:
+            values[slot] = dict((name, self.get_value(slot, name, weights, gem_plan)) for name in gear.get_items_for_slot(slot))
+        return values
+
+    def get_kind(self, slot, name):
+        # Items EP can rank against each other.
+        item = self.get_item(slot, name)
+        if slot in gear.weapon_slots:
+            return (item.type, item.speed)
+        return item.gear_buff == 'tier_11'
+
+    def has_effect(self, slot, name):
+        item = self.get_item(slot, name)
+        return len(item.proc) > 0 or item.gear_buff not in ('', 'tier_11')
+
+    def get_linear_best(self, names, weights, gem_plan):
+        values = self.get_values(weights, gem_plan)
+        best = lambda slot, choices: max(sorted(choices), key=values[slot].get)
+        linear_names = dict(names)
+
+        tier_slots = []
+        for slot in gear.gear_slots:
+            kinds = set(self.get_kind(slot, name) for name in values[slot])
+            if slot in gear.weapon_slots:
+                # Keep the kind of weapon; the calculator compares kinds.
+                kind = self.get_kind(slot, names[slot])
+                linear_names[slot] = best(slot, [name for name in values[slot] if self.get_kind(slot, name) == kind])
+            elif slot in self.paired_slots:
+                partner = self.paired_slots[slot]
+                if slot < partner:
+                    pair = sorted(values[slot], key=lambda name: (values[slot][name], name), reverse=True)[:2]
+                    if set(pair) != set([names[slot], names[partner]]):
+                        linear_names[slot], linear_names[partner] = pair
+                    else:
+                        linear_names[slot], linear_names[partner] = names[slot], names[partner]
+            elif len(kinds) > 1:
+                tier_slots.append(slot)
+            else:
+                linear_names[slot] = best(slot, values[slot])
+
+        # Every way of filling the tier slots with tier and non-tier items.
+        best_value = None
+        for mask in xrange(2 ** len(tier_slots)):
+            choices = {}
+            value = 0
+            for i, slot in enumerate(tier_slots):
+                is_tier = bool(mask >> i & 1)
+                choices[slot] = best(slot, [name for name in values[slot] if self.get_kind(slot, name) == is_tier])
+                value += values[slot][choices[slot]]
+            pieces = bin(mask).count('1')
+            for threshold, bonus in self.tier_bonuses:
+                if pieces >= threshold:
+                    value += weights.get(bonus, 0)
+            if best_value is None or value > best_value:
+                best_value = value
+                best_choices = choices
+        linear_names.update(best_choices)
+        return linear_names
+
+    def get_shortlists(self, weights, gem_plan):
+        # The best few items of every kind in every slot; paired slots get
+        # one more, so that there are enough left whatever the other holds.
+        # Procs and on-use effects are only valued at the current gear, so
+        # items with them all go forward.
+        values = self.get_values(weights, gem_plan)
+        shortlists = {}
+        for slot in gear.gear_slots:
+            count = self.candidates
+            if slot in self.paired_slots:
+                count += 1
+            kinds = {}
+            for name in values[slot]:
+                kinds.setdefault(self.get_kind(slot, name), []).append(name)
+            shortlists[slot] = []
+            for kind_names in kinds.itervalues():
+                kind_names.sort(key=lambda name: (values[slot][name], name), reverse=True)
+                shortlists[slot] += kind_names[:count]
+                shortlists[slot] += [name for name in kind_names[count:] if self.has_effect(slot, name)]
+        return shortlists
+
+    def climb(self, names, dps, gem_plan, shortlists):
+        # Takes the best single swap until none gains dps.
+        while True:
+            swaps = []
+            for slot in gear.gear_slots:
+                for name in shortlists[slot]:
+                    if name == names[slot] or name == names.get(self.paired_slots.get(slot)):
+                        continue
+                    swap = dict(names)
+                    swap[slot] = name
+                    swaps.append(swap)
+            best_names, best_dps = names, dps
+            for swap, swap_dps in zip(swaps, self.get_dps_list(swaps, gem_plan)):
+                if swap_dps is not None and swap_dps > best_dps:
+                    best_names, best_dps = swap, swap_dps
+            if best_names is names:
+                return names, dps
+            names, dps = best_names, best_dps
+
+    def __getstate__(self):
+        # Workers only evaluate; they get no pool and no results.
+        state = dict(self.__dict__)
+        state['pool'] = None
+        state['evaluated'] = {}
+        return state
+
+
+def get_optimizer(spec='assassination', race_name='night_elf', **kwargs):
+    return GearOptimizer(*gear.get_character(spec, race_name), **kwargs)
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage=_('%prog [options]'))
+    parser.add_option('-s', '--spec', type='choice', choices=sorted(gear.specs), default='assassination',
+        help=_('assassination, combat or subtlety'))
+    parser.add_option('-r', '--race', default='night_elf',
+        help=_('race of the character'))
+    parser.add_option('-c', '--candidates', type='int', default=3,
+        help=_('items per slot for the calculator to compare'))
+    parser.add_option('-p', '--processes', type='int', default=None,
+        help=_('evaluate in a pool of this many worker processes'))
+    options, args = parser.parse_args()
+
+    optimizer = get_optimizer(options.spec, options.race, candidates=options.candidates, processes=options.processes)
+    names, gems, dps = optimizer.optimize()
+    for slot in gear.gear_slots:
+        print slot + ': ' + names[slot]
+        for color, gem_name in sorted(gems[slot].items()):
+            print '    ' + color + ': ' + gem_name
+    print 'dps: ' + str(dps)
@@ -0,0 +1,189 @@
+from os import path
+import sys
+sys.path.append(path.abspath(path.join(path.dirname(__file__), '..')))
+
+import itertools
+import optparse
+
+from objects import frozen
+
+import gear
+import gear_optimizer
+import ui_data
+
+# Gems for every socket of a set of gear.  Each item can either match its
+# sockets' colors for the socket bonus or take the best gems whatever their
+# color, and the meta gem is only active if the gems as a whole are the
+# colors it needs (see ui_data.meta_gem_requirements), so the whole set is
+# solved at once:
+#   - For every item, each way of gemming it comes down to its value by EP
+#     and how many red, yellow and blue gems it uses; only the best way to
+#     reach each count is kept.  Items with the same sockets and socket
+#     bonus have the same choices, so each of those is worked out once.
+#   - A dynamic program over the items then keeps the best value for every
+#     total count, and the meta gem (with what its effect, such as the
+#     chaotic_metagem crit damage, is worth) goes with the best total that
+#     meets its requirement.
+# EP is worked out again at the new gems and the whole thing repeated, while
+# the calculator finds that doing better.  Then, as EP only holds for small
+# changes, single gems are swapped while the calculator finds a better one
+# for any socket.
+#
+# From the top of the tree:
+#     python test_ui/gem_optimizer.py [options]
+
+class GemOptimizer(object):
+    def __init__(self, talents, glyphs, buffs, race, settings, level=85, max_rounds=5):
+        self.talents = frozen.freeze(talents)
+        self.glyphs = frozen.freeze(glyphs)
+        self.buffs = frozen.freeze(buffs)
+        self.race = frozen.freeze(race)
+        self.settings = frozen.freeze(settings)
+        self.level = level
+        self.max_rounds = max_rounds
+        self.meta_gems = sorted(name for name, (colors, gem_stats) in ui_data.gems.iteritems() if 'meta' in colors)
+        self.other_gems = sorted(name for name, (colors, gem_stats) in ui_data.gems.iteritems() if 'meta' not in colors)
+        self.gear_buffs = set()
+        for colors, gem_stats in ui_data.gems.itervalues():
+            self.gear_buffs.update(gem_stats.get('gear_buff', []))
+        self.signature_choices = {}
+
+    def optimize(self, gear_set, gems=None, enchants=None, reforges=None):
+        # Returns (gems, dps): the gem in every socket of every slot, as
+        # gear.get_socket_gems lists them, and the dps that comes to.
+        # Starts from gems if given.
+        if gems is None:
+            gems = {}
+        gems = dict((slot, gear.get_socket_gems(gear_set[slot], gems.get(slot))) for slot in gear.gear_slots)
+        dps = self.get_calculator(gear_set, gems, enchants, reforges).get_dps()
+        for round in xrange(self.max_rounds):
+            weights = gear.get_weights(self.get_calculator(gear_set, gems, enchants, reforges), self.gear_buffs)
+            new_gems = self.solve(gear_set, weights)
+            if new_gems == gems:
+                break
+            new_dps = self.get_calculator(gear_set, new_gems, enchants, reforges).get_dps()
+            if new_dps <= dps:
+                break
+            gems, dps = new_gems, new_dps
+        return self.climb(gear_set, gems, enchants, reforges, dps)
+
+    def climb(self, gear_set, gems, enchants, reforges, dps):
+        # Changes one socket's gem at a time while that gains dps.
+        while True:
+            best_gems, best_dps = gems, dps
+            for slot in gear.gear_slots:
+                for socket, color in enumerate(gear_set[slot].sockets):
+                    if color == 'meta':
+                        gem_names = self.meta_gems
+                    else:
+                        gem_names = self.other_gems
+                    for gem_name in gem_names:
+                        if gem_name == gems[slot][socket]:
+                            continue
+                        new_gems = dict(gems)
+                        new_gems[slot] = list(gems[slot])
+                        new_gems[slot][socket] = gem_name
+                        new_dps = self.get_calculator(gear_set, new_gems, enchants, reforges).get_dps()
+                        if new_dps > best_dps:
+                            best_gems, best_dps = new_gems, new_dps
+            if best_gems is gems:
+                return gems, dps
+            gems, dps = best_gems, best_dps
+
+    def get_calculator(self, gear_set, gems, enchants, reforges):
+        return gear.get_calculator(gear_set, self.talents, self.glyphs, self.buffs, self.race, self.settings, self.level, gems, enchants, reforges)
+
+    def solve(self, gear_set, weights):
+        # The best gems for this gear by these weights.
+        self.signature_choices = {}
+        meta_sockets = 0
+        # states maps (red, yellow, blue) gem counts to the best (value,
+        # choices) that get there; choices are a linked list of (slot,
+        # gems, rest), with None in meta sockets for now.
+        states = {(0, 0, 0): (0., None)}
+        for slot in gear.gear_slots:
+            item = gear_set[slot]
+            if len(item.sockets) == 0:
+                continue
+            meta_sockets += item.sockets.count('meta')
+            new_states = {}
+            for counts, (value, choices) in states.iteritems():
+                for item_counts, (item_value, item_gems) in self.get_choices(item, weights).iteritems():
+                    new_counts = tuple(count + item_count for count, item_count in zip(counts, item_counts))
+                    new_value = value + item_value
+                    if new_counts not in new_states or new_value > new_states[new_counts][0]:
+                        new_states[new_counts] = (new_value, (slot, item_gems, choices))
+            states = new_states
+
+        best = None
+        if not meta_sockets:
+            value, choices = max(states.itervalues())
+            best = (value, None, choices)
+        else:
+            for meta_gem in self.meta_gems:
+                meta_value = meta_sockets * gear.get_gem_value(meta_gem, weights)
+                for (red, yellow, blue), (value, choices) in states.iteritems():
+                    if not gear.is_meta_gem_active(meta_gem, {'red': red, 'yellow': yellow, 'blue': blue}):
+                        continue
+                    if best is None or value + meta_value > best[0]:
+                        best = (value + meta_value, meta_gem, choices)
+        if best is None:
+            # No meta gem can be active; fill the sockets anyway for their
+            # bonus.
+            value, choices = max(states.itervalues())
+            best = (value, self.meta_gems[0], choices)
+
+        value, meta_gem, choices = best
+        gems = dict((slot, []) for slot in gear.gear_slots)
+        while choices is not None:
+            slot, item_gems, choices = choices
+            gems[slot] = [meta_gem if gem_name is None else gem_name for gem_name in item_gems]
+        return gems
+
+    def get_choices(self, item, weights):
+        # {(red, yellow, blue): (value, gems)} for the best ways of gemming
+        # this item, worked out once per socket layout and bonus.
+        signature = (tuple(item.sockets), item.bonus_stat, item.bonus_value)
+        if signature not in self.signature_choices:
+            choices = {}
+            other_sockets = [color for color in item.sockets if color != 'meta']
+            for other_gems in itertools.product(self.other_gems, repeat=len(other_sockets)):
+                value = sum(gear.get_gem_value(gem_name, weights) for gem_name in other_gems)
+                matched = True
+                for color, gem_name in zip(other_sockets, other_gems):
+                    if color not in ui_data.gems[gem_name][0] and color != 'prismatic':
+                        matched = False
+                if matched and len(item.bonus_stat) > 0:
+                    value += item.bonus_value * weights[item.bonus_stat]
+                gem_colors = gear.get_gem_colors(other_gems)
+                counts = (gem_colors['red'], gem_colors['yellow'], gem_colors['blue'])
+                if counts not in choices or value > choices[counts][0]:
+                    other_gems = iter(other_gems)
+                    item_gems = [None if color == 'meta' else other_gems.next() for color in item.sockets]
+                    choices[counts] = (value, item_gems)
+            self.signature_choices[signature] = choices
+        return self.signature_choices[signature]
+
+
+def get_optimizer(spec='assassination', race_name='night_elf', **kwargs):
+    return GemOptimizer(*gear.get_character(spec, race_name), **kwargs)
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage=_('%prog [options]'))
+    parser.add_option('-s', '--spec', type='choice', choices=sorted(gear.specs), default='assassination',
+        help=_('assassination, combat or subtlety'))
+    parser.add_option('-r', '--race', default='night_elf',
+        help=_('race of the character'))
+    options, args = parser.parse_args()
+
+    # Gems for the best gear in the database.
+    optimizer = gear_optimizer.get_optimizer(options.spec, options.race)
+    names, gem_plan, dps = optimizer.optimize()
+    gear_set = optimizer.get_gear(names)
+    gems, gemmed_dps = get_optimizer(options.spec, options.race).optimize(gear_set, gem_plan)
+    for slot in gear.gear_slots:
+        print slot + ': ' + names[slot]
+        for color, gem_name in zip(gear_set[slot].sockets, gems[slot]):
+            print '    ' + color + ': ' + gem_name
+    print 'dps: ' + str(dps) + ' -> ' + str(gemmed_dps)
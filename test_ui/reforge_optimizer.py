@@ -0,0 +1,186 @@
+from os import path
+import sys
+sys.path.append(path.abspath(path.join(path.dirname(__file__), '..')))
+
+import heapq
+import optparse
+
+from core import exceptions
+from objects import frozen
+
+import gear
+import gear_optimizer
+
+# Picks a reforge for every item in a set of gear.  Crit, haste and mastery
+# are worth their EP, but hit and expertise are worth nothing past the caps
+# melee_hit_chance and spell_hit_chance work towards, so dps is piecewise in
+# them: hit is worth its yellow EP up to the yellow cap, its spell EP up to
+# the spell cap and its white EP up to the dual wield cap, and expertise its
+# dodge EP until attacks can no longer be dodged (and its parry EP until
+# they can't be parried, when attacking from the front).
+#
+# A dynamic program over the items, one at a time, keeps for every total of
+# hit and expertise rating the reforges that do best with the other stats;
+# totals past the last cap are all the same.  The best few complete sets by
+# that model are then evaluated with the calculator itself and the best of
+# those is improved on one item at a time while the calculator finds a
+# better reforge for any of them.  That also takes care of anything the
+# model leaves out (autoattack crit capped by glancing blows, say).
+#
+# From the top of the tree:
+#     python test_ui/reforge_optimizer.py [options]
+
+class ReforgeOptimizer(object):
+    def __init__(self, talents, glyphs, buffs, race, settings, level=85, candidates=16, resolution=8):
+        # candidates is how many reforge sets the calculator checks;
+        # resolution how many points of hit or expertise rating the dynamic
+        # program treats as the same.
+        self.talents = frozen.freeze(talents)
+        self.glyphs = frozen.freeze(glyphs)
+        self.buffs = frozen.freeze(buffs)
+        self.race = frozen.freeze(race)
+        self.settings = frozen.freeze(settings)
+        self.level = level
+        if candidates < 1:
+            raise exceptions.InvalidInputException(_('The optimizer needs at least one candidate to check'))
+        self.candidates = candidates
+        self.resolution = resolution
+
+    def optimize(self, gear_set, gems=None, enchants=None, slots=None):
+        # Returns (reforges, dps): (from stat, to stat) by slot for the items
+        # worth reforging, and the dps that comes to.  Only the items in
+        # slots are reforged, if given.
+        if slots is None:
+            slots = gear.gear_slots
+        calculator = self.get_calculator(gear_set, gems, enchants, {})
+        self.set_model(calculator)
+
+        # states maps a (hit, expertise) total, to the nearest resolution
+        # points of rating, to the best (model value, exact hit, exact
+        # expertise, value of the other stats, reforges) that gets there;
+        # reforges are a linked list of (slot, reforge, rest).
+        states = {}
+        self.add_state(states, calculator.stats.hit, calculator.stats.exp, 0., None)
+        for slot in slots:
+            options = self.get_options(gear_set[slot])
+            if len(options) == 1:
+                continue
+            new_states = {}
+            for model_value, hit, exp, value, reforges in states.itervalues():
+                for reforge, hit_change, exp_change, value_change in options:
+                    if reforge is not None:
+                        new_reforges = (slot, reforge, reforges)
+                    else:
+                        new_reforges = reforges
+                    self.add_state(new_states, hit + hit_change, exp + exp_change, value + value_change, new_reforges)
+            states = new_states
+
+        best_reforges = None
+        best_dps = calculator.get_dps()
+        for model_value, hit, exp, value, linked_reforges in heapq.nlargest(self.candidates, states.itervalues()):
+            reforges = {}
+            while linked_reforges is not None:
+                slot, reforge, linked_reforges = linked_reforges
+                reforges[slot] = reforge
+            dps = self.get_calculator(gear_set, gems, enchants, reforges).get_dps()
+            if dps > best_dps:
+                best_reforges, best_dps = reforges, dps
+        if best_reforges is None:
+            best_reforges = {}
+        return self.climb(gear_set, gems, enchants, slots, best_reforges, best_dps)
+
+    def climb(self, gear_set, gems, enchants, slots, reforges, dps):
+        # Changes one item's reforge at a time while that gains dps, for
+        # what the model is slightly wrong about.
+        while True:
+            best_reforges, best_dps = reforges, dps
+            for slot in slots:
+                for reforge, hit_change, exp_change, value_change in self.get_options(gear_set[slot]):
+                    if reforge == reforges.get(slot):
+                        continue
+                    new_reforges = dict(reforges)
+                    if reforge is None:
+                        del new_reforges[slot]
+                    else:
+                        new_reforges[slot] = reforge
+                    new_dps = self.get_calculator(gear_set, gems, enchants, new_reforges).get_dps()
+                    if new_dps > best_dps:
+                        best_reforges, best_dps = new_reforges, new_dps
+            if best_reforges is reforges:
+                return reforges, dps
+            reforges, dps = best_reforges, best_dps
+
+    def get_calculator(self, gear_set, gems, enchants, reforges):
+        return gear.get_calculator(gear_set, self.talents, self.glyphs, self.buffs, self.race, self.settings, self.level, gems, enchants, reforges)
+
+    def set_model(self, calculator):
+        # EP and the caps, in rating, at this gear.
+        self.ep = calculator.get_ep()
+        self.hit_caps = gear.get_hit_caps(calculator, self.ep)
+        self.exp_caps = gear.get_expertise_caps(calculator, self.ep)
+        self.hit_limit = int(max(cap for cap, ep in self.hit_caps)) + 1
+        self.exp_limit = int(max(cap for cap, ep in self.exp_caps)) + 1
+
+    def add_state(self, states, hit, exp, value, reforges):
+        # Past the last caps more rating is worth nothing, so those totals
+        # are all the same state.  The state keeps the real totals, though:
+        # reforging hit or expertise away later takes it off those.
+        capped_hit = min(hit, self.hit_limit)
+        capped_exp = min(exp, self.exp_limit)
+        key = (int(capped_hit) // self.resolution, int(capped_exp) // self.resolution)
+        model_value = self.get_hit_value(capped_hit) + self.get_exp_value(capped_exp) + value
+        if key not in states or model_value > states[key][0]:
+            states[key] = (model_value, hit, exp, value, reforges)
+
+    def get_hit_value(self, hit):
+        # Each stretch between caps is worth the EP of the attacks that
+        # can still miss there.
+        value = 0
+        last_cap = 0
+        for cap, ep in self.hit_caps:
+            value += ep * max(min(hit, cap) - last_cap, 0)
+            last_cap = max(cap, last_cap)
+        return value
+
+    def get_exp_value(self, exp):
+        return sum(ep * min(exp, cap) for cap, ep in self.exp_caps)
+
+    def get_options(self, item):
+        # (reforge, hit change, expertise change, value of the rest) for
+        # every way to reforge the item, leaving it alone first.
+        options = [(None, 0, 0, 0.)]
+        for from_stat in sorted(item.reforgable_from()):
+            amount = int(item.get_reforged_value(from_stat))
+            for to_stat in sorted(item.reforgable_to()):
+                changes = {'hit': 0, 'exp': 0, from_stat: -amount}
+                changes[to_stat] = changes.get(to_stat, 0) + amount
+                value = sum(change * self.ep[stat] for stat, change in changes.iteritems() if stat not in ('hit', 'exp'))
+                options.append(((from_stat, to_stat), changes['hit'], changes['exp'], value))
+        return options
+
+
+def get_optimizer(spec='assassination', race_name='night_elf', **kwargs):
+    return ReforgeOptimizer(*gear.get_character(spec, race_name), **kwargs)
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage=_('%prog [options]'))
+    parser.add_option('-s', '--spec', type='choice', choices=sorted(gear.specs), default='assassination',
+        help=_('assassination, combat or subtlety'))
+    parser.add_option('-r', '--race', default='night_elf',
+        help=_('race of the character'))
+    parser.add_option('-c', '--candidates', type='int', default=16,
+        help=_('reforge sets for the calculator to check'))
+    options, args = parser.parse_args()
+
+    # Reforges for the best gear in the database.
+    optimizer = gear_optimizer.get_optimizer(options.spec, options.race)
+    names, gems, dps = optimizer.optimize()
+    gear_set = optimizer.get_gear(names)
+    reforges, reforged_dps = get_optimizer(options.spec, options.race, candidates=options.candidates).optimize(gear_set, gems)
+    for slot in gear.gear_slots:
+        line = slot + ': ' + names[slot]
+        if slot in reforges:
+            line += ' (' + ' -> '.join(reforges[slot]) + ')'
+        print line
+    print 'dps: ' + str(dps) + ' -> ' + str(reforged_dps)
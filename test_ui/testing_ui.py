@@ -17,6 +17,7 @@ from objects import procs
 from objects.rogue import rogue_talents
 from objects.rogue import rogue_glyphs
 
+import gear
 import ui_data
 import os
 import string
@@ -262,71 +263,13 @@ class GearPage(wx.Panel):
         self.calculator.calculate()
 
     def get_stats(self):
-        current_stats = {'str': 0, 'agi': 0, 'ap': 0, 'crit': 0, 'hit': 0, 'exp': 0, 'haste': 0, 'mastery': 0, 'procs': [], 'gear_buffs': []}
-        current_stats['procs'] = []
-        current_stats['gear_buffs'] = ['leather_specialization'] #Assuming this rather than give equipment an armor type
-        enchant_slots = self.enchants.keys()
-
-        tier11_count = 0
+        gems = {}
         for slot in self.gear_slots:
-            for stat in self.stats:
-                current_stats[stat] += getattr(self.current_gear[slot], stat)
-            gear_buff = self.current_gear[slot].gear_buff
-            if 'tier_11' == gear_buff:
-                tier11_count += 1
-            elif len(gear_buff) > 0:
-                current_stats['gear_buffs'].append(gear_buff)
-            if len(self.current_gear[slot].proc) > 0:
-                current_stats['procs'].append(self.current_gear[slot].proc)
-            get_bonus = True
-            for slot_color in self.current_gear[slot].sockets:
-                gem_name = self.gems[slot][slot_color].GetValue()
-                if len(gem_name) > 0:
-                    gem = ui_data.gems[gem_name]
-                    for stat in gem[1]:
-                        if stat == 'proc':
-                            current_stats['procs'] += gem[1][stat]
-                        elif stat == 'gear_buff':
-                            current_stats['gear_buffs'] += gem[1][stat]
-                        else:
-                            current_stats[stat] += gem[1][stat]
-                    if not slot_color in gem[0] and slot_color != 'prismatic':
-                        get_bonus = False
-            if get_bonus and len(self.current_gear[slot].bonus_stat) > 0:
-                current_stats[self.current_gear[slot].bonus_stat] += self.current_gear[slot].bonus_value
-            if slot in enchant_slots and slot not in ('mainhand', 'offhand'):
-                enchant_name = self.enchants[slot].GetValue()
-                if len(enchant_name) > 0:
-                    enchant_data = ui_data.enchants[slot][enchant_name]
-                    for stat in enchant_data.keys():
-                        current_stats[stat] += enchant_data[stat]
-        if tier11_count >= 2:
-            current_stats['gear_buffs'].append('rogue_t11_2pc')
-            if tier11_count >= 4:
-                current_stats['procs'].append('rogue_t11_4pc')
-        mh = self.current_gear['mainhand']
-        enchant = None
-        if len(self.enchants['mainhand'].GetValue()) > 0:
-            enchant = ui_data.enchants['melee_weapons'][self.enchants['mainhand'].GetValue()]
-        mainhand = stats.Weapon(mh.damage, mh.speed, mh.type, enchant)
-        current_stats['mh'] = mainhand
-
-        oh = self.current_gear['offhand']
-        enchant = None
-        if len(self.enchants['offhand'].GetValue()) > 0:
-            enchant = ui_data.enchants['melee_weapons'][self.enchants['offhand'].GetValue()]
-        offhand = stats.Weapon(oh.damage, oh.speed, oh.type,  enchant)
-        current_stats['oh'] = offhand
-
-        rngd = self.current_gear['ranged']
-        ranged = stats.Weapon(rngd.damage, rngd.speed, rngd.type)
-        current_stats['ranged'] = ranged
-
-        current_stats['procs'] = procs.ProcsList(*set(current_stats['procs']))
-
-        current_stats['gear_buffs'] = stats.GearBuffs(*set(current_stats['gear_buffs']))
-
-        return current_stats
+            gems[slot] = dict((color, self.gems[slot][color].GetValue()) for color in self.gems[slot])
+        enchants = {}
+        for slot in self.enchants:
+            enchants[slot] = self.enchants[slot].GetValue()
+        return gear.get_stats(self.current_gear, gems, enchants)
 
 class TalentsPage(wx.Panel):
     assassination_talents = [
@@ -759,9 +702,10 @@ class TestGUI(wx.Frame):
             self.error_area.SetLabel("")
             try:
                 calculator = AldrianasRogueDamageCalculator(my_stats, my_talents, my_glyphs, my_buffs, my_race, test_settings)
-                dps = calculator.get_dps()
-                ep_values = calculator.get_ep()
-                dps_breakdown = calculator.get_dps_breakdown()
+                report = calculator.get_report(('dps', 'ep', 'breakdown'))
+                dps = report['dps']
+                ep_values = report['ep']
+                dps_breakdown = report['breakdown']
 
             except exceptions.InvalidInputException as e:
                 self.error_area.SetLabel(str(e))
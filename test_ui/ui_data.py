@@ -52,13 +52,12 @@ class Item(object):
         return reforgable
     
     def reforge(self, from_stat, to_stat):
-        print "before: " + from_stat + " = " + str(getattr(self, from_stat))
-        print "        " + to_stat + " = " + str(getattr(self, to_stat))
-        reforged_value = math.floor(getattr(self, from_stat) * 0.4)
+        reforged_value = self.get_reforged_value(from_stat)
         setattr(self, from_stat, getattr(self, from_stat) - reforged_value)
         setattr(self, to_stat, reforged_value)
-        print "after: " + from_stat + " = " + str(getattr(self, from_stat))
-        print "        " + to_stat + " = " + str(getattr(self, to_stat))
+
+    def get_reforged_value(self, from_stat):
+        return math.floor(getattr(self, from_stat) * 0.4)
 
 class Weapon(Item):
     def __init__(self, name, id=0, str=0, agi=0, ap=0, crit=0, hit=0, exp=0, haste=0, mastery=0, sockets=[], bonus_stat='', bonus_value=0, proc='', gear_buff='', damage=0, speed=0, type=''):
@@ -158,7 +157,7 @@ waist = {
     'Dispersing Belt': {'id': 59502, 'agi': 233, 'crit': 149, 'haste': 169, 'sockets': ['blue', 'prismatic'], 'bonus_stat': 'agi', 'bonus_value': 10},
     'Belt of a Thousand Mouths': {'id': 67240, 'agi': 225, 'crit': 150, 'haste': 150, 'sockets': ['prismatic']},
     'Quicksand Belt': {'id': 62446, 'agi': 205, 'crit': 130, 'hit': 150, 'sockets': ['blue', 'prismatic'], 'bonus_stat': 'agi', 'bonus_value': 10},
-    '(H)Red Beam Cord': {'id': 56429, 'agi': 205, 'crit': 130, 'hast': 150, 'sockets': ['blue', 'prismatic'], 'bonus_stat': 'haste', 'bonus_value': 10},
+    '(H)Red Beam Cord': {'id': 56429, 'agi': 205, 'crit': 130, 'haste': 150, 'sockets': ['blue', 'prismatic'], 'bonus_stat': 'haste', 'bonus_value': 10},
     'Red Beam Cord': {'id': 56098, 'agi': 199, 'crit': 133, 'haste': 133, 'sockets': ['blue', 'prismatic'], 'bonus_stat': 'haste', 'bonus_value': 10},
     'Sash of Musing': {'id': 57918, 'agi': 205, 'exp': 130, 'mastery': 150, 'sockets': ['red', 'prismatic'], 'bonus_stat': 'mastery', 'bonus_value': 10},
 }
@@ -221,7 +220,7 @@ trinkets = {
     'Heart of the Vile': {'id': 66969, 'agi': 234, 'proc': 'heart_of_the_vile'},
     'Unheeded Warning ': {'id': 59520, 'agi': 321, 'proc': 'unheeded_warning'},
     'Unsolvable Riddle': {'id': 62463, 'mastery': 321, 'gear_buff': 'unsolvable_riddle'},
-    'Figurine - Demon Panther ': {'id': 52199, 'hit': 285, 'gear_buff': 'demon_panther '},
+    'Figurine - Demon Panther ': {'id': 52199, 'hit': 285, 'gear_buff': 'demon_panther'},
 }
 trinket1 = trinkets
 trinket2 = trinkets
@@ -346,4 +345,11 @@ gems = {
     "Deft Ember Topaz": (['red', 'yellow'], {'agi': 20, 'haste': 20}),
     "Glinting Demonseye": (['red', 'blue'], {'agi': 20, 'hit': 20}),
     "Rigid Ocean Sapphire": (['blue'], {'hit': 40})
-}
\ No newline at end of file
+}
+
+# A meta gem is only active with more gems of the first color than of the
+# second, counting a two-color gem as both.
+meta_gem_requirements = {
+    "Destructive Shadowspirit Diamond": ('blue', 'yellow'),
+    "Chaotic Shadowspirit Diamond": ('blue', 'yellow'),
+}
@@ -89,15 +89,19 @@ class TestDamageCalculator(unittest.TestCase):
 
     def test_mixology_no_flask(self):
         test_calculator = self.make_calculator(gear_buffs_list=['mixology'])
-        self.assertEqual(test_calculator.stats.agi, self.calculator.stats.agi)
+        self.assertEqual(test_calculator.get_profession_stat_bonus('agi'), 0)
 
     def test_mixology(self):
         test_calculator = self.make_calculator(buffs_list=['agi_flask'], gear_buffs_list=['mixology'])
-        self.assertEqual(test_calculator.stats.agi, self.calculator.stats.agi + 80)
+        self.assertEqual(test_calculator.get_profession_stat_bonus('agi'), 80)
+        self.assertEqual(test_calculator.get_profession_stat_bonus('crit'), 0)
+        # The bonus is never written into the stats themselves.
+        self.assertEqual(test_calculator.stats.agi, self.calculator.stats.agi)
 
     def test_master_of_anatomy(self):
         test_calculator = self.make_calculator(gear_buffs_list=['master_of_anatomy'])
-        self.assertEqual(test_calculator.stats.crit, self.calculator.stats.crit + 80)
+        self.assertEqual(test_calculator.get_profession_stat_bonus('crit'), 80)
+        self.assertEqual(test_calculator.stats.crit, self.calculator.stats.crit)
 
     def test_get_all_activated_stat_boosts(self):
         calculator = self.make_calculator(gear_buffs_list=['leather_specialization', 'potion_of_the_tolvir'], race_name='orc')
@@ -0,0 +1,48 @@
+import unittest
+from calcs import dual_number
+
+class TestDualNumber(unittest.TestCase):
+    def setUp(self):
+        self.x = dual_number.DualNumber(3., {'x': 1.})
+        self.y = dual_number.DualNumber(2., {'y': 1.})
+
+    def assertDual(self, number, value, partials):
+        self.assertAlmostEqual(number.value, value)
+        for name in partials:
+            self.assertAlmostEqual(number.partial(name), partials[name])
+
+    def test_arithmetic(self):
+        self.assertDual(self.x + self.y, 5., {'x': 1., 'y': 1.})
+        self.assertDual(1 + self.x, 4., {'x': 1., 'y': 0.})
+        self.assertDual(self.x - self.y, 1., {'x': 1., 'y': -1.})
+        self.assertDual(10 - self.x, 7., {'x': -1.})
+        self.assertDual(self.x * self.y, 6., {'x': 2., 'y': 3.})
+        self.assertDual(2 * self.x, 6., {'x': 2.})
+        self.assertDual(self.x / self.y, 1.5, {'x': .5, 'y': -.75})
+        self.assertDual(6 / self.x, 2., {'x': -2. / 3})
+        self.assertDual(-self.x, -3., {'x': -1.})
+        self.assertDual(abs(-self.x), 3., {'x': 1.})
+
+    def test_powers(self):
+        self.assertDual(self.x ** 2, 9., {'x': 6.})
+        self.assertDual(self.x ** 0, 1., {'x': 0.})
+        self.assertDual(2 ** self.x, 8., {'x': 8. * 0.69314718056})
+        self.assertDual(self.x ** self.y, 9., {'x': 6., 'y': 9. * 1.09861228867})
+
+    def test_comparisons(self):
+        self.assertTrue(self.x > self.y)
+        self.assertTrue(self.x >= 3)
+        self.assertTrue(self.y < 3)
+        self.assertTrue(self.x == 3)
+        self.assertFalse(self.x == None)
+        self.assertTrue(self.x != None)
+        self.assertEqual(max(self.x, 5), 5)
+        self.assertTrue(max(self.x, self.y) is self.x)
+        self.assertFalse(dual_number.DualNumber(0., {'x': 1.}))
+
+    def test_helpers(self):
+        self.assertEqual(dual_number.value_of(self.x), 3.)
+        self.assertEqual(dual_number.value_of(4), 4)
+        self.assertEqual(dual_number.partial_of(self.x, 'x'), 1.)
+        self.assertEqual(dual_number.partial_of(self.x, 'y'), 0.)
+        self.assertEqual(dual_number.partial_of(4, 'x'), 0.)
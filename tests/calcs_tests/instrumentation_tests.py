@@ -0,0 +1,68 @@
+import json
+import unittest
+from calcs import arrays
+from calcs import instrumentation
+from core import jsoninput
+import core_tests
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        character = core_tests.make_character()
+        character['stats']['procs'] = ['fluid_death']
+        self.calculator = jsoninput.from_dict(character)
+        self.dps = self.calculator.get_dps()
+
+    def test_instrument(self):
+        recorder = self.calculator.instrument()
+        self.assertTrue(self.calculator.instrumentation is recorder)
+        self.assertEqual(self.calculator.get_dps(), self.dps)
+        data = recorder.as_dict()
+        for phase in ('set_constants', 'compute_damage', 'attack_counts', 'proc_uptime', 'get_damage_breakdown'):
+            self.assertTrue(data['phases'][phase]['calls'] > 0)
+            self.assertTrue(data['phases'][phase]['seconds'] >= 0)
+        self.assertEqual(data['phases']['compute_damage']['calls'], 2)
+        # Envenoms at combo point counts neither cycle uses aren't worked out.
+        self.assertEqual(data['ability_calls']['envenom_damage'], 3)
+        self.assertFalse('sinister_strike_damage' in data['ability_calls'])
+        self.assertEqual([solve['function'] for solve in data['solves']], ['assassination_attack_counts_mutilate', 'assassination_attack_counts_backstab'])
+        self.assertEqual(data['iterations'], sum([report.iterations for report in self.calculator.convergence_reports.values()]))
+        self.assertTrue(all([solve['converged'] for solve in data['solves']]))
+        self.assertTrue(data['caches']['talents_modifiers']['hits'] > 0)
+        self.assertTrue(data['caches']['cp_distributions']['hits'] + data['caches']['cp_distributions']['misses'] > 0)
+        self.assertEqual(json.loads(recorder.to_json()), json.loads(json.dumps(data)))
+
+        recorder.reset()
+        self.assertEqual(recorder.as_dict()['iterations'], 0)
+        self.calculator.get_ep()
+        # With NumPy, EP is one batch through each cycle's solve.
+        if arrays.numpy is not None:
+            self.assertEqual(len(recorder.solves), 2)
+        else:
+            self.assertEqual(len(recorder.solves), 24)
+
+    def test_uninstrument(self):
+        self.calculator.instrument()
+        self.calculator.uninstrument()
+        self.assertEqual(self.calculator.instrumentation, None)
+        self.assertFalse('compute_damage' in self.calculator.__dict__)
+        self.assertEqual(self.calculator.get_dps(), self.dps)
+        self.calculator.uninstrument()
+
+    def test_copies(self):
+        self.calculator.instrument()
+        self.assertEqual(self.calculator.for_request().instrumentation, None)
+        state = self.calculator.__getstate__()
+        self.assertFalse('instrumentation' in state)
+        self.assertFalse('compute_damage' in state)
+
+    def test_to_prometheus(self):
+        recorder = self.calculator.instrument()
+        self.calculator.get_dps()
+        lines = recorder.to_prometheus('test').splitlines()
+        self.assertTrue('# TYPE test_phase_seconds_total counter' in lines)
+        self.assertTrue('test_phase_calls_total{phase="compute_damage"} 2' in lines)
+        self.assertTrue('test_solves_total{function="assassination_attack_counts_mutilate"} 1' in lines)
+        self.assertTrue('test_ability_damage_calls_total{ability="envenom_damage"} 3' in lines)
+        for line in lines:
+            if not line.startswith('#'):
+                float(line.split(' ')[1])
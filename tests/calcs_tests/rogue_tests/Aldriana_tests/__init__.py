@@ -1,8 +1,16 @@
 import unittest
+from calcs import arrays
+from calcs import dual_number
+from calcs import solvers
+from core import benchmark
+from core import exceptions
+from core import jsoninput
 from calcs.rogue.Aldriana import AldrianasRogueDamageCalculator
+from calcs.rogue.Aldriana import ledger
 from calcs.rogue.Aldriana import settings
 
 from objects import buffs
+from objects import frozen
 from objects import race
 from objects import stats
 from objects import procs
@@ -10,7 +18,7 @@ from objects.rogue import rogue_talents
 from objects.rogue import rogue_glyphs
 
 class TestAldrianasRogueDamageCalculator(unittest.TestCase):
-    def test_get_ep(self):
+    def setUp(self):
         test_buffs = buffs.Buffs()
         test_mh = stats.Weapon(939.5, 1.8, 'dagger', 'landslide')
         test_oh = stats.Weapon(730.5, 1.4, 'dagger', 'landslide')
@@ -25,11 +33,308 @@ class TestAldrianasRogueDamageCalculator(unittest.TestCase):
         test_cycle = settings.AssassinationCycle()
         test_settings = settings.Settings(test_cycle, response_time=1)
         test_level = 85
-        calculator = AldrianasRogueDamageCalculator(test_stats, test_talents, test_glyphs, test_buffs, test_race, test_settings, test_level)
-        ep_values = calculator.get_ep()
+        self.calculator = AldrianasRogueDamageCalculator(test_stats, test_talents, test_glyphs, test_buffs, test_race, test_settings, test_level)
+
+    def test_get_ep(self):
+        ep_values = self.calculator.get_ep()
         self.assertTrue(ep_values['agi'] < 4.0)
         self.assertTrue(ep_values['agi'] > 2.0)
         self.assertTrue(ep_values['yellow_hit'] < 4.0)
         self.assertTrue(ep_values['yellow_hit'] > 1.0)
         self.assertTrue(ep_values['crit'] < 2.0)
         self.assertTrue(ep_values['crit'] > 0.0)
+
+    def test_get_ep_warm_start(self):
+        # Seeding the perturbed solves from the baseline must not move the
+        # results by more than the solver precision does.
+        baseline_dps = self.calculator.get_dps()
+        ap_dps_difference = self.calculator.ep_helper('ap') - baseline_dps
+        ep_values = self.calculator.get_ep()
+        self.assertEqual(self.calculator.converged_states, None)
+        for stat in ('agi', 'haste', 'mastery', 'yellow_hit', 'dodge_exp'):
+            cold_ep = abs(self.calculator.ep_helper(stat) - baseline_dps) / ap_dps_difference
+            self.assertAlmostEqual(ep_values[stat], cold_ep, places=3)
+
+    def test_get_ep_analytic(self):
+        baseline_dps = self.calculator.get_dps()
+        ep_values = self.calculator.get_ep()
+        analytic_ep_values = self.calculator.get_ep(analytic=True)
+        self.assertEqual(set(ep_values.keys()), set(analytic_ep_values.keys()))
+        for stat in ep_values:
+            self.assertAlmostEqual(ep_values[stat], analytic_ep_values[stat], places=3)
+        # The dual numbers must not be left behind on the character.
+        self.assertEqual(self.calculator.ep_tangents, None)
+        self.assertFalse(isinstance(self.calculator.stats.agi, dual_number.DualNumber))
+        self.assertAlmostEqual(self.calculator.get_dps(), baseline_dps)
+
+    def test_get_ep_breakdown(self):
+        ep_values = self.calculator.get_ep(analytic=True)
+        ep_breakdown = self.calculator.get_ep_breakdown()
+        sources = self.calculator.get_dps_breakdown().keys()
+        for stat in ep_values:
+            self.assertEqual(set(ep_breakdown[stat].keys()), set(sources))
+            self.assertAlmostEqual(sum(ep_breakdown[stat].values()), ep_values[stat])
+        self.assertTrue(ep_breakdown['agi']['mutilate'] > 0)
+
+    def test_get_dps_batch(self):
+        agi_column = [4756, 4856, 4656]
+        haste_column = [1189, 989, 1389]
+        dps_list = self.calculator.get_dps_batch(agi=agi_column, haste=haste_column)
+        self.assertEqual(self.calculator.stats.agi, 4756)
+        self.assertEqual(self.calculator.stats.haste, 1189)
+        self.assertEqual(self.calculator.converged_states, None)
+        self.assertEqual(len(dps_list), 3)
+        for agi, haste, dps in zip(agi_column, haste_column, dps_list):
+            self.calculator.stats.agi = agi
+            self.calculator.stats.haste = haste
+            self.assertAlmostEqual(self.calculator.get_dps(), dps, places=3)
+        self.assertEqual(self.calculator.get_dps_batch(), [])
+        self.assertRaises(exceptions.InvalidInputException, self.calculator.get_dps_batch, level=[85])
+        self.assertRaises(exceptions.InvalidInputException, self.calculator.get_dps_batch, agi=[1, 2], crit=[1])
+
+    def get_batch_characters(self):
+        # Every benchmark profile, and assassination with procs that feed
+        # each other enough for the Anderson solver to get a history.
+        characters = [benchmark.get_profile(profile) for profile in benchmark.profile_names]
+        character = benchmark.get_profile('assassination')
+        character['stats']['procs'] = ['heroic_tias_grace', 'tias_grace', 'fluid_death', 'darkmoon_card_hurricane', 'the_twilight_blade']
+        character['stats']['mh']['enchant'] = 'hurricane'
+        character['stats']['oh']['enchant'] = 'hurricane'
+        characters.append(character)
+        return characters
+
+    def test_get_dps_batch_cycles(self):
+        # A batch comes out as row by row for every cycle and solver, NumPy
+        # or not, with rows either side of the hit and expertise caps.
+        columns = {'str': [20, 520, 20, 20], 'agi': [4756, 4856, 4656, 4756], 'ap': [190, 190, 990, 190],
+            'crit': [1022, 1422, 622, 1022], 'hit': [1329, 800, 2400, 1329], 'exp': [597, 300, 900, 597],
+            'haste': [1189, 989, 1389, 1189], 'mastery': [1377, 1577, 1177, 1377]}
+        for character in self.get_batch_characters():
+            for solver in (solvers.SuccessiveSubstitutionSolver(), solvers.AndersonSolver()):
+                calculator = jsoninput.from_dict(character)
+                calculator.solver = solver
+                dps_list = calculator.get_dps_batch(**columns)
+                numpy = arrays.numpy
+                arrays.numpy = None
+                try:
+                    loop_dps_list = calculator.get_dps_batch(**columns)
+                finally:
+                    arrays.numpy = numpy
+                for row, dps in enumerate(loop_dps_list):
+                    for stat, column in columns.iteritems():
+                        setattr(calculator.stats, stat, column[row])
+                    self.assertAlmostEqual(calculator.get_dps(), dps, places=3)
+                    self.assertAlmostEqual(dps_list[row], dps, places=3)
+
+    def test_get_ep_batch(self):
+        # EP from one batch comes out as it does a stat at a time, with
+        # either solver.
+        for character in self.get_batch_characters():
+            for solver in (solvers.SuccessiveSubstitutionSolver(), solvers.AndersonSolver()):
+                calculator = jsoninput.from_dict(character)
+                calculator.solver = solver
+                ep = calculator.get_ep()
+                numpy = arrays.numpy
+                arrays.numpy = None
+                try:
+                    loop_ep = calculator.get_ep()
+                finally:
+                    arrays.numpy = numpy
+                self.assertEqual(sorted(ep.keys()), sorted(loop_ep.keys()))
+                for stat in loop_ep:
+                    self.assertAlmostEqual(ep[stat], loop_ep[stat], places=4)
+
+    def test_get_report_ep_solves(self):
+        # With NumPy, a report of EP alone doesn't solve for a point more
+        # ap; the batch has a row for it.
+        counts = {'iterations': 0, 'solves': 0}
+        benchmark.count_iterations(self.calculator, counts)
+        self.calculator.get_report(['ep'])
+        if arrays.numpy is not None:
+            self.assertEqual(counts['solves'], 4)
+        else:
+            self.assertEqual(counts['solves'], 24)
+
+    def test_get_stat_curve(self):
+        curve = self.calculator.get_stat_curve('haste', [1389, 989, 1189], breakdown=True)
+        self.assertEqual(curve['values'], [989, 1189, 1389])
+        self.assertEqual(self.calculator.stats.haste, 1189)
+        self.assertEqual(self.calculator.converged_states, None)
+        self.assertFalse(self.calculator.chaining_converged_states)
+        for index, haste in enumerate(curve['values']):
+            self.calculator.stats.haste = haste
+            self.assertAlmostEqual(self.calculator.get_dps(), curve['dps'][index], places=3)
+            self.assertAlmostEqual(sum([column[index] for column in curve['breakdown'].values()]), curve['dps'][index])
+        self.assertTrue(curve['dps'][0] < curve['dps'][1] < curve['dps'][2])
+        self.assertRaises(exceptions.InvalidInputException, self.calculator.get_stat_curve, 'level', [85])
+
+    def test_get_stat_curve_breakpoints(self):
+        breakpoints = self.calculator.get_stat_breakpoints('hit')
+        self.assertEqual([name for rating, name in breakpoints], ['yellow_hit', 'spell_hit', 'white_hit'])
+        # Yellow attacks stop missing at exactly the first of them.
+        self.calculator.stats.hit = breakpoints[0][0]
+        self.assertAlmostEqual(self.calculator.one_hand_melee_hit_chance(dodgeable=False), 1)
+        self.calculator.stats.hit = 1329
+        self.assertEqual(self.calculator.get_stat_breakpoints('agi'), [])
+
+        curve = self.calculator.get_stat_curve('hit', range(0, 3001, 500), breakpoints=True)
+        self.assertEqual(curve['breakpoints'], breakpoints)
+        self.assertEqual(len(curve['values']), 10)
+        white_cap = curve['values'].index(breakpoints[2][0])
+        self.assertAlmostEqual(curve['dps'][white_cap], curve['dps'][-1])
+        self.assertTrue(curve['dps'][white_cap - 1] < curve['dps'][white_cap])
+        curve = self.calculator.get_stat_curve('hit', [1500, 2000], breakpoints=True)
+        self.assertEqual(curve['breakpoints'], [])
+
+    def test_get_stat_grid(self):
+        grid = self.calculator.get_stat_grid('haste', [989, 1189, 1389], 'mastery', [1177, 1377], breakdown=True)
+        self.assertEqual(self.calculator.stats.haste, 1189)
+        self.assertEqual(self.calculator.stats.mastery, 1377)
+        self.assertEqual(len(grid['dps']), 3)
+        for i, haste in enumerate(grid['x_values']):
+            for j, mastery in enumerate(grid['y_values']):
+                self.calculator.stats.haste = haste
+                self.calculator.stats.mastery = mastery
+                self.assertAlmostEqual(self.calculator.get_dps(), grid['dps'][i][j], places=3)
+                self.assertAlmostEqual(grid['breakdown']['envenom'][i][j], self.calculator.get_dps_breakdown()['envenom'], places=3)
+        self.assertRaises(exceptions.InvalidInputException, self.calculator.get_stat_grid, 'haste', [1], 'haste', [2])
+
+    def test_rankings_in_processes(self):
+        talents_ranking = self.calculator.get_talents_ranking()
+        glyphs_ranking = self.calculator.get_glyphs_ranking()
+        self.assertEqual(self.calculator.get_talents_ranking(processes=2), talents_ranking)
+        self.assertEqual(self.calculator.get_glyphs_ranking(processes=2), glyphs_ranking)
+        self.assertEqual(self.calculator.talents.vendetta, 1)
+        self.assertTrue(self.calculator.glyphs.mutilate)
+
+    def test_solvers(self):
+        dps = self.calculator.get_dps()
+        reports = self.calculator.convergence_reports
+        self.assertEqual(set(reports.keys()), set(['assassination_attack_counts_mutilate', 'assassination_attack_counts_backstab']))
+        for report in reports.values():
+            self.assertTrue(report.converged)
+            self.assertEqual(report.solver, 'successive_substitution')
+            self.assertTrue(report.residual <= self.calculator.PRECISION_REQUIRED)
+
+        self.calculator.solver = solvers.AndersonSolver()
+        self.assertAlmostEqual(self.calculator.get_dps(), dps, places=3)
+        self.assertEqual(self.calculator.convergence_reports['assassination_attack_counts_mutilate'].solver, 'anderson')
+
+        self.calculator.solver = solvers.SuccessiveSubstitutionSolver(max_iterations=1)
+        self.assertRaises(solvers.ConvergenceException, self.calculator.get_dps)
+        self.assertFalse(self.calculator.convergence_reports['assassination_attack_counts_mutilate'].converged)
+
+    def test_get_dps_matches_breakdown(self):
+        # get_dps takes the total without building the breakdown.
+        for profile in benchmark.profile_names:
+            calculator = jsoninput.from_dict(benchmark.get_profile(profile))
+            dps = calculator.get_dps()
+            self.assertAlmostEqual(dps, sum(calculator.get_dps_breakdown().values()), delta=dps * 1e-12)
+
+    def test_level_change_rebuilds_modifiers(self):
+        # Inputs already at the new level leave nothing for the calculator
+        # to change but its armor mitigation, which the modifier tables
+        # compiled beforehand must not outlive.
+        character = benchmark.get_profile('assassination')
+        calculator = jsoninput.from_dict(character)
+        for input_object in (calculator.buffs, calculator.stats, calculator.race):
+            input_object.level = 80
+        calculator.get_dps()
+        calculator.level = 80
+        character['level'] = 80
+        self.assertAlmostEqual(calculator.get_dps(), jsoninput.from_dict(character).get_dps())
+
+    def test_get_report(self):
+        c = self.calculator
+        separate_counts = {'iterations': 0, 'solves': 0}
+        benchmark.count_iterations(c, separate_counts)
+        dps = c.get_dps()
+        dps_breakdown = c.get_dps_breakdown()
+        ep_values = c.get_ep()
+        mh_ep, oh_ep = c.get_weapon_ep([1.4, 1.8], dps=True, enchants=True)
+        other_ep = c.get_other_ep(['rogue_t11_4pc', 'unheeded_warning'])
+        glyphs_ranking = c.get_glyphs_ranking(['vendetta', 'backstab'])
+        del c.compute_damage
+
+        report_counts = {'iterations': 0, 'solves': 0}
+        benchmark.count_iterations(c, report_counts)
+        report = c.get_report(['dps', 'breakdown', 'ep', 'weapon_ep', 'other_ep', 'glyphs_ranking'],
+            weapon_speeds=[1.4, 1.8], other_ep_list=['rogue_t11_4pc', 'unheeded_warning'], glyphs_list=['vendetta', 'backstab'])
+        del c.compute_damage
+        self.assertEqual(c.converged_states, None)
+        self.assertTrue(report_counts['solves'] < separate_counts['solves'])
+        self.assertTrue(report_counts['iterations'] < separate_counts['iterations'])
+
+        self.assertEqual(report['dps'], dps)
+        self.assertEqual(report['ep'], ep_values)
+        self.assertEqual(set(report['breakdown']), set(dps_breakdown))
+        for source in dps_breakdown:
+            self.assertAlmostEqual(report['breakdown'][source], dps_breakdown[source], places=3)
+        for expected, actual in ((mh_ep, report['weapon_ep']['mh']), (oh_ep, report['weapon_ep']['oh']), (other_ep, report['other_ep'])):
+            self.assertEqual(set(actual), set(expected))
+            for name in expected:
+                self.assertAlmostEqual(actual[name], expected[name], places=3)
+        self.assertEqual(report['glyphs_ranking'], glyphs_ranking)
+
+        self.assertEqual(set(c.get_report()), set(['dps', 'breakdown', 'ep']))
+        self.assertRaises(exceptions.InvalidInputException, c.get_report, ['dps', 'gear'])
+
+    def test_get_trigger_rates(self):
+        self.calculator.get_dps()
+        counts = self.calculator.assassination_attack_counts_mutilate(dict(self.calculator.base_stats))
+        rates = counts.rates
+        crit_rates = counts.crit_rates
+        trigger_rates = self.calculator.get_trigger_rates(counts)
+        self.assertTrue(self.calculator.get_trigger_rates(counts) is trigger_rates)
+        mh_strikes = self.calculator.MH_STRIKES + self.calculator.DIRECT_DAMAGE_FINISHERS
+        self.assertAlmostEqual(trigger_rates['mh', 'strikes', False], sum([rates[ability] for ability in mh_strikes]))
+        self.assertAlmostEqual(trigger_rates['mh', 'strikes', True], sum([rates[ability] * crit_rates[ability] for ability in mh_strikes]))
+        self.assertAlmostEqual(trigger_rates['other', 'bleeds', True], rates[ledger.RUPTURE_TICKS] * crit_rates[ledger.RUPTURE_TICKS])
+        self.assertEqual(trigger_rates['mh', 'apply_debuff', True], 0)
+
+        proc = self.calculator.stats.procs.fluid_death
+        expected = (trigger_rates['mh', 'auto_attacks', False] + trigger_rates['mh', 'strikes', False] + trigger_rates['mh', 'apply_debuff', False]) * proc.proc_rate()
+        self.assertAlmostEqual(self.calculator.get_mh_procs_per_second(proc, counts), expected)
+
+        # The 4pc bonus brings the index up to date; refilling the ledger
+        # drops it.
+        strike_crits = trigger_rates['mh', 'strikes', True]
+        self.calculator.update_crit_rates_for_4pc_t11(counts)
+        updated_trigger_rates = dict(counts.trigger_rates)
+        self.assertTrue(updated_trigger_rates['mh', 'strikes', True] > strike_crits)
+        counts.trigger_rates = None
+        for key, value in self.calculator.get_trigger_rates(counts).iteritems():
+            self.assertAlmostEqual(updated_trigger_rates[key], value)
+        counts.reset()
+        self.assertEqual(counts.trigger_rates, None)
+
+    def test_get_cp_distribution_for_cycle(self):
+        # Ruthlessness 3: 60% of cycles start with a combo point.
+        cp_distribution = self.calculator.get_cp_distribution_for_cycle({2: .75, 3: .25}, 4)
+        expected = {(4, 1): .6 * .25,
+                    (4, 2): .4 * .75 * .75,
+                    (5, 2): .4 * (.75 * .25 + .25) + .6 * .75}
+        for entry in cp_distribution:
+            self.assertAlmostEqual(cp_distribution[entry], expected.get(entry, 0))
+        self.assertAlmostEqual(sum(cp_distribution.values()), 1)
+        cp_distribution[(4, 2)] = 0
+        self.assertNotEqual(self.calculator.get_cp_distribution_for_cycle({2: .75, 3: .25}, 4)[(4, 2)], 0)
+        other_distribution = self.calculator.get_cp_distribution_for_cycle({2: .5, 3: .5}, 4)
+        self.assertAlmostEqual(other_distribution[(4, 1)], .6 * .5)
+
+    def test_frozen_inputs(self):
+        c = self.calculator
+        dps = c.get_dps()
+        ep_values = c.get_ep()
+        glyphs_ranking = c.get_glyphs_ranking()
+        inputs = [frozen.freeze(i) for i in (c.stats, c.talents, c.glyphs, c.buffs, c.race, c.settings)]
+        calculator = AldrianasRogueDamageCalculator(*inputs)
+        other_calculator = AldrianasRogueDamageCalculator(*inputs)
+        self.assertAlmostEqual(calculator.get_dps(), dps)
+        self.assertEqual(calculator.get_ep(), ep_values)
+        self.assertEqual(calculator.get_glyphs_ranking(), glyphs_ranking)
+        self.assertAlmostEqual(other_calculator.get_dps(), dps)
+        # The what-ifs work on thawed copies, and put the frozen inputs back.
+        self.assertTrue(calculator.stats is inputs[0])
+        self.assertTrue(calculator.glyphs is inputs[2])
+        self.assertEqual(inputs[0], frozen.freeze(c.stats))
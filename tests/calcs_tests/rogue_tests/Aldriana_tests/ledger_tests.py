@@ -0,0 +1,75 @@
+import unittest
+from calcs import arrays
+from calcs.rogue.Aldriana import ledger
+
+class TestAbilityLedger(unittest.TestCase):
+    def setUp(self):
+        self.counts = ledger.AbilityLedger()
+        self.counts.rates[ledger.MUTILATE] = .5
+        self.counts.crit_rates[ledger.MUTILATE] = .25
+        self.counts.set_finisher_rates(ledger.ENVENOM, [0, 0, 0, .1, .2, .3])
+        self.counts.crit_rates[ledger.ENVENOM] = .2
+        self.counts.proc_rates['fluid_death'] = .05
+
+    def test_set_finisher_rates(self):
+        self.assertAlmostEqual(self.counts.rates[ledger.ENVENOM], .6)
+        self.assertEqual(self.counts.get_finisher_rates(ledger.ENVENOM), [0, 0, 0, .1, .2, .3])
+        self.assertTrue(self.counts.has_finisher(ledger.ENVENOM))
+        self.assertFalse(self.counts.has_finisher(ledger.EVISCERATE))
+
+    def test_reset(self):
+        self.counts.reset()
+        self.assertEqual(self.counts.rates, [0] * len(ledger.NAMES))
+        self.assertEqual(self.counts.crit_rates, [0] * len(ledger.NAMES))
+        self.assertEqual(self.counts.get_finisher_rates(ledger.ENVENOM), [0] * 6)
+        self.assertFalse(self.counts.has_finisher(ledger.ENVENOM))
+        self.assertEqual(self.counts.proc_rates, {})
+
+    def test_copy(self):
+        copy = self.counts.copy()
+        self.counts.reset()
+        self.assertEqual(copy.rates[ledger.MUTILATE], .5)
+        self.assertEqual(copy.get_finisher_rates(ledger.ENVENOM), [0, 0, 0, .1, .2, .3])
+        self.assertTrue(copy.has_finisher(ledger.ENVENOM))
+        self.assertEqual(copy.proc_rates, {'fluid_death': .05})
+
+    def test_is_close_to(self):
+        other = self.counts.copy()
+        self.assertEqual(self.counts.get_max_difference(other), 0)
+        self.assertTrue(self.counts.is_close_to(other, 0))
+        other.set_finisher_rates(ledger.ENVENOM, [0, 0, 0, .1, .25, .3])
+        self.assertAlmostEqual(self.counts.get_max_difference(other), .05)
+        self.assertFalse(self.counts.is_close_to(other, .01))
+        self.assertTrue(self.counts.is_close_to(other, .1))
+        # Damaging procs are worked out from the rest, and don't count.
+        other = self.counts.copy()
+        other.proc_rates['fluid_death'] = 1
+        self.assertTrue(self.counts.is_close_to(other, 0))
+
+    def test_views(self):
+        attacks_per_second = self.counts.get_attacks_per_second()
+        self.assertEqual(set(attacks_per_second), set(['mutilate', 'envenom', 'fluid_death']))
+        self.assertEqual(attacks_per_second['mutilate'], .5)
+        self.assertEqual(attacks_per_second['envenom'], (0, 0, 0, .1, .2, .3))
+        self.assertEqual(attacks_per_second['fluid_death'], .05)
+        self.assertRaises(KeyError, attacks_per_second.__getitem__, 'backstab')
+        def assign():
+            attacks_per_second['mutilate'] = 1
+        self.assertRaises(TypeError, assign)
+        crit_rates = self.counts.get_crit_rates()
+        self.assertEqual(dict(crit_rates), {'mutilate': .25, 'envenom': .2})
+        # Views follow the ledger as it's refilled.
+        self.counts.rates[ledger.BACKSTAB] = .1
+        self.assertEqual(attacks_per_second['backstab'], .1)
+        self.assertRaises(KeyError, crit_rates.__getitem__, 'fluid_death')
+        self.assertRaises(KeyError, crit_rates.__getitem__, 'eviscerate')
+
+    def test_batched_views(self):
+        if arrays.numpy is None:
+            return
+        self.counts.rates[ledger.MUTILATE] = arrays.numpy.array([.5, 0])
+        self.counts.rates[ledger.BACKSTAB] = arrays.numpy.array([0, 0])
+        attacks_per_second = self.counts.get_attacks_per_second()
+        self.assertEqual(set(attacks_per_second), set(['mutilate', 'envenom', 'fluid_death']))
+        self.assertEqual(list(attacks_per_second['mutilate']), [.5, 0])
+        self.assertRaises(KeyError, attacks_per_second.__getitem__, 'backstab')
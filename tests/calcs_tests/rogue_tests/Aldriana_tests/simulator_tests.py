@@ -0,0 +1,63 @@
+import unittest
+from calcs.rogue.Aldriana import AldrianasRogueDamageCalculator
+from calcs.rogue.Aldriana import InputNotModeledException
+from calcs.rogue.Aldriana import settings
+from calcs.rogue.Aldriana import simulator
+from core import exceptions
+from objects import buffs
+from objects import race
+from objects import stats
+from objects import procs
+from objects.rogue import rogue_talents
+from objects.rogue import rogue_glyphs
+
+class TestSimulator(unittest.TestCase):
+    def make_calculator(self, cycle, talents):
+        test_mh = stats.Weapon(939.5, 1.8, 'dagger', 'landslide')
+        test_oh = stats.Weapon(730.5, 1.4, 'dagger', 'hurricane')
+        test_ranged = stats.Weapon(1371.5, 2.2, 'thrown')
+        test_procs = procs.ProcsList('heroic_left_eye_of_rajh', 'fluid_death', 'rogue_t11_4pc', 'darkmoon_card_hurricane')
+        test_gear_buffs = stats.GearBuffs('rogue_t11_2pc', 'leather_specialization', 'potion_of_the_tolvir', 'chaotic_metagem')
+        test_stats = stats.Stats(20, 4756, 190, 1022, 1329, 597, 1189, 1377, test_mh, test_oh, test_ranged, test_procs, test_gear_buffs)
+        test_talents = rogue_talents.RogueTalents(*talents)
+        test_glyphs = rogue_glyphs.RogueGlyphs('backstab', 'mutilate', 'rupture')
+        test_buffs = buffs.Buffs(*buffs.Buffs.allowed_buffs)
+        test_settings = settings.Settings(cycle, response_time=1)
+        return AldrianasRogueDamageCalculator(test_stats, test_talents, test_glyphs, test_buffs, race.Race('orc'), test_settings, 85)
+
+    def setUp(self):
+        self.calculator = self.make_calculator(settings.AssassinationCycle(), ('0333230113022110321', '0020000000000000000', '2030030000000000000'))
+        self.simulator = simulator.Simulator(self.calculator, seed=1)
+
+    def test_seeded(self):
+        self.assertEqual(self.simulator.run_fight(3), simulator.Simulator(self.calculator, seed=1).run_fight(3))
+        self.assertNotEqual(self.simulator.run_fight(3), self.simulator.run_fight(4))
+        self.assertNotEqual(self.simulator.run_fight(3), simulator.Simulator(self.calculator, seed=2).run_fight(3))
+
+    def test_simulate(self):
+        result = self.simulator.simulate(precision=.01, min_iterations=5, max_iterations=40, batch_size=5)
+        self.assertTrue(5 <= result.iterations < 40)
+        self.assertTrue(result.half_width <= .01 * result.dps)
+        self.assertAlmostEqual(sum(result.breakdown.values()), result.dps)
+        for source in ('mutilate', 'backstab', 'envenom', 'rupture', 'venomous_wounds', 'instant_poison', 'deadly_poison', 'autoattack', 'Lightning Strike'):
+            self.assertTrue(result.breakdown[source] > 0)
+        # The model and the simulation agree to within a few percent.
+        self.assertTrue(abs(result.dps - self.calculator.get_dps()) < .05 * result.dps)
+
+    def test_processes(self):
+        serial = self.simulator.simulate(precision=0, min_iterations=4, max_iterations=4, batch_size=2)
+        parallel = self.simulator.simulate(precision=0, min_iterations=4, max_iterations=4, batch_size=2, processes=2)
+        self.assertEqual(serial.iterations, 4)
+        self.assertAlmostEqual(serial.dps, parallel.dps)
+        self.assertAlmostEqual(serial.half_width, parallel.half_width)
+
+    def test_invalid(self):
+        combat_calculator = self.make_calculator(settings.CombatCycle(), ('0232000000000000000', '0332230310032012321', '0030000000000000000'))
+        self.assertRaises(InputNotModeledException, simulator.Simulator, combat_calculator)
+        self.assertRaises(exceptions.InvalidInputException, self.simulator.simulate, confidence=1)
+        self.assertRaises(exceptions.InvalidInputException, self.simulator.simulate, min_iterations=1)
+
+    def test_get_z(self):
+        self.assertAlmostEqual(simulator.get_z(.95), 1.959964, 5)
+        self.assertAlmostEqual(simulator.get_z(.99), 2.575829, 5)
+        self.assertAlmostEqual(simulator.get_z(.5), .674490, 5)
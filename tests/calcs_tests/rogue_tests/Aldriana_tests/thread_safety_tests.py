@@ -0,0 +1,123 @@
+import sys
+import threading
+import __builtin__
+import unittest
+from multiprocessing import pool
+from calcs.rogue.Aldriana import AldrianasRogueDamageCalculator
+from calcs.rogue.Aldriana import settings
+from core import i18n
+from objects import buffs
+from objects import frozen
+from objects import race
+from objects import stats
+from objects import procs
+from objects.rogue import rogue_talents
+from objects.rogue import rogue_glyphs
+
+class TestThreadSafety(unittest.TestCase):
+    # Many threads evaluating variations of a few characters at once, on
+    # shared inputs, must get exactly what one thread gets doing the same
+    # evaluations one at a time.
+    def make_calculator(self, cycle, talents, mh_enchant, procs_list, agi):
+        test_mh = stats.Weapon(939.5, 1.8, 'dagger', mh_enchant)
+        test_oh = stats.Weapon(730.5, 1.4, 'dagger', 'landslide')
+        test_ranged = stats.Weapon(1371.5, 2.2, 'thrown')
+        test_procs = procs.ProcsList(*procs_list)
+        test_gear_buffs = stats.GearBuffs('rogue_t11_2pc', 'leather_specialization', 'potion_of_the_tolvir', 'chaotic_metagem', 'mixology')
+        test_stats = stats.Stats(20, agi, 190, 1022, 1329, 597, 1189, 1377, test_mh, test_oh, test_ranged, test_procs, test_gear_buffs)
+        test_talents = rogue_talents.RogueTalents(*talents)
+        test_glyphs = rogue_glyphs.RogueGlyphs('backstab', 'mutilate', 'rupture')
+        test_buffs = buffs.Buffs('agi_flask', 'str_and_agi_buff')
+        test_settings = settings.Settings(cycle, response_time=1)
+        return AldrianasRogueDamageCalculator(test_stats, test_talents, test_glyphs, test_buffs, race.Race('orc'), test_settings, 85)
+
+    def setUp(self):
+        characters = [
+            (settings.AssassinationCycle(), ('0333230113022110321', '0020000000000000000', '2030030000000000000'), 'landslide', ('heroic_prestors_talisman_of_machination', 'fluid_death', 'rogue_t11_4pc')),
+            (settings.CombatCycle(), ('0023200000000000000', '0332230310032012321', '0030030000000000000'), 'hurricane', ('fluid_death',)),
+        ]
+        self.calculators = []
+        for character in characters:
+            for agi in (4000, 4500, 5000):
+                self.calculators.append(self.make_calculator(*(character + (agi,))).for_request())
+
+    def evaluate(self, task):
+        index, what = task
+        calculator = self.calculators[index % len(self.calculators)].for_request()
+        if what == 'dps':
+            return calculator.get_dps()
+        elif what == 'breakdown':
+            return calculator.get_dps_breakdown()
+        elif what == 'ep':
+            return calculator.get_ep()
+        return calculator.get_glyphs_ranking()
+
+    def test_stress(self):
+        tasks = []
+        for index in xrange(1000):
+            if index % 100 == 0:
+                tasks.append((index, 'ep'))
+            elif index % 50 == 0:
+                tasks.append((index, 'rankings'))
+            elif index % 2:
+                tasks.append((index, 'breakdown'))
+            else:
+                tasks.append((index, 'dps'))
+        # There are only a couple of dozen different evaluations among them.
+        serial_results = {}
+        expected = []
+        for index, what in tasks:
+            key = (index % len(self.calculators), what)
+            if key not in serial_results:
+                serial_results[key] = self.evaluate((index, what))
+            expected.append(serial_results[key])
+
+        # Switch threads as often as possible, to give any shared state
+        # every chance to get trampled.
+        check_interval = sys.getcheckinterval()
+        sys.setcheckinterval(5)
+        threads = pool.ThreadPool(8)
+        try:
+            results = threads.map(self.evaluate, tasks, chunksize=1)
+        finally:
+            threads.close()
+            threads.join()
+            sys.setcheckinterval(check_interval)
+        self.assertEqual(results, expected)
+
+    def test_shared_inputs_unchanged(self):
+        calculator = self.calculators[0]
+        self.assertTrue(frozen.is_frozen(calculator.stats))
+        frozen_inputs = (calculator.stats, calculator.talents, calculator.glyphs, calculator.buffs)
+        calculator.get_ep()
+        calculator.get_glyphs_ranking()
+        self.assertTrue((calculator.stats, calculator.talents, calculator.glyphs, calculator.buffs) == frozen_inputs)
+        self.assertTrue(calculator.for_request().stats is calculator.stats)
+
+    def test_thread_language(self):
+        # The rest of the suite gets the _() it had back.
+        old_translate = __builtin__._
+        i18n.install_thread_aware()
+        results = {}
+        def translate(language):
+            i18n.set_thread_language(language)
+            results[language] = _('not implemented')
+        try:
+            threads = [threading.Thread(target=translate, args=(language,)) for language in ('es_ES', 'en')]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(results['es_ES'], u'no implementado')
+            self.assertEqual(results['en'], u'not implemented')
+            self.assertEqual(_('not implemented'), 'not implemented')
+
+            # Packages imported afterwards leave it installed.
+            import core
+            import objects.rogue
+            for package in (core, objects, objects.rogue):
+                reload(package)
+            self.assertTrue(__builtin__._ is i18n.translate)
+        finally:
+            i18n.set_thread_language(None)
+            __builtin__._ = old_translate
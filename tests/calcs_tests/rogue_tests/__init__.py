@@ -55,6 +55,38 @@ class TestRogueDamageCalculator(unittest.TestCase):
         self.assertAlmostEqual(self.calculator.crit_damage_modifiers(), 1 + (2 * 1.03 - 1) * 1)
         self.assertAlmostEqual(self.calculator.crit_damage_modifiers(is_spell=True), 1 + (1.5 * 1.03 - 1) * 1)
         self.assertAlmostEqual(self.calculator.crit_damage_modifiers(lethality=True), 1 + (2 * 1.03 - 1) * 1.3)        
+
+    def test_modifier_table_invalidation(self):
+        self.assertAlmostEqual(self.calculator.talents_modifiers(opportunity=True), 1.15 * 1.3)
+        self.calculator.talents.treeForTalent['opportunity'].set_talent('opportunity', 1)
+        self.assertAlmostEqual(self.calculator.talents_modifiers(opportunity=True), 1.15 * 1.1)
+        self.assertAlmostEqual(self.calculator.crit_damage_modifiers(), 1 + (2 * 1.03 - 1) * 1)
+        self.calculator.stats.gear_buffs.chaotic_metagem = False
+        self.assertAlmostEqual(self.calculator.crit_damage_modifiers(), 1 + (2 - 1) * 1)
+        self.calculator.stats.gear_buffs = stats.GearBuffs('chaotic_metagem')
+        self.assertAlmostEqual(self.calculator.crit_damage_modifiers(), 1 + (2 * 1.03 - 1) * 1)
+        spell_modifier = self.calculator.raid_settings_modifiers(is_spell=True)
+        self.calculator.buffs.spell_damage_debuff = False
+        self.assertAlmostEqual(self.calculator.raid_settings_modifiers(is_spell=True) * 1.08, spell_modifier)
+        self.calculator.buffs = buffs.Buffs('spell_damage_debuff')
+        self.assertAlmostEqual(self.calculator.raid_settings_modifiers(is_spell=True), spell_modifier)
+
+    def test_modifier_table_other_inputs(self):
+        # Building or changing some other character's inputs leaves this
+        # calculator's compiled modifiers alone.
+        self.calculator.talents_modifiers(opportunity=True)
+        table = self.calculator.get_modifier_table()
+        other_talents = rogue_talents.RogueTalents('0333230113022110321', '0020000000000000000', '0030030000000000000')
+        other_talents.treeForTalent['opportunity'].set_talent('opportunity', 1)
+        stats.GearBuffs('chaotic_metagem').chaotic_metagem = False
+        self.assertTrue(self.calculator.get_modifier_table() is table)
+        self.assertAlmostEqual(self.calculator.talents_modifiers(opportunity=True), 1.15 * 1.3)
+
+    def test_talents_modifiers_mastery(self):
+        mastery_modifier = .035 * self.calculator.stats.get_mastery_from_rating()
+        self.assertAlmostEqual(self.calculator.talents_modifiers(potent_poisons=True), (1 + mastery_modifier) * 1.15)
+        mastery_modifier = .035 * self.calculator.stats.get_mastery_from_rating(100)
+        self.assertAlmostEqual(self.calculator.talents_modifiers(potent_poisons=True, mastery=100), (1 + mastery_modifier) * 1.15)
     
     # Just do some basic checks for the individual abilities, increasing AP
     # should increase damage and similar for combo points.
@@ -0,0 +1,57 @@
+import calcs
+import unittest
+from core import exceptions
+from calcs import arrays
+from calcs import solvers
+
+class TestSolvers(unittest.TestCase):
+    def image(self, guess):
+        # A linear map with the fixed point x = 2, y = -1 that successive
+        # substitution only creeps towards.
+        return {'x': .9 * guess['x'] + .05 * guess['y'] + .25, 'y': .02 * guess['x'] + .95 * guess['y'] - .09}
+
+    def iterations_to_converge(self, solver):
+        guess = {'x': 0., 'y': 0.}
+        history = []
+        for iteration in range(solver.max_iterations):
+            history.append((guess, self.image(guess)))
+            guess = solver.next_guess(history)
+            if abs(guess['x'] - 2) < 1e-9 and abs(guess['y'] + 1) < 1e-9:
+                return iteration + 1
+        return None
+
+    def test_successive_substitution(self):
+        solver = solvers.SuccessiveSubstitutionSolver()
+        image = {'x': 1.}
+        self.assertTrue(solver.next_guess([({'x': 0.}, image)]) is image)
+        self.assertRaises(exceptions.InvalidInputException, solvers.SuccessiveSubstitutionSolver, 0)
+
+    def test_anderson(self):
+        self.assertEqual(self.iterations_to_converge(solvers.SuccessiveSubstitutionSolver()), None)
+        self.assertTrue(self.iterations_to_converge(solvers.AndersonSolver()) <= 5)
+
+    def test_anderson_batch(self):
+        # Each character in a batch gets the guess it would on its own.
+        if arrays.numpy is None:
+            return
+        solver = solvers.AndersonSolver()
+        guesses = [{'x': 0., 'y': 0.}, {'x': 1., 'y': 3.}]
+        row_histories = [[], []]
+        history = []
+        for iteration in range(3):
+            for row, guess in enumerate(guesses):
+                row_histories[row].append((guess, self.image(guess)))
+            batch_guess = dict([(stat, arrays.get_column([guess[stat] for guess in guesses])) for stat in ('x', 'y')])
+            history.append((batch_guess, dict([(stat, arrays.get_column([image[stat] for guess, image in [row_history[-1] for row_history in row_histories]])) for stat in ('x', 'y')])))
+            batch_guess = solver.next_guess(history)
+            guesses = [solver.next_guess(row_history) for row_history in row_histories]
+            for row, guess in enumerate(guesses):
+                for stat in ('x', 'y'):
+                    self.assertAlmostEqual(batch_guess[stat][row], guess[stat])
+
+    def test_solve_linear_system(self):
+        solution = solvers.solve_linear_system([[0., 2.], [4., 1.]], [2., 9.])
+        self.assertAlmostEqual(solution[0], 2.)
+        self.assertAlmostEqual(solution[1], 1.)
+        self.assertEqual(solvers.solve_linear_system([[1., 2.], [2., 4.]], [1., 2.]), None)
+        self.assertEqual(solvers.solve_linear_system([[0.]], [1.]), None)
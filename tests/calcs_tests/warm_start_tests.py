@@ -0,0 +1,109 @@
+import unittest
+from calcs import arrays
+from calcs import warm_start
+from core import exceptions
+from core import jsoninput
+import core_tests
+
+class TestConvergedStateCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = warm_start.ConvergedStateCache(max_size=2, states_per_key=2)
+
+    def test_get_nearest(self):
+        self.assertEqual(self.cache.get_nearest('key', (0, 0)), None)
+        self.cache.store('key', (0, 0), 'origin')
+        self.cache.store('key', (100, 100), 'far')
+        self.assertEqual(self.cache.get_nearest('key', (10, 20)), 'origin')
+        self.assertEqual(self.cache.get_nearest('key', (60, 60)), 'far')
+        self.assertEqual(self.cache.get_nearest('other', (0, 0)), None)
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 2))
+
+    def test_max_distance(self):
+        self.cache.max_distance = 10
+        self.cache.store('key', (0, 0), 'origin')
+        self.assertEqual(self.cache.get_nearest('key', (5, 5)), 'origin')
+        self.assertEqual(self.cache.get_nearest('key', (10, 1)), None)
+
+    def test_store(self):
+        self.cache.store('key', (0, 0), 'first')
+        self.cache.store('key', (0, 0), 'again')
+        self.assertEqual(self.cache.states['key'], (((0, 0), 'again'),))
+        self.cache.store('key', (10, 0), 'second')
+        self.cache.store('key', (20, 0), 'third')
+        self.assertEqual([state for vector, state in self.cache.states['key']], ['second', 'third'])
+        self.cache.store('other', (0, 0), 'other')
+        self.cache.store('another', (0, 0), 'another')
+        self.assertFalse('key' in self.cache.states)
+        self.assertRaises(exceptions.InvalidInputException, warm_start.ConvergedStateCache, states_per_key=0)
+
+    def test_get_stats(self):
+        self.cache.record_solve('solve', False, 4)
+        self.cache.record_solve('solve', False, 2)
+        self.cache.record_solve('solve', True, 1)
+        self.cache.record_solve('warm_only', True, 1)
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['solves']['solve'], {'cold_solves': 2, 'cold_iterations': 6, 'warm_solves': 1, 'warm_iterations': 1, 'iterations_saved': 2})
+        self.assertEqual(stats['solves']['warm_only']['iterations_saved'], 0)
+        self.assertEqual(stats['iterations_saved'], 2)
+        self.cache.clear_stats()
+        self.assertEqual(self.cache.get_stats(), {'hits': 0, 'misses': 0, 'solves': {}, 'iterations_saved': 0})
+
+    def test_calculator(self):
+        character = core_tests.make_character()
+        cold_dps = []
+        for agi in (4756, 4776, 4756):
+            character['stats']['agi'] = agi
+            cold_dps.append(jsoninput.from_dict(character).get_dps())
+
+        cache = warm_start.ConvergedStateCache()
+        for agi, expected in zip((4756, 4776, 4756), cold_dps):
+            character['stats']['agi'] = agi
+            calculator = jsoninput.from_dict(character)
+            calculator.warm_start_cache = cache
+            self.assertAlmostEqual(calculator.get_dps(), expected, places=3)
+            self.assertTrue(calculator.for_request().warm_start_cache is cache)
+        stats = cache.get_stats()
+        # Two solves (mutilate and backstab cycles) for each character; the
+        # first character's are cold, the rest warm.
+        self.assertEqual((stats['hits'], stats['misses']), (4, 2))
+        for solve in stats['solves'].values():
+            self.assertEqual((solve['cold_solves'], solve['warm_solves']), (1, 2))
+        # Revisiting a character starts from its own fixed point.
+        for report in calculator.convergence_reports.values():
+            self.assertEqual(report.iterations, 1)
+
+        # Only EP's baseline solves use the cache; the perturbed ones, and
+        # the batch NumPy works EP out in, leave it alone.
+        calculator.get_ep()
+        if arrays.numpy is not None:
+            self.assertEqual(cache.get_stats()['hits'], 4)
+        else:
+            self.assertEqual(cache.get_stats()['hits'], 6)
+        self.assertFalse('warm_start_cache' in calculator.__getstate__())
+
+        character['settings']['response_time'] = 1
+        calculator = jsoninput.from_dict(character)
+        calculator.warm_start_cache = cache
+        calculator.get_dps()
+        self.assertEqual(cache.get_stats()['misses'], 4)
+
+    def test_neighbours(self):
+        character = core_tests.make_character()
+        character['stats']['procs'] = ['heroic_prestors_talisman_of_machination', 'fluid_death']
+        character['stats']['mh']['enchant'] = 'landslide'
+        cache = warm_start.ConvergedStateCache()
+        for agi in (4756, 4776):
+            character['stats']['agi'] = agi
+            cold = jsoninput.from_dict(character)
+            cold_dps = cold.get_dps()
+            calculator = jsoninput.from_dict(character)
+            calculator.warm_start_cache = cache
+            self.assertAlmostEqual(calculator.get_dps(), cold_dps, places=3)
+        # A neighbour's state is already at this character's fixed point
+        # once the procs are reapplied, so it is accepted after the first
+        # iteration.
+        for name, report in calculator.convergence_reports.items():
+            self.assertEqual(report.iterations, 1)
+            self.assertTrue(cold.convergence_reports[name].iterations > 1)
+        self.assertTrue(cache.get_stats()['iterations_saved'] > 0)
@@ -0,0 +1,18 @@
+def make_character():
+    # A character in the format core.jsoninput reads.
+    return {
+        'level': 85,
+        'race': 'night_elf',
+        'stats': {
+            'str': 20, 'agi': 4756, 'ap': 190, 'crit': 1022, 'hit': 1329, 'exp': 159, 'haste': 1291, 'mastery': 1713,
+            'gear_buffs': ['leather_specialization'],
+            'procs': [],
+            'mh': {'type': 'dagger', 'speed': 1.8, 'damage': 939.5},
+            'oh': {'type': 'dagger', 'speed': 1.4, 'damage': 730.5},
+            'ranged': {'type': 'thrown', 'speed': 2.2, 'damage': 1371.5}
+        },
+        'buffs': ['agi_flask'],
+        'settings': {'type': 'assassination'},
+        'talents': ['0333230113022110321', '0020000000000000000', '2030030000000000000'],
+        'glyphs': ['mutilate'],
+    }
@@ -0,0 +1,40 @@
+import unittest
+from core import benchmark
+from core import jsoninput
+
+class TestBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.baseline = {'results': {
+            'combat/get_dps': {'normalized': 1., 'iterations': 4},
+            'combat/get_ep': {'normalized': 10., 'iterations': 40},
+            'subtlety/get_dps': {'normalized': 1., 'iterations': 2}
+        }}
+
+    def test_profiles(self):
+        for name in benchmark.profile_names:
+            calculator = jsoninput.from_dict(benchmark.get_profile(name))
+            self.assertTrue(calculator.get_dps() > 0)
+        self.assertRaises(KeyError, benchmark.get_profile, 'fury')
+
+    def test_compare(self):
+        current = {'results': {
+            'combat/get_dps': {'normalized': 1.05, 'iterations': 4},
+            'combat/get_ep': {'normalized': 12., 'iterations': 38},
+            'subtlety/get_dps': {'normalized': .5, 'iterations': 3},
+            'assassination/get_dps': {'normalized': 100., 'iterations': 100}
+        }}
+        regressions = benchmark.compare(self.baseline, current, .1)
+        self.assertEqual(regressions, [('combat/get_ep', 'normalized', 10., 12.), ('subtlety/get_dps', 'iterations', 2, 3)])
+        self.assertEqual(benchmark.compare(self.baseline, current, .5), [('subtlety/get_dps', 'iterations', 2, 3)])
+        self.assertEqual(benchmark.compare(self.baseline, self.baseline), [])
+
+    def test_run_benchmarks(self):
+        results = benchmark.run_benchmarks(['subtlety'], ['get_dps', 'from_json'], repeat=1, min_time=0)
+        self.assertEqual(sorted(results['results']), ['subtlety/from_json', 'subtlety/get_dps'])
+        self.assertTrue(results['calibration'] > 0)
+        result = results['results']['subtlety/get_dps']
+        self.assertTrue(result['seconds'] > 0)
+        self.assertAlmostEqual(result['normalized'], result['seconds'] / results['calibration'])
+        self.assertTrue(result['solves'] >= 1)
+        self.assertTrue(result['iterations'] >= result['solves'])
+        self.assertEqual(results['results']['subtlety/from_json']['iterations'], 0)
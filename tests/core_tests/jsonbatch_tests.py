@@ -0,0 +1,45 @@
+import json
+import StringIO
+import unittest
+import core_tests
+from core import jsonbatch
+from core import jsoninput
+
+class TestJSONBatch(unittest.TestCase):
+    def setUp(self):
+        self.character = core_tests.make_character()
+        missing_race = dict(self.character)
+        del missing_race['race']
+        self.lines = [json.dumps(dict(self.character, id='first')), '\n', '{not json', json.dumps(missing_race)]
+
+    def check(self, results):
+        self.assertEqual([result['line'] for result in results], [1, 3, 4])
+        calculator = jsoninput.from_dict(self.character)
+        self.assertEqual(results[0]['id'], 'first')
+        self.assertAlmostEqual(results[0]['dps'], calculator.get_dps())
+        self.assertEqual(sorted(results[0]['ep'].keys()), sorted(calculator.get_ep().keys()))
+        self.assertEqual(results[1]['error']['type'], 'ValueError')
+        self.assertEqual(results[2]['error']['type'], 'InvalidJSONException')
+        self.assertFalse('id' in results[2])
+
+    def test_evaluate_stream(self):
+        self.check(list(jsonbatch.evaluate_stream(self.lines)))
+
+    def test_evaluate_stream_warm_start(self):
+        try:
+            self.check(list(jsonbatch.evaluate_stream(self.lines, warm_start_size=8)))
+            self.assertEqual(jsonbatch.warm_start_cache.get_stats()['misses'], 2)
+        finally:
+            jsonbatch.set_warm_start(None)
+        self.check(list(jsonbatch.evaluate_stream(self.lines, processes=2, warm_start_size=8)))
+
+    def test_evaluate_stream_in_processes(self):
+        self.check(list(jsonbatch.evaluate_stream(self.lines, processes=2, window=2)))
+        results = jsonbatch.evaluate_stream(self.lines, processes=2, ordered=False)
+        self.check(sorted(results, key=lambda result: result['line']))
+
+    def test_write_results(self):
+        output = StringIO.StringIO()
+        self.assertEqual(jsonbatch.write_results(jsonbatch.evaluate_stream(self.lines), output), 3)
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.check(results)
@@ -0,0 +1,74 @@
+import httplib
+import json
+import threading
+import unittest
+import core_tests
+from core import jsoninput
+from core import jsonserver
+
+class TestCalculationServer(unittest.TestCase):
+    def setUp(self):
+        self.character = core_tests.make_character()
+        self.server = jsonserver.CalculationServer(('127.0.0.1', 0), processes=1, max_pending=1, quiet=True)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+
+    def post(self, path, body):
+        connection = httplib.HTTPConnection(*self.server.server_address)
+        try:
+            connection.request('POST', path, body, {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            connection.close()
+
+    def test_evaluate(self):
+        status, body = self.post('/evaluate', json.dumps(self.character))
+        self.assertEqual(status, 200)
+        calculator = jsoninput.from_dict(self.character)
+        self.assertAlmostEqual(body['dps'], calculator.get_dps())
+        self.assertAlmostEqual(sum(body['breakdown'].values()), body['dps'])
+        self.assertAlmostEqual(body['ep']['agi'], calculator.get_ep()['agi'])
+
+    def test_rankings(self):
+        status, body = self.post('/rankings', json.dumps(self.character))
+        self.assertEqual(status, 200)
+        calculator = jsoninput.from_dict(self.character)
+        self.assertEqual(sorted(body['glyphs'].keys()), sorted(calculator.get_glyphs_ranking().keys()))
+        self.assertEqual(len(body['talents']), 2)
+
+    def test_errors(self):
+        self.assertEqual(self.post('/fake', json.dumps(self.character))[0], 404)
+        status, body = self.post('/evaluate', '{not json')
+        self.assertEqual(status, 400)
+        self.assertEqual(body['error']['type'], 'ValueError')
+        del self.character['race']
+        status, body = self.post('/evaluate', json.dumps(self.character))
+        self.assertEqual(status, 400)
+        self.assertEqual(body['error']['type'], 'InvalidJSONException')
+
+    def test_submit(self):
+        result = self.server.submit('/evaluate', self.character)
+        # Identical requests share a calculation, and with room for only one
+        # any other has to wait.
+        self.assertTrue(self.server.submit('/evaluate', dict(self.character)) is result)
+        self.assertEqual(self.server.submit('/rankings', self.character), None)
+        self.assertEqual(result.get(30)[0], 200)
+        self.assertEqual(self.post('/rankings', json.dumps(self.character))[0], 200)
+
+    def test_timeout(self):
+        # A calculation that times out gives up its worker and its slot, so
+        # the next request isn't turned away.
+        self.server.calculation_timeout = .01
+        status, body = self.post('/rankings', json.dumps(self.character))
+        self.assertEqual(status, 504)
+        self.assertEqual(body['error']['type'], 'Timeout')
+        self.assertEqual(self.server.in_flight, {})
+        self.server.calculation_timeout = 30
+        status, body = self.post('/evaluate', json.dumps(self.character))
+        self.assertEqual(status, 200)
@@ -0,0 +1,48 @@
+import unittest
+from core import exceptions
+from core import lru_cache
+
+class TestLRUCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = lru_cache.LRUCache(2)
+
+    def test_get_and_set(self):
+        self.assertEqual(self.cache.get('a'), None)
+        self.assertEqual(self.cache.get('a', 0), 0)
+        self.assertRaises(KeyError, self.cache.__getitem__, 'a')
+        self.cache['a'] = 1
+        self.assertEqual(self.cache['a'], 1)
+        self.assertTrue('a' in self.cache)
+        self.cache['a'] = 2
+        self.assertEqual(self.cache['a'], 2)
+        self.assertEqual(len(self.cache), 1)
+        del self.cache['a']
+        self.assertFalse('a' in self.cache)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_eviction(self):
+        self.cache['a'] = 1
+        self.cache['b'] = 2
+        self.cache.get('a')
+        self.cache['c'] = 3
+        self.assertEqual(self.cache.keys(), ['c', 'a'])
+        self.assertFalse('b' in self.cache)
+        self.cache['a'] = 4
+        self.cache['d'] = 5
+        self.assertEqual(self.cache.keys(), ['d', 'a'])
+
+    def test_hits_and_misses(self):
+        self.cache['a'] = 1
+        self.cache.get('a')
+        self.cache.get('b')
+        self.assertRaises(KeyError, self.cache.__getitem__, 'b')
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_clear(self):
+        self.cache['a'] = 1
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.keys(), [])
+
+    def test_max_size(self):
+        self.assertRaises(exceptions.InvalidInputException, lru_cache.LRUCache, 0)
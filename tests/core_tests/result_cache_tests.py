@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+import core_tests
+from core import jsoninput
+from core import result_cache
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'results.db')
+        self.calculator = jsoninput.from_dict(core_tests.make_character())
+        self.cache = result_cache.ResultCache(max_size=2, path=self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_tiers(self):
+        dps = self.calculator.get_dps()
+        self.assertEqual(self.cache.get_dps(self.calculator), dps)
+        self.assertEqual(self.cache.get_dps(self.calculator), dps)
+        self.assertEqual((self.cache.memory_hits, self.cache.disk_hits, self.cache.misses), (1, 0, 1))
+
+        other_cache = result_cache.ResultCache(path=self.path)
+        self.assertEqual(other_cache.get_dps(self.calculator), dps)
+        self.assertEqual(other_cache.get_dps(self.calculator), dps)
+        self.assertEqual((other_cache.memory_hits, other_cache.disk_hits, other_cache.misses), (1, 1, 0))
+
+        self.cache.clear()
+        self.assertEqual(other_cache.get_ep(self.calculator), self.calculator.get_ep())
+        self.assertEqual(other_cache.misses, 1)
+
+    def test_results_are_copies(self):
+        breakdown = self.cache.get_dps_breakdown(self.calculator)
+        breakdown['mutilate'] = 0
+        self.assertNotEqual(self.cache.get_dps_breakdown(self.calculator)['mutilate'], 0)
+
+    def test_get_key(self):
+        key = result_cache.get_key(self.calculator, 'get_dps')
+        self.assertEqual(result_cache.get_key(jsoninput.from_dict(core_tests.make_character()), 'get_dps'), key)
+        self.assertNotEqual(result_cache.get_key(self.calculator, 'get_ep'), key)
+        for change in (
+                lambda: setattr(self.calculator.stats, 'agi', 4757),
+                lambda: self.calculator.stats.mh.set_enchant('landslide'),
+                lambda: self.calculator.stats.procs.set_proc('fluid_death'),
+                lambda: setattr(self.calculator.stats.procs.fluid_death, 'value', 1),
+                lambda: setattr(self.calculator.stats.gear_buffs, 'rogue_t11_2pc', True),
+                lambda: self.calculator.talents.treeForTalent['vendetta'].set_talent('vendetta', 0),
+                lambda: setattr(self.calculator.glyphs, 'backstab', True),
+                lambda: setattr(self.calculator.buffs, 'crit_chance_buff', True),
+                lambda: setattr(self.calculator.settings, 'response_time', 1),
+                lambda: setattr(self.calculator.settings.cycle, 'min_envenom_size_mutilate', 5)):
+            change()
+            new_key = result_cache.get_key(self.calculator, 'get_dps')
+            self.assertNotEqual(new_key, key)
+            key = new_key
+
+    def test_model_version(self):
+        key = result_cache.get_key(self.calculator, 'get_dps')
+        model_version = result_cache.get_model_version()
+        try:
+            result_cache._model_version = 'older'
+            self.assertNotEqual(result_cache.get_key(self.calculator, 'get_dps'), key)
+        finally:
+            result_cache._model_version = model_version
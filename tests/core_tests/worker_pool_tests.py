@@ -0,0 +1,19 @@
+import unittest
+from core import worker_pool
+
+class Adder(object):
+    def __init__(self, base):
+        self.base = base
+
+    def add(self, value, times=1):
+        return self.base + value * times
+
+
+class TestWorkerPool(unittest.TestCase):
+    def test_map_method(self):
+        pool = worker_pool.start(2, Adder(10))
+        try:
+            self.assertEqual(worker_pool.map_method(pool, 'add', [(1,), (2, 3), (0,)]), [11, 16, 10])
+        finally:
+            pool.terminate()
+            pool.join()
@@ -1,3 +1,4 @@
+import pickle
 import unittest
 from core import exceptions
 from objects import buffs
@@ -107,3 +108,11 @@ class TestBuffsLevel(unittest.TestCase):
 
     def test_exception(self):
         self.assertRaises(exceptions.InvalidLevelException, self.buffs.__setattr__, 'level', 86)
+
+    def test_pickle(self):
+        self.buffs.level = 80
+        buffs_copy = pickle.loads(pickle.dumps(self.buffs))
+        self.assertFalse(hasattr(buffs_copy, '__dict__'))
+        self.assertTrue(buffs_copy.str_and_agi_buff)
+        self.assertFalse(buffs_copy.bleed_damage_debuff)
+        self.assertEqual(buffs_copy.buff_agi(), 155)
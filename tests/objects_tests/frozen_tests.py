@@ -0,0 +1,73 @@
+import copy
+import pickle
+import unittest
+from objects import frozen
+from objects import procs
+from objects import race
+from objects import stats
+from objects.rogue import rogue_talents
+
+class TestFrozen(unittest.TestCase):
+    def setUp(self):
+        mh = stats.Weapon(939.5, 1.8, 'dagger', 'landslide')
+        oh = stats.Weapon(730.5, 1.4, 'dagger')
+        ranged = stats.Weapon(1371.5, 2.2, 'thrown')
+        self.stats = stats.Stats(20, 4756, 190, 1022, 1329, 597, 1189, 1377, mh, oh, ranged, procs.ProcsList('fluid_death'), stats.GearBuffs('leather_specialization'))
+        self.talents = rogue_talents.RogueTalents('0333230113022110321', '0020000000000000000', '2030030000000000000')
+
+    def test_freeze(self):
+        frozen_stats = frozen.freeze(self.stats)
+        self.assertTrue(frozen.is_frozen(frozen_stats))
+        self.assertTrue(isinstance(frozen_stats, stats.Stats))
+        self.assertEqual(frozen_stats.agi, 4756)
+        self.assertEqual(frozen_stats.crit_rating_conversion, self.stats.crit_rating_conversion)
+        self.assertTrue(frozen_stats.mh.landslide)
+        self.assertFalse(frozen_stats.oh.landslide)
+        self.assertEqual(frozen_stats.procs.fluid_death.value, self.stats.procs.fluid_death.value)
+        self.assertRaises(frozen.FrozenInputException, setattr, frozen_stats, 'agi', 0)
+        self.assertRaises(frozen.FrozenInputException, delattr, frozen_stats.procs, 'fluid_death')
+        self.assertRaises(frozen.FrozenInputException, frozen_stats.mh.set_enchant, 'hurricane')
+        self.assertRaises(frozen.FrozenInputException, setattr, frozen_stats.procs.fluid_death, 'value', 0)
+        self.assertTrue(frozen.freeze(frozen_stats) is frozen_stats)
+        self.stats.agi = 0
+        self.assertEqual(frozen_stats.agi, 4756)
+
+    def test_talents(self):
+        frozen_talents = frozen.freeze(self.talents)
+        self.assertEqual(frozen_talents.vendetta, 1)
+        self.assertTrue(frozen_talents.trees[0].owner is frozen_talents)
+        self.assertTrue(frozen_talents.treeForTalent['vendetta'] is frozen_talents.trees[0])
+        self.assertRaises(frozen.FrozenInputException, frozen_talents.treeForTalent['vendetta'].set_talent, 'vendetta', 0)
+        self.assertRaises(frozen.FrozenInputException, frozen_talents.treeForTalent.__setitem__, 'vendetta', None)
+        self.assertTrue(frozen_talents.is_assassination_rogue())
+
+    def test_hash(self):
+        frozen_stats = frozen.freeze(self.stats)
+        self.assertEqual(frozen.freeze(self.stats), frozen_stats)
+        self.assertEqual(hash(frozen.freeze(self.stats)), hash(frozen_stats))
+        self.assertEqual(len(set([frozen_stats, frozen.freeze(self.stats)])), 1)
+        self.stats.haste += 1
+        self.assertNotEqual(frozen.freeze(self.stats), frozen_stats)
+        self.assertNotEqual(frozen.freeze(self.stats.mh), frozen.freeze(self.stats.oh))
+        self.assertNotEqual(frozen_stats, self.stats)
+        self.assertEqual(frozen.freeze(race.Race('orc')), frozen.freeze(race.Race('orc')))
+
+    def test_thaw(self):
+        frozen_talents = frozen.freeze(self.talents)
+        talents = frozen.thaw(frozen_talents)
+        self.assertFalse(frozen.is_frozen(talents))
+        self.assertTrue(talents.trees[0].owner is talents)
+        talents.treeForTalent['vendetta'].set_talent('vendetta', 0)
+        self.assertEqual(talents.vendetta, 0)
+        self.assertEqual(frozen_talents.vendetta, 1)
+        self.assertTrue(frozen.thaw(self.stats) is self.stats)
+
+    def test_copy(self):
+        frozen_stats = frozen.freeze(self.stats)
+        frozen_talents = frozen.freeze(self.talents)
+        self.assertTrue(copy.deepcopy(frozen_stats) is frozen_stats)
+        for protocol in (0, 2):
+            self.assertEqual(pickle.loads(pickle.dumps(frozen_stats, protocol)), frozen_stats)
+            talents_copy = pickle.loads(pickle.dumps(frozen_talents, protocol))
+            self.assertEqual(talents_copy, frozen_talents)
+            self.assertTrue(talents_copy.trees[0].owner is talents_copy)
@@ -68,6 +68,12 @@ class TestRace(unittest.TestCase):
         else:
             self.assertEqual(abilities[0]['value'], 585)
 
+    def test_activated_racial_data(self):
+        orc_80 = race.Race('orc', level=80)
+        orc_85 = race.Race('orc')
+        self.assertNotEqual(orc_80.activated_racial_data['blood_fury_physical']['value'], orc_85.activated_racial_data['blood_fury_physical']['value'])
+        self.assertEqual(race.Race.activated_racial_data['blood_fury_physical']['value'], 0)
+
     def test_goblin_racial(self):
         goblin = race.Race('goblin')
         goblin.level = 80
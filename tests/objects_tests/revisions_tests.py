@@ -0,0 +1,44 @@
+import pickle
+import unittest
+from objects import buffs
+from objects import frozen
+from objects import revisions
+from objects import stats
+from objects.rogue import rogue_talents
+
+class TestRevisions(unittest.TestCase):
+    def setUp(self):
+        self.talents = rogue_talents.RogueTalents('0333230113022110321', '0020000000000000000', '2030030000000000000')
+        self.weapon = stats.Weapon(939.5, 1.8, 'dagger', 'landslide')
+
+    def test_get(self):
+        revision = revisions.get(self.weapon)
+        self.assertEqual(revisions.get(self.weapon), revision)
+        self.assertNotEqual(revisions.get(self.talents), revision)
+        self.assertEqual(revisions.get(None), None)
+
+    def test_changes(self):
+        revision = revisions.get(self.weapon)
+        self.weapon.set_enchant('hurricane')
+        self.assertNotEqual(revisions.get(self.weapon), revision)
+        # Changing a tree changes the ClassTalents holding it.
+        revision = revisions.get(self.talents)
+        self.talents.treeForTalent['opportunity'].set_talent('opportunity', 1)
+        self.assertNotEqual(revisions.get(self.talents), revision)
+
+    def test_other_objects(self):
+        # Building or changing other inputs leaves these alone.
+        revision = revisions.get(self.talents)
+        rogue_talents.RogueTalents('0333230113022110321', '0020000000000000000', '2030030000000000000')
+        other_buffs = buffs.Buffs('agi_flask')
+        other_buffs.guild_feast = True
+        self.assertEqual(revisions.get(self.talents), revision)
+
+    def test_copies(self):
+        revision = revisions.get(self.weapon)
+        frozen_weapon = frozen.freeze(self.weapon)
+        self.assertNotEqual(revisions.get(frozen_weapon), revision)
+        self.assertEqual(frozen_weapon, frozen.freeze(self.weapon))
+        copy = pickle.loads(pickle.dumps(self.weapon))
+        self.assertNotEqual(revisions.get(copy), revision)
+        self.assertFalse('revision' in self.weapon.__getstate__())
@@ -1,3 +1,5 @@
+import copy
+import pickle
 import unittest
 from objects import talents
 from objects.rogue import rogue_talents
@@ -53,3 +55,18 @@ class TestRogueTalents(unittest.TestCase):
 
     def test_is_subtlety_rogue(self):
         self.assertFalse(self.talents.is_subtlety_rogue())
+
+    def test_copy(self):
+        talents_copy = copy.deepcopy(self.talents)
+        self.assertEqual(talents_copy.vendetta, 1)
+        talents_copy.treeForTalent['vendetta'].set_talent('vendetta', 0)
+        self.assertEqual(talents_copy.vendetta, 0)
+        self.assertEqual(self.talents.vendetta, 1)
+        self.assertEqual(pickle.loads(pickle.dumps(self.talents)).relentless_strikes, 3)
+
+    def test_slots(self):
+        self.assertFalse(hasattr(self.talents, '__dict__'))
+        self.assertFalse(hasattr(self.talents.trees[0], '__dict__'))
+        self.talents.treeForTalent['vendetta'].vendetta = 0
+        self.assertEqual(self.talents.vendetta, 0)
+        self.assertEqual(self.talents.trees[0].vendetta, 0)
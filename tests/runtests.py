@@ -5,19 +5,37 @@ sys.path.append(".")
 
 from calcs_tests import TestDamageCalculator
 from calcs_tests.armor_mitigation_tests import TestArmorMitigation
+from calcs_tests.dual_number_tests import TestDualNumber
+from calcs_tests.instrumentation_tests import TestInstrumentation
+from calcs_tests.solvers_tests import TestSolvers
+from calcs_tests.warm_start_tests import TestConvergedStateCache
 from calcs_tests.rogue_tests import TestRogueDamageCalculator
 from calcs_tests.rogue_tests import TestRogueDamageCalculatorLevels
 from calcs_tests.rogue_tests.Aldriana_tests import TestAldrianasRogueDamageCalculator
+from calcs_tests.rogue_tests.Aldriana_tests.ledger_tests import TestAbilityLedger
+from calcs_tests.rogue_tests.Aldriana_tests.simulator_tests import TestSimulator
+from calcs_tests.rogue_tests.Aldriana_tests.thread_safety_tests import TestThreadSafety
+from core_tests.benchmark_tests import TestBenchmark
 from core_tests.exceptions_tests import TestInvalidInputException
+from core_tests.jsonbatch_tests import TestJSONBatch
+from core_tests.jsonserver_tests import TestCalculationServer
+from core_tests.result_cache_tests import TestResultCache
+from core_tests.lru_cache_tests import TestLRUCache
+from core_tests.worker_pool_tests import TestWorkerPool
 from objects_tests.buffs_tests import TestBuffsTrue, TestBuffsFalse, TestBuffsLevel
+from objects_tests.frozen_tests import TestFrozen
 from objects_tests.stats_tests import TestStats, TestWeapon, TestGearBuffs
 from objects_tests.procs_tests import TestProcsList, TestProc
 from objects_tests.race_tests import TestRace
+from objects_tests.revisions_tests import TestRevisions
 from objects_tests.rogue_tests.rogue_glyphs_tests import TestRogueGlyphs
 from objects_tests.rogue_tests.rogue_talents_tests import TestAssassinationTalents
 from objects_tests.rogue_tests.rogue_talents_tests import TestCombatTalents
 from objects_tests.rogue_tests.rogue_talents_tests import TestSubtletyTalents
 from objects_tests.rogue_tests.rogue_talents_tests import TestRogueTalents
+from test_ui_tests.gear_optimizer_tests import TestGearOptimizer
+from test_ui_tests.gem_optimizer_tests import TestGemOptimizer
+from test_ui_tests.reforge_optimizer_tests import TestReforgeOptimizer
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,5 @@
+from os import path
+import sys
+
+# test_ui isn't a package; its modules import each other by name.
+sys.path.append(path.abspath(path.join(path.dirname(__file__), '..', '..', 'test_ui')))
@@ -0,0 +1,45 @@
+import unittest
+import gear
+import gear_optimizer
+
+class TestGearOptimizer(unittest.TestCase):
+    def setUp(self):
+        self.optimizer = gear_optimizer.get_optimizer('assassination')
+
+    def test_get_stats(self):
+        names = self.optimizer.get_starting_gear()
+        for slot in ('head', 'shoulders', 'chest', 'hands'):
+            names[slot] = [name for name in gear.get_items_for_slot(slot) if name.startswith("(H)Wind Dancer's")][0]
+        gems = {'head': {'meta': 'Chaotic Shadowspirit Diamond', 'blue': 'Glinting Demonseye'}}
+        gear_stats = gear.get_stats(self.optimizer.get_gear(names), gems)
+        self.assertTrue(gear_stats['gear_buffs'].rogue_t11_2pc)
+        self.assertTrue(gear_stats['gear_buffs'].chaotic_metagem)
+        self.assertTrue(gear_stats['procs'].rogue_t11_4pc)
+        # A blue socket takes a red/blue gem, so the helm's bonus applies.
+        agi = sum(self.optimizer.get_item(slot, names[slot]).agi for slot in gear.gear_slots)
+        self.assertEqual(gear_stats['agi'], agi + 20 + 30)
+
+    def test_optimize(self):
+        names, gems, dps = self.optimizer.optimize()
+        self.assertNotEqual(names['ring1'], names['ring2'])
+        self.assertNotEqual(names['trinket1'], names['trinket2'])
+        self.assertEqual(gear.get_item('mainhand', names['mainhand']).type, 'dagger')
+        self.assertTrue(dps > self.optimizer.get_dps(self.optimizer.get_starting_gear(), {}))
+
+        # No single item anywhere in the database does better.
+        gem_plan = {}
+        for slot_gems in gems.values():
+            gem_plan.update(slot_gems)
+        for slot in gear.gear_slots:
+            for name in gear.get_items_for_slot(slot):
+                if name in (names[slot], names.get(self.optimizer.paired_slots.get(slot))):
+                    continue
+                swap = dict(names)
+                swap[slot] = name
+                swap_dps = self.optimizer.get_exact_dps(swap, gem_plan)
+                self.assertTrue(swap_dps is None or swap_dps <= dps)
+
+    def test_processes(self):
+        names, gems, dps = self.optimizer.optimize()
+        optimizer = gear_optimizer.get_optimizer('assassination', processes=2)
+        self.assertEqual(optimizer.optimize(), (names, gems, dps))
@@ -0,0 +1,41 @@
+import unittest
+import gear
+import gear_optimizer
+import gem_optimizer
+import ui_data
+
+class TestGemOptimizer(unittest.TestCase):
+    def setUp(self):
+        self.optimizer = gem_optimizer.get_optimizer('assassination')
+        self.gear_optimizer = gear_optimizer.get_optimizer('assassination')
+        self.gear = self.gear_optimizer.get_gear(self.gear_optimizer.get_starting_gear())
+
+    def test_meta_gem_requirement(self):
+        head = [color for color in self.gear['head'].sockets]
+        self.assertTrue('meta' in head)
+        gems = {'head': dict((color, "Chaotic Shadowspirit Diamond") for color in head if color == 'meta')}
+        gems['head'].update((color, "Delicate Inferno Ruby") for color in head if color != 'meta')
+        self.assertEqual(gear.get_stats(self.gear, gems)['gear_buffs'].chaotic_metagem, False)
+        gems['chest'] = ["Rigid Ocean Sapphire"] * len(self.gear['chest'].sockets)
+        self.assertEqual(gear.get_stats(self.gear, gems)['gear_buffs'].chaotic_metagem, True)
+
+    def test_optimize(self):
+        weights = self.gear_optimizer.get_weights(self.optimizer.get_calculator(self.gear, None, None, None))
+        gem_plan = self.gear_optimizer.get_gem_plan(weights)
+        gems, dps = self.optimizer.optimize(self.gear, dict((slot, gem_plan) for slot in gear.gear_slots))
+        self.assertTrue(dps > self.optimizer.get_calculator(self.gear, None, None, None).get_dps())
+        self.assertTrue(dps >= self.optimizer.get_calculator(self.gear, dict((slot, gem_plan) for slot in gear.gear_slots), None, None).get_dps())
+        self.assertAlmostEqual(dps, self.optimizer.get_calculator(self.gear, gems, None, None).get_dps())
+        gem_colors = gear.get_gem_colors(sum(gems.values(), []))
+        for slot in gear.gear_slots:
+            self.assertEqual(len(gems[slot]), len(self.gear[slot].sockets))
+            for color, gem_name in zip(self.gear[slot].sockets, gems[slot]):
+                self.assertEqual(color == 'meta', 'meta' in ui_data.gems[gem_name][0])
+                if color == 'meta':
+                    self.assertTrue(gear.is_meta_gem_active(gem_name, gem_colors))
+
+    def test_signatures(self):
+        weights = gear.get_weights(self.optimizer.get_calculator(self.gear, None, None, None))
+        self.optimizer.solve(self.gear, weights)
+        signatures = set((tuple(item.sockets), item.bonus_stat, item.bonus_value) for item in self.gear.itervalues() if len(item.sockets) > 0)
+        self.assertEqual(len(self.optimizer.signature_choices), len(signatures))
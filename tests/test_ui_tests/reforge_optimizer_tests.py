@@ -0,0 +1,51 @@
+import itertools
+import unittest
+import gear_optimizer
+import reforge_optimizer
+import ui_data
+
+class TestReforgeOptimizer(unittest.TestCase):
+    def setUp(self):
+        self.optimizer = reforge_optimizer.get_optimizer('assassination')
+        optimizer = gear_optimizer.get_optimizer('assassination')
+        self.gear = optimizer.get_gear(optimizer.get_starting_gear())
+
+    def test_reforge(self):
+        item = ui_data.Item('test', crit=149, haste=169)
+        item.reforge('haste', 'hit')
+        self.assertEqual(item.haste, 102)
+        self.assertEqual(item.hit, 67)
+        self.assertEqual(item.crit, 149)
+
+    def test_optimize(self):
+        reforges, dps = self.optimizer.optimize(self.gear)
+        self.assertTrue(dps > self.optimizer.get_calculator(self.gear, None, None, {}).get_dps())
+        self.assertAlmostEqual(dps, self.optimizer.get_calculator(self.gear, None, None, reforges).get_dps())
+        for slot, (from_stat, to_stat) in reforges.iteritems():
+            self.assertTrue(from_stat in self.gear[slot].reforgable_from())
+            self.assertTrue(to_stat in self.gear[slot].reforgable_to())
+
+    def test_add_state_past_caps(self):
+        # Totals past the caps share a state, but it keeps the real total,
+        # so reforging some of the surplus away later costs nothing.
+        optimizer = self.optimizer
+        optimizer.set_model(optimizer.get_calculator(self.gear, None, None, {}))
+        states = {}
+        hit = optimizer.hit_limit + 400
+        optimizer.add_state(states, hit, 0, 0., None)
+        self.assertEqual(states.keys(), [(optimizer.hit_limit // optimizer.resolution, 0)])
+        model_value, state_hit, state_exp, value, reforges = states.values()[0]
+        self.assertEqual(state_hit, hit)
+        new_states = {}
+        optimizer.add_state(new_states, state_hit - 300, state_exp, value, None)
+        self.assertEqual(new_states.values()[0][0], model_value)
+
+    def test_brute_force(self):
+        slots = ['head', 'chest', 'legs']
+        reforges, dps = self.optimizer.optimize(self.gear, slots=slots)
+        choices = [[option[0] for option in self.optimizer.get_options(self.gear[slot])] for slot in slots]
+        best_dps = 0
+        for combination in itertools.product(*choices):
+            combination_reforges = dict((slot, reforge) for slot, reforge in zip(slots, combination) if reforge is not None)
+            best_dps = max(best_dps, self.optimizer.get_calculator(self.gear, None, None, combination_reforges).get_dps())
+        self.assertAlmostEqual(dps, best_dps)